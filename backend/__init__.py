@@ -1,7 +1,11 @@
 from flask import Flask
-from backend.inventory_routes import inventory_bp  # Importa los endpoints desde inventory_routes
+
 
 def create_app():
+    # Importa los endpoints desde inventory_routes; importing the package alone
+    # (e.g. backend.catalog from a script) doesn't load the routes
+    from backend.inventory_routes import inventory_bp
+
     app = Flask(__name__)
 
     # Registrar blueprints
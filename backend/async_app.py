@@ -0,0 +1,154 @@
+"""
+Asynchronous (ASGI) serving path for the chat and recommendation endpoints,
+and the inventory change feed.
+
+The Flask app blocks one worker thread per request for the whole model call.
+This app serves the same /api/chat and /api/recommendations contracts from a
+single event loop over pooled keep-alive upstream connections, so a process
+can keep hundreds of model calls in flight. Long polls of
+/api/inventory/changes wait on the loop as well, without a thread each.
+Run it with:
+
+    python run_async.py
+"""
+import json
+from urllib.parse import parse_qs
+
+from backend.deadlines import Deadline
+from backend.deepseek_client import close_async_client
+from backend.deepseek_integration import generate_response_async
+from backend.inventory_feed import INVENTORY_CHANGES_LIMIT, wait_for_changes_async
+from backend.recommendation_store import get_recommendations_async
+
+
+async def read_json(receive) -> dict:
+    """
+    Reads and decodes the JSON body of a request.
+    """
+    body = b""
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get("body", b"")
+        more_body = message.get("more_body", False)
+    return json.loads(body) if body else {}
+
+
+async def send_json(send, payload: dict, status: int = 200):
+    """
+    Sends a JSON response.
+    """
+    body = json.dumps(payload).encode("utf-8")
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+async def chat(scope, receive, send):
+    """
+    Endpoint to interact with the virtual assistant using natural language queries.
+    """
+    try:
+        deadline = Deadline("chat")
+        data = await read_json(receive)
+        user_id = data.get("user_id")
+        user_message = data.get("message")
+        session_id = data.get("session_id")
+
+        if not user_message:
+            return await send_json(send, {"error": "The user's message is missing"}, 400)
+
+        response = await generate_response_async(
+            user_message, user_id, deadline=deadline, session_id=session_id
+        )
+
+        if response.get("status") == "error":
+            return await send_json(send, {"error": response.get("message")}, 500)
+
+        await send_json(send, {"status": "success", "response": response.get("response")})
+
+    except Exception as e:
+        await send_json(send, {"error": str(e)}, 500)
+
+
+async def recommendations(scope, receive, send):
+    """
+    Generates recommendations based on the user's history or general suggestions if not logged in.
+    """
+    try:
+        deadline = Deadline("recommendations")
+        query = parse_qs(scope.get("query_string", b"").decode())
+        user_id = query.get("user_id", [None])[0]
+        user_id = int(user_id) if user_id and user_id.isdigit() else None
+
+        response = await get_recommendations_async(user_id, deadline=deadline)
+
+        if response.get("status") == "error":
+            return await send_json(send, {"error": response.get("message")}, 500)
+
+        await send_json(send, {"status": "success", "recommendations": response.get("response")})
+
+    except Exception as e:
+        await send_json(send, {"error": str(e)}, 500)
+
+
+async def inventory_changes(scope, receive, send):
+    """
+    Feed of product changes; with `timeout`, waits for a change without holding a thread.
+    """
+    try:
+        query = parse_qs(scope.get("query_string", b"").decode())
+        since = query.get("since", [None])[0]
+        limit = query.get("limit", [None])[0]
+
+        page = await wait_for_changes_async(
+            since=int(since) if since and since.isdigit() else None,
+            limit=int(limit) if limit and limit.isdigit() else INVENTORY_CHANGES_LIMIT,
+            timeout=float(query.get("timeout", ["0"])[0]),
+        )
+        await send_json(send, {"status": "success", **page})
+
+    except Exception as e:
+        await send_json(send, {"error": str(e)}, 500)
+
+
+ROUTES = {
+    ("POST", "/api/chat"): chat,
+    ("GET", "/api/recommendations"): recommendations,
+    ("GET", "/api/inventory/changes"): inventory_changes,
+}
+
+
+async def lifespan(receive, send):
+    """
+    Closes the shared connection pool when the server shuts down.
+    """
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await close_async_client()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    """
+    ASGI entry point.
+    """
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, send)
+
+    handler = ROUTES.get((scope["method"], scope["path"]))
+    if handler is None:
+        return await send_json(send, {"error": "Not found"}, 404)
+    await handler(scope, receive, send)
@@ -0,0 +1,229 @@
+import os
+import sqlite3
+import threading
+
+
+DB_NAME = "store.db"
+
+PRODUCT_COLUMNS = (
+    "product_id",
+    "name",
+    "category",
+    "brand",
+    "price",
+    "stock",
+    "description",
+    "features",
+)
+
+# Change counter bumped by triggers on every write to 'products'. Unlike
+# PRAGMA data_version it is stored in the database, so it survives restarts
+# and means the same thing to every connection and process.
+CATALOG_VERSION_SQL = """
+CREATE TABLE IF NOT EXISTS catalog_meta (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO catalog_meta (id, version) VALUES (1, 0);
+
+CREATE TRIGGER IF NOT EXISTS catalog_version_insert AFTER INSERT ON products
+BEGIN
+    UPDATE catalog_meta SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS catalog_version_update AFTER UPDATE ON products
+BEGIN
+    UPDATE catalog_meta SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS catalog_version_delete AFTER DELETE ON products
+BEGIN
+    UPDATE catalog_meta SET version = version + 1 WHERE id = 1;
+END;
+"""
+
+
+def ensure_catalog_version(conn: sqlite3.Connection):
+    """
+    Creates the catalog change counter and its triggers if they don't exist yet.
+
+    Args:
+        conn (sqlite3.Connection): Open connection to the database.
+    """
+    conn.executescript(CATALOG_VERSION_SQL)
+
+
+def format_catalog_context(rows: list) -> str:
+    """
+    Formats product rows as the plain-text catalog used in prompts.
+
+    Args:
+        rows (list): Product dictionaries as stored in a snapshot.
+
+    Returns:
+        str: One line per product.
+    """
+    return "\n".join(
+        f"{row['name']} ({row['category']} - {row['brand']}): "
+        f"Price ${row['price']}, Stock: {row['stock']}"
+        for row in rows
+    )
+
+
+class CatalogSnapshot:
+    """
+    Immutable view of the 'products' table at a given catalog version.
+    """
+
+    def __init__(self, version: int, rows: list):
+        self.version = version
+        self.rows = rows
+        self.context = format_catalog_context(rows)
+        self._derived = {}
+        self._derived_lock = threading.Lock()
+
+    def derived(self, key: str, build):
+        """
+        Returns a structure derived from the rows, built once per snapshot.
+
+        Args:
+            key (str): Name of the derived structure.
+            build (callable): Function receiving the snapshot and returning the structure.
+
+        Returns:
+            Any: The cached structure.
+        """
+        with self._derived_lock:
+            if key not in self._derived:
+                self._derived[key] = build(self)
+            return self._derived[key]
+
+
+class CatalogCache:
+    """
+    Holds the latest catalog snapshot of one database and rebuilds it only
+    when the products table actually changed.
+
+    Every lookup runs PRAGMA data_version on a dedicated connection, which
+    only changes when another connection commits. When it does, the stored
+    catalog version is compared with the snapshot's and the rows are reloaded
+    only if products were written.
+    """
+
+    def __init__(self, db_name: str = DB_NAME):
+        self.db_name = db_name
+        self.hits = 0
+        self.misses = 0
+        self.rebuilds = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        self._data_version = None
+        self._snapshot = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            from backend.connection import connect  # backend.connection imports DB_NAME from here
+
+            conn = connect(self.db_name, check_same_thread=False, isolation_level=None)
+            ensure_catalog_version(conn)
+            self._conn = conn
+        return self._conn
+
+    def get(self) -> CatalogSnapshot:
+        """
+        Returns the current snapshot, rebuilding it if the catalog changed.
+
+        Returns:
+            CatalogSnapshot: Snapshot matching the current catalog version.
+        """
+        with self._lock:
+            conn = self._connection()
+            data_version = conn.execute("PRAGMA data_version;").fetchone()[0]
+            if self._snapshot is not None and data_version == self._data_version:
+                self.hits += 1
+                return self._snapshot
+
+            self.misses += 1
+
+            # Read the version and the rows in the same transaction so they match
+            conn.execute("BEGIN;")
+            try:
+                version = conn.execute(
+                    "SELECT version FROM catalog_meta WHERE id = 1;"
+                ).fetchone()[0]
+                if self._snapshot is None or self._snapshot.version != version:
+                    cursor = conn.execute(
+                        f"SELECT {', '.join(PRODUCT_COLUMNS)} FROM products ORDER BY product_id;"
+                    )
+                    rows = [dict(zip(PRODUCT_COLUMNS, row)) for row in cursor.fetchall()]
+                    self._snapshot = CatalogSnapshot(version, rows)
+                    self.rebuilds += 1
+            finally:
+                conn.execute("COMMIT;")
+
+            self._data_version = data_version
+            return self._snapshot
+
+    def stats(self) -> dict:
+        """
+        Returns the cache counters.
+
+        Returns:
+            dict: Hits, misses, rebuilds and the current catalog version.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "rebuilds": self.rebuilds,
+                "version": self._snapshot.version if self._snapshot else None,
+                "products": len(self._snapshot.rows) if self._snapshot else 0,
+            }
+
+
+# Process-wide caches, one per database file
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_catalog_cache(db_name: str = DB_NAME) -> CatalogCache:
+    """
+    Returns the shared catalog cache for a database.
+
+    Args:
+        db_name (str): The name of the database.
+
+    Returns:
+        CatalogCache: The process-wide cache for that database file.
+    """
+    key = os.path.abspath(db_name)
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = _caches[key] = CatalogCache(db_name)
+        return cache
+
+
+def get_catalog(db_name: str = DB_NAME) -> CatalogSnapshot:
+    """
+    Returns the current catalog snapshot for a database.
+
+    Args:
+        db_name (str): The name of the database.
+
+    Returns:
+        CatalogSnapshot: Rows and pre-rendered context at the current version.
+    """
+    return get_catalog_cache(db_name).get()
+
+
+def catalog_stats() -> dict:
+    """
+    Returns the counters of every catalog cache in the process.
+
+    Returns:
+        dict: Cache statistics keyed by database path.
+    """
+    with _caches_lock:
+        caches = dict(_caches)
+    return {path: cache.stats() for path, cache in caches.items()}
@@ -0,0 +1,106 @@
+from backend.catalog import DB_NAME, CatalogSnapshot, get_catalog
+from backend.retrieval import tokenize
+
+
+class BrandCategoryIndex:
+    """
+    Inverted index from normalized brand and category names to in-stock products.
+
+    Names are normalized to their lowercase alphanumeric terms, so a history
+    only matches a brand or category mentioned as whole words ("HP" doesn't
+    match inside "iPhone"). Products are referred to by their position among
+    the in-stock products, in catalog order.
+    """
+
+    def __init__(self, rows: list):
+        self.names = []  # Names of the in-stock products
+        self.positions = {}  # "brand or category terms" -> positions in self.names
+        for row in rows:
+            if row["stock"] <= 0:
+                continue  # Out-of-stock items are never classified
+            position = len(self.names)
+            self.names.append(row["name"])
+            for phrase in {" ".join(tokenize(row["brand"])), " ".join(tokenize(row["category"]))}:
+                if phrase:
+                    self.positions.setdefault(phrase, []).append(position)
+        self.max_terms = max((phrase.count(" ") + 1 for phrase in self.positions), default=0)
+
+    def match(self, user_history: str) -> set:
+        """
+        Returns the positions of the products whose brand or category appears in a history.
+
+        Every run of up to max_terms consecutive terms of each history item is
+        looked up, so the cost grows with the history, not with the catalog.
+
+        Args:
+            user_history (str): Comma-separated purchase history.
+
+        Returns:
+            set: Positions in self.names.
+        """
+        matched = set()
+        for item in (user_history or "").split(","):
+            terms = tokenize(item)
+            for start in range(len(terms)):
+                for end in range(start + 1, min(start + self.max_terms, len(terms)) + 1):
+                    positions = self.positions.get(" ".join(terms[start:end]))
+                    if positions:
+                        matched.update(positions)
+        return matched
+
+    def classify(self, user_history: str) -> dict:
+        """
+        Classifies the in-stock products based on a purchase history.
+
+        Args:
+            user_history (str): Comma-separated purchase history.
+
+        Returns:
+            dict: Product names per group, in catalog order, like classify_products.
+        """
+        matched = sorted(self.match(user_history))
+
+        # The products between two matches are copied as whole slices
+        not_recommended = []
+        previous = 0
+        for position in matched:
+            not_recommended.extend(self.names[previous:position])
+            previous = position + 1
+        not_recommended.extend(self.names[previous:])
+
+        return {
+            "Highly Recommended": [self.names[position] for position in matched],
+            # Same rule as classify_products, whose "Recommended" test repeats
+            # the "Highly Recommended" one and so never matches either
+            "Recommended": [],
+            "Not Recommended": not_recommended,
+        }
+
+
+def build_brand_category_index(snapshot: CatalogSnapshot) -> BrandCategoryIndex:
+    """
+    Builds the brand/category index of a catalog snapshot.
+
+    Args:
+        snapshot (CatalogSnapshot): The catalog to index.
+
+    Returns:
+        BrandCategoryIndex: The index of the snapshot's in-stock products.
+    """
+    return BrandCategoryIndex(snapshot.rows)
+
+
+def classify_products_indexed(user_history: str, db_name=DB_NAME) -> dict:
+    """
+    Classifies the products based on the user's purchase history, using the
+    brand/category index of the current catalog version.
+
+    Args:
+        user_history (str): The user's purchase history.
+        db_name (str): The name of the database.
+
+    Returns:
+        dict: Products categorized into specific groups.
+    """
+    index = get_catalog(db_name).derived("brand_category_index", build_brand_category_index)
+    return index.classify(user_history)
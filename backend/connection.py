@@ -0,0 +1,146 @@
+import os
+import sqlite3
+import threading
+
+from backend.catalog import DB_NAME
+
+
+# Page cache per connection, in KiB
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "16384"))
+# Bytes of the database file read through mmap instead of read() calls
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+# NORMAL only syncs the WAL at checkpoints: a power loss may drop the last
+# commits but never corrupts the database
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+# Seconds a connection waits for a lock before failing with "database is locked"
+SQLITE_BUSY_TIMEOUT = float(os.getenv("SQLITE_BUSY_TIMEOUT", "5"))
+# Prepared statements kept per connection
+SQLITE_STATEMENT_CACHE = int(os.getenv("SQLITE_STATEMENT_CACHE", "256"))
+
+
+def configure(conn: sqlite3.Connection):
+    """
+    Applies the journal mode and tuning PRAGMAs to a new connection.
+
+    WAL lets readers and a writer work at the same time; the mode is stored
+    in the database file, the other settings only last for the connection.
+    Recursive triggers make INSERT OR REPLACE fire the delete triggers of
+    the rows it replaces, which the search index and summaries rely on.
+
+    Args:
+        conn (sqlite3.Connection): Freshly opened connection.
+    """
+    conn.execute("PRAGMA journal_mode = WAL;")
+    conn.execute(f"PRAGMA synchronous = {SQLITE_SYNCHRONOUS};")
+    conn.execute(f"PRAGMA cache_size = {-SQLITE_CACHE_SIZE_KB};")
+    conn.execute(f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE};")
+    conn.execute("PRAGMA temp_store = MEMORY;")
+    conn.execute("PRAGMA recursive_triggers = ON;")
+
+
+def connect(db_name: str = DB_NAME, **kwargs) -> sqlite3.Connection:
+    """
+    Opens a configured connection.
+
+    Args:
+        db_name (str): The name of the database.
+        **kwargs: Extra arguments for sqlite3.connect.
+
+    Returns:
+        sqlite3.Connection: The new connection.
+    """
+    kwargs.setdefault("timeout", SQLITE_BUSY_TIMEOUT)
+    kwargs.setdefault("cached_statements", SQLITE_STATEMENT_CACHE)
+    conn = sqlite3.connect(db_name, **kwargs)
+    configure(conn)
+    return conn
+
+
+class ConnectionManager:
+    """
+    Keeps one persistent, configured connection per thread and database.
+
+    Connections are never shared between threads, so they need no locking;
+    a thread's connections are closed when the thread ends. Use the
+    connection as a context manager to commit (or roll back) a write, as
+    with a fresh sqlite3 connection; it stays open afterwards.
+    """
+
+    def __init__(self):
+        self.opened = 0
+        self.reused = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def get(self, db_name: str = DB_NAME) -> sqlite3.Connection:
+        """
+        Returns the calling thread's connection to a database, opening it if needed.
+
+        Args:
+            db_name (str): The name of the database.
+
+        Returns:
+            sqlite3.Connection: The thread's connection.
+        """
+        conns = getattr(self._local, "conns", None)
+        if conns is None:
+            conns = self._local.conns = {}
+        key = os.path.abspath(db_name)
+        conn = conns.get(key)
+        if conn is None:
+            conn = conns[key] = connect(db_name)
+            with self._lock:
+                self.opened += 1
+        else:
+            with self._lock:
+                self.reused += 1
+        return conn
+
+    def close(self):
+        """
+        Closes the calling thread's connections.
+        """
+        for conn in getattr(self._local, "conns", {}).values():
+            conn.close()
+        self._local.conns = {}
+
+    def stats(self) -> dict:
+        """
+        Returns the connection counters.
+
+        Returns:
+            dict: Connections opened and lookups served by an open connection.
+        """
+        with self._lock:
+            total = self.opened + self.reused
+            return {
+                "opened": self.opened,
+                "reused": self.reused,
+                "reuse_rate": self.reused / total if total else 0.0,
+            }
+
+
+connections = ConnectionManager()
+
+
+def get_connection(db_name: str = DB_NAME) -> sqlite3.Connection:
+    """
+    Returns the calling thread's persistent connection to a database.
+
+    Args:
+        db_name (str): The name of the database.
+
+    Returns:
+        sqlite3.Connection: The thread's connection.
+    """
+    return connections.get(db_name)
+
+
+def connection_stats() -> dict:
+    """
+    Returns the counters of the shared connection manager.
+
+    Returns:
+        dict: See ConnectionManager.stats.
+    """
+    return connections.stats()
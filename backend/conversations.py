@@ -0,0 +1,281 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.deadlines import Deadline
+from backend.llm import chat_completion
+from backend.tokens import estimate_tokens
+
+
+# Tokens of history (summary and turns) above which older turns are folded
+# into the rolling summary
+CONVERSATION_TOKEN_BUDGET = int(os.getenv("CONVERSATION_TOKEN_BUDGET", "800"))
+# Most recent messages always kept verbatim (two user/assistant exchanges)
+CONVERSATION_KEEP_MESSAGES = int(os.getenv("CONVERSATION_KEEP_MESSAGES", "4"))
+CONVERSATION_SUMMARY_TOKENS = int(os.getenv("CONVERSATION_SUMMARY_TOKENS", "200"))
+CONVERSATION_MAX_SESSIONS = int(os.getenv("CONVERSATION_MAX_SESSIONS", "10000"))
+CONVERSATION_TTL = float(os.getenv("CONVERSATION_TTL", "3600"))
+
+# Turns tracked individually by the growth report; later turns share the last bucket
+REPORTED_TURNS = 20
+
+SUMMARY_INSTRUCTIONS = (
+    "Summarize this conversation between a Makers Tech customer and the store assistant "
+    f"in at most {int(CONVERSATION_SUMMARY_TOKENS * 0.6)} words. Keep every product, brand, "
+    "price, quantity and preference mentioned and what the customer still wants to know; "
+    "drop greetings and formatting."
+)
+
+logger = logging.getLogger(__name__)
+
+
+def history_tokens(summary: str, turns: list) -> int:
+    """
+    Estimates the tokens the history of a conversation adds to a prompt.
+
+    Args:
+        summary (str): The rolling summary of the older turns.
+        turns (list): The chat messages kept verbatim.
+
+    Returns:
+        int: Estimated tokens of the summary and the turns.
+    """
+    return estimate_tokens(summary) + sum(estimate_tokens(turn["content"]) for turn in turns)
+
+
+class Conversation:
+    """
+    History of one chat session: a rolling summary plus the latest turns.
+    """
+
+    def __init__(self, session_id: str, user_id: int = None):
+        self.session_id = session_id
+        self.user_id = user_id
+        self.summary = ""
+        self.turns = []
+        self.turn_count = 0
+        self.folding = False
+        self.updated_at = time.time()
+        self.lock = threading.Lock()
+
+
+class ConversationStats:
+    """
+    Counts folds and tracks the prompt tokens of each turn number, to check
+    that prompts stop growing once the summary kicks in.
+    """
+
+    def __init__(self):
+        self.turns = 0
+        self.folds = 0
+        self.fold_failures = 0
+        self._prompt_tokens = {}  # turn number -> (prompts, total tokens)
+        self._lock = threading.Lock()
+
+    def record_turn(self, turn: int, prompt_tokens: int):
+        with self._lock:
+            self.turns += 1
+            bucket = min(turn, REPORTED_TURNS)
+            prompts, tokens = self._prompt_tokens.get(bucket, (0, 0))
+            self._prompt_tokens[bucket] = (prompts + 1, tokens + prompt_tokens)
+
+    def record_fold(self, ok: bool):
+        with self._lock:
+            self.folds += 1
+            self.fold_failures += 0 if ok else 1
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            growth = {
+                (f"{turn}+" if turn == REPORTED_TURNS else str(turn)): round(tokens / prompts, 1)
+                for turn, (prompts, tokens) in sorted(self._prompt_tokens.items())
+            }
+            return {
+                "turns": self.turns,
+                "folds": self.folds,
+                "fold_failures": self.fold_failures,
+                "avg_prompt_tokens_by_turn": growth,
+            }
+
+
+class ConversationStore:
+    """
+    Bounded, in-memory LRU store of chat sessions.
+
+    Each session keeps its latest turns verbatim. Once the history goes over
+    the token budget, the older turns are folded into a rolling summary by the
+    model, in the background, so the prompt of a request stays bounded no
+    matter how long the conversation runs.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = CONVERSATION_TOKEN_BUDGET,
+        keep_messages: int = CONVERSATION_KEEP_MESSAGES,
+        max_sessions: int = CONVERSATION_MAX_SESSIONS,
+        ttl: float = CONVERSATION_TTL,
+    ):
+        self.token_budget = token_budget
+        self.keep_messages = keep_messages
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.stats = ConversationStats()
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="conversation-summary")
+
+    def get(self, session_id: str, user_id: int = None) -> Conversation:
+        """
+        Returns the conversation of a session, starting a new one if needed.
+
+        A session that expired or belongs to another user starts over.
+
+        Args:
+            session_id (str): Identifier chosen by the client.
+            user_id (int, optional): The user's ID.
+
+        Returns:
+            Conversation: The session's conversation.
+        """
+        now = time.time()
+        with self._lock:
+            conversation = self._sessions.get(session_id)
+            if conversation is None or conversation.user_id != user_id or now - conversation.updated_at > self.ttl:
+                conversation = Conversation(session_id, user_id)
+            self._sessions[session_id] = conversation
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            return conversation
+
+    def history(self, conversation: Conversation) -> list:
+        """
+        Returns the chat messages that carry the conversation into the next prompt.
+
+        While a fold is still running, the oldest turns beyond the budget are
+        left out, so the prompt stays bounded in the meantime.
+
+        Args:
+            conversation (Conversation): The session's conversation.
+
+        Returns:
+            list: A summary message (if any) followed by the latest turns.
+        """
+        with conversation.lock:
+            summary = conversation.summary
+            turns = list(conversation.turns)
+
+        while len(turns) > self.keep_messages and history_tokens(summary, turns) > self.token_budget:
+            turns = turns[2:]
+
+        messages = []
+        if summary:
+            messages.append({"role": "system", "content": f"Summary of the earlier conversation: {summary}"})
+        return messages + turns
+
+    def digest(self, history: list) -> str:
+        """
+        Fingerprints a history, so cached answers are only reused in the same context.
+        """
+        if not history:
+            return ""
+        return hashlib.sha256(json.dumps(history).encode("utf-8")).hexdigest()[:16]
+
+    def record_prompt(self, conversation: Conversation, messages: list):
+        """
+        Records the size of the prompt sent for the next turn of a conversation.
+
+        Args:
+            conversation (Conversation): The session's conversation.
+            messages (list): The chat messages of the prompt.
+        """
+        tokens = sum(estimate_tokens(message["content"]) for message in messages)
+        self.stats.record_turn(conversation.turn_count + 1, tokens)
+
+    def record(self, conversation: Conversation, user_message: str, reply: str):
+        """
+        Appends an exchange and folds older turns once the history is over budget.
+
+        Args:
+            conversation (Conversation): The session's conversation.
+            user_message (str): The user's message.
+            reply (str): The assistant's answer.
+        """
+        with conversation.lock:
+            conversation.turns.append({"role": "user", "content": user_message})
+            conversation.turns.append({"role": "assistant", "content": reply})
+            conversation.turn_count += 1
+            conversation.updated_at = time.time()
+
+            over_budget = history_tokens(conversation.summary, conversation.turns) > self.token_budget
+            if conversation.folding or not over_budget or len(conversation.turns) <= self.keep_messages:
+                return
+            conversation.folding = True
+            summary = conversation.summary
+            folded = conversation.turns[: len(conversation.turns) - self.keep_messages]
+
+        self._executor.submit(self._fold, conversation, summary, folded)
+
+    def _fold(self, conversation: Conversation, summary: str, folded: list):
+        """
+        Replaces the folded turns with a new summary; without one, they are dropped.
+        """
+        try:
+            new_summary = summarize(summary, folded)
+        except Exception as e:
+            logger.warning("Could not summarize conversation %s: %s", conversation.session_id, e)
+            new_summary = None
+
+        with conversation.lock:
+            # Turns are only ever appended, so the folded ones are still the oldest
+            del conversation.turns[: len(folded)]
+            if new_summary is not None:
+                conversation.summary = new_summary
+            conversation.folding = False
+        self.stats.record_fold(new_summary is not None)
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+
+
+def summarize(summary: str, turns: list) -> str:
+    """
+    Folds chat turns into the rolling summary of a conversation with the model.
+
+    Args:
+        summary (str): The current summary, possibly empty.
+        turns (list): The chat messages to fold into it.
+
+    Returns:
+        str: The new summary.
+    """
+    transcript = "\n".join(f"{turn['role'].capitalize()}: {turn['content']}" for turn in turns)
+    content = f"Earlier summary: {summary}\n\nConversation:\n{transcript}" if summary else transcript
+    return chat_completion(
+        [
+            {"role": "system", "content": SUMMARY_INSTRUCTIONS},
+            {"role": "user", "content": content},
+        ],
+        max_tokens=CONVERSATION_SUMMARY_TOKENS,
+        temperature=0.0,
+        deadline=Deadline("summary"),
+    ).strip()
+
+
+conversations = ConversationStore()
+
+
+def conversation_stats() -> dict:
+    """
+    Returns the conversation counters.
+
+    Returns:
+        dict: Turns, folds and the average prompt tokens of each turn number.
+    """
+    return conversations.stats.as_dict()
@@ -1,6 +1,62 @@
-import sqlite3
+import json
 from typing import List, Dict, Optional
 
+from backend.connection import get_connection
+from backend.migrations import ensure_schema
+
+
+# Products shown per recommendation bucket
+BUCKET_SIZE = 2
+
+# Ranks and limits every bucket inside SQLite. The history terms are its
+# items plus the brands and categories of the products it names. Each term
+# contributes at most :per_bucket products through the partial indexes
+# created by backend.migrations, and "Not Recommended" stops scanning after
+# :per_bucket products, so the work doesn't grow with the products table.
+PRODUCT_BUCKETS_SQL = """
+WITH history(item) AS (
+    SELECT DISTINCT trim(value) FROM json_each(:history) WHERE trim(value) <> ''
+),
+terms(term) AS (
+    SELECT item FROM history
+    UNION
+    SELECT p.brand FROM history h JOIN products p ON p.name = h.item
+    UNION
+    SELECT p.category FROM history h JOIN products p ON p.name = h.item
+),
+candidates(bucket, product_id) AS (
+    SELECT 'Highly Recommended', p.product_id
+    FROM terms t JOIN products p
+    WHERE p.product_id IN (
+        SELECT product_id FROM products
+        WHERE brand = t.term AND stock > 0 ORDER BY product_id LIMIT :per_bucket
+    )
+    UNION
+    SELECT 'Highly Recommended', p.product_id
+    FROM terms t JOIN products p
+    WHERE p.product_id IN (
+        SELECT product_id FROM products
+        WHERE category = t.term AND stock > 0 ORDER BY product_id LIMIT :per_bucket
+    )
+    UNION ALL
+    SELECT * FROM (
+        SELECT 'Not Recommended', product_id FROM products
+        WHERE stock > 0
+          AND brand NOT IN (SELECT term FROM terms)
+          AND category NOT IN (SELECT term FROM terms)
+        ORDER BY product_id LIMIT :per_bucket
+    )
+),
+ranked(bucket, product_id, position) AS (
+    SELECT bucket, product_id, ROW_NUMBER() OVER (PARTITION BY bucket ORDER BY product_id)
+    FROM candidates
+)
+SELECT r.bucket, p.name
+FROM ranked r JOIN products p ON p.product_id = r.product_id
+WHERE r.position <= :per_bucket
+ORDER BY r.bucket, r.position;
+"""
+
 
 class Database:
     def __init__(self, db_name: str = "store.db"):
@@ -14,20 +70,27 @@ class Database:
             user_id (int): The ID of the user.
 
         Returns:
-            Optional[str]: The user's purchase history as a string, or None if not found.
+            Optional[str]: The names of the products the user bought, comma-separated,
+            or None if the user is not found.
         """
-        with sqlite3.connect(self.db_name) as conn:
+        ensure_schema(self.db_name)
+        with get_connection(self.db_name) as conn:
             cursor = conn.cursor()
             cursor.execute(
                 """
-                SELECT purchase_history 
-                FROM users 
-                WHERE user_id = ?
+                SELECT COALESCE(p.name, up.item_name)
+                FROM users u
+                LEFT JOIN user_purchases up ON up.user_id = u.user_id
+                LEFT JOIN products p ON p.product_id = up.product_id
+                WHERE u.user_id = ?
+                ORDER BY up.ts
             """,
                 (user_id,),
             )
-            result = cursor.fetchone()
-            return result[0] if result else None
+            rows = cursor.fetchall()
+            if not rows:
+                return None
+            return ", ".join(name for (name,) in rows if name is not None)
 
     def get_products(self) -> List[Dict]:
         """
@@ -36,7 +99,7 @@ class Database:
         Returns:
             List[Dict]: A list of dictionaries containing product details.
         """
-        with sqlite3.connect(self.db_name) as conn:
+        with get_connection(self.db_name) as conn:
             cursor = conn.cursor()
             cursor.execute(
                 """
@@ -52,35 +115,31 @@ class Database:
         """
         Classifies products based on the user's purchase history.
 
+        Products whose brand or category is in the history (directly, or as
+        the brand or category of a product named in it) are highly
+        recommended; in-stock products unrelated to it are not. Each bucket
+        holds the first BUCKET_SIZE products by product_id, selected and
+        ranked in SQL, so only those rows reach Python.
+
         Args:
             user_history (str): A comma-separated string of the user's purchase history.
 
         Returns:
             Dict[str, List[str]]: A dictionary with categorized product names.
         """
-        products = self.get_products()
         categories = {"Highly Recommended": [], "Recommended": [], "Not Recommended": []}
 
-        # Convert history into a list of brands and categories
+        # Convert history into a list of brands, categories and product names
         history_items = user_history.split(",") if user_history else []
 
-        for product in products:
-            if (
-                len(categories["Highly Recommended"]) >= 2
-                and len(categories["Recommended"]) >= 2
-                and len(categories["Not Recommended"]) >= 2
-            ):
-                break
-
-            if product["brand"] in history_items or product["category"] in history_items:
-                if len(categories["Highly Recommended"]) < 2:
-                    categories["Highly Recommended"].append(product["name"])
-            elif any(item in history_items for item in [product["brand"], product["category"]]):
-                if len(categories["Recommended"]) < 2:
-                    categories["Recommended"].append(product["name"])
-            else:
-                if len(categories["Not Recommended"]) < 2:
-                    categories["Not Recommended"].append(product["name"])
+        ensure_schema(self.db_name)
+        with get_connection(self.db_name) as conn:
+            cursor = conn.execute(
+                PRODUCT_BUCKETS_SQL,
+                {"history": json.dumps(history_items), "per_bucket": BUCKET_SIZE},
+            )
+            for bucket, name in cursor.fetchall():
+                categories[bucket].append(name)
 
         return categories
 
@@ -88,7 +147,7 @@ class Database:
         """
         Initializes the database with the required tables.
         """
-        with sqlite3.connect(self.db_name) as conn:
+        with get_connection(self.db_name) as conn:
             cursor = conn.cursor()
 
             # Create users table
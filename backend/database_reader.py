@@ -1,54 +1,59 @@
-from backend.deepseek_client import get_client
-from backend.database_reader import fetch_database_context  # Import the combined function
+from backend.catalog import get_catalog
+from backend.deadlines import Deadline
+from backend.deepseek_integration import fetch_user_history
+from backend.retrieval import CONTEXT_MODE, fetch_relevant_rows
+from backend.intent_router import answer_locally
+from backend.response_cache import make_cache_key
+from backend.llm import chat_completion
+from backend.prompt_builder import build_messages
 
-# Get the configured client
-client = get_client()
 
+INSTRUCTIONS = """You are an intelligent assistant for Makers Tech. Classify products into:
+- Highly Recommended: matches the brands or categories in the user's history.
+- Recommended: indirect or complementary relationship.
+- Not Recommended: no relevant connection."""
 
-def generate_response(user_message: str, user_id: int = None, db_name="store.db") -> dict:
+
+def generate_response(user_message: str, user_id: int = None, db_name="store.db", deadline: Deadline = None) -> dict:
     """
-    Generates a response based on the user's message and the complete database context.
+    Generates a response based on the user's message and the relevant database context.
 
     Args:
         user_message (str): User's natural language query.
         user_id (int, optional): User's ID.
         db_name (str): Name of the database.
+        deadline (Deadline, optional): The caller's deadline for the model call.
 
     Returns:
         dict: AI-generated response.
     """
     try:
-        # Retrieve the complete context from the database
-        database_context = fetch_database_context(db_name)
+        # Plain stock, price and product info queries are answered from the catalog
+        local_answer = answer_locally(user_message, db_name)
+        if local_answer:
+            return {"status": "success", "response": local_answer}
+
+        # Retrieve the products relevant to the message and the user's history
+        snapshot = get_catalog(db_name)
+        user_history = fetch_user_history(user_id, db_name) if user_id else ""
+        # In "full" mode the whole catalog goes into the static prompt prefix instead
+        full_catalog = snapshot if CONTEXT_MODE == "full" else None
+        rows = [] if full_catalog else fetch_relevant_rows(user_message, user_history, db_name)
 
         # Personalize the context if a user_id is provided
-        user_context = f"User ID: {user_id}\n" if user_id else "Unidentified user\n"
-
-        # Prepare the prompt
-        prompt = (
-            "You are an intelligent assistant for Makers Tech. Classify products into the following categories:\n"
-            "- Highly Recommended: Matches the user's history brands or categories.\n"
-            "- Recommended: Indirect or complementary relationship.\n"
-            "- Not Recommended: No relevant connection.\n\n"
-            f"{user_context}"
-            f"{database_context}\n\n"
-            "User's query:\n"
-            f"{user_message}\n"
-        )
+        user_context = f"User ID: {user_id}" if user_id else "Unidentified user"
 
-        # Send the prompt to the AI
-        response = client.chat.completions.create(
-            model="deepseek-chat",
-            messages=[
-                {"role": "system", "content": prompt},
-                {"role": "user", "content": user_message},
-            ],
-            max_tokens=500,
-            temperature=0.7,
+        # Send the prompt to the AI, reusing the answer to an identical earlier request
+        response = chat_completion(
+            messages=build_messages(INSTRUCTIONS, rows, user_message, user_context, snapshot=full_catalog),
+            cache_key=make_cache_key(
+                "reader", user_message, f"{user_id}:{user_history}", snapshot.version
+            ),
+            catalog_version=snapshot.version,
+            deadline=deadline,
         )
 
-        # Extract and return the response
-        return {"status": "success", "response": response.choices[0].message.content.strip()}
+        return {"status": "success", "response": response}
 
     except Exception as e:
         return {"status": "error", "message": f"Error generating the response: {e}"}
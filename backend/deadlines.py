@@ -0,0 +1,424 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+# Latency budget (seconds) of each endpoint, from the request to the answer
+ENDPOINT_BUDGETS = {
+    "chat": float(os.getenv("LLM_BUDGET_CHAT", "20")),
+    "stream": float(os.getenv("LLM_BUDGET_STREAM", "30")),
+    "recommendations": float(os.getenv("LLM_BUDGET_RECOMMENDATIONS", "30")),
+    "batch": float(os.getenv("LLM_BUDGET_BATCH", "120")),
+}
+DEFAULT_BUDGET = float(os.getenv("LLM_BUDGET_DEFAULT", "30"))
+
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "3"))
+# Send a duplicate request once the first one is slower than the observed p95
+LLM_HEDGE = os.getenv("LLM_HEDGE", "1") == "1"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+# Successful attempts observed before hedging starts, and how many are kept
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_LATENCY_WINDOW = int(os.getenv("LLM_LATENCY_WINDOW", "500"))
+# Threads running the first attempt of hedgeable calls, and the separate
+# threads running their duplicates; a hedge is skipped when all are busy
+LLM_ATTEMPT_WORKERS = int(os.getenv("LLM_ATTEMPT_WORKERS", "64"))
+LLM_HEDGE_WORKERS = int(os.getenv("LLM_HEDGE_WORKERS", "16"))
+
+logger = logging.getLogger(__name__)
+
+
+class DeadlineExceeded(TimeoutError):
+    """
+    Raised when the caller's deadline expires before the model answered.
+    """
+
+
+class Deadline:
+    """
+    Point in time by which a request must be answered.
+    """
+
+    def __init__(self, endpoint: str, budget: float = None):
+        self.endpoint = endpoint
+        self.budget = budget if budget is not None else ENDPOINT_BUDGETS.get(endpoint, DEFAULT_BUDGET)
+        self.expires_at = time.monotonic() + self.budget
+
+    def remaining(self) -> float:
+        """
+        Returns the seconds left, never negative.
+        """
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def check(self):
+        """
+        Raises DeadlineExceeded if no time is left.
+        """
+        if self.remaining() <= 0:
+            raise DeadlineExceeded(f"The {self.endpoint} deadline of {self.budget:.1f}s expired")
+
+
+class AttemptStats:
+    """
+    Per-endpoint timings of upstream attempts, including hedged duplicates.
+
+    The rolling window of successful attempt latencies also provides the p95
+    used to decide when to hedge.
+    """
+
+    def __init__(self, window: int = LLM_LATENCY_WINDOW):
+        self.window = window
+        self._endpoints = {}
+        self._recent = deque(maxlen=50)
+        self._lock = threading.Lock()
+
+    def _endpoint(self, endpoint: str) -> dict:
+        stats = self._endpoints.get(endpoint)
+        if stats is None:
+            stats = self._endpoints[endpoint] = {
+                "calls": 0,
+                "attempts": 0,
+                "retries": 0,
+                "hedges": 0,
+                "hedges_skipped": 0,
+                "hedge_wins": 0,
+                "failures": 0,
+                "deadline_exceeded": 0,
+                "latencies": deque(maxlen=self.window),
+            }
+        return stats
+
+    def record_attempt(self, endpoint: str, attempt: int, hedged: bool, duration: float, outcome: str):
+        with self._lock:
+            stats = self._endpoint(endpoint)
+            stats["attempts"] += 1
+            if hedged:
+                stats["hedges"] += 1
+            if outcome == "ok":
+                stats["latencies"].append(duration)
+            else:
+                stats["failures"] += 1
+            self._recent.append(
+                {
+                    "endpoint": endpoint,
+                    "attempt": attempt,
+                    "hedge": hedged,
+                    "duration": round(duration, 4),
+                    "outcome": outcome,
+                }
+            )
+        logger.debug("LLM attempt %s #%d%s: %.3fs %s", endpoint, attempt, " (hedge)" if hedged else "", duration, outcome)
+
+    def record_skipped_hedge(self, endpoint: str):
+        with self._lock:
+            self._endpoint(endpoint)["hedges_skipped"] += 1
+
+    def record_call(self, endpoint: str, retries: int = 0, hedge_won: bool = False, deadline_exceeded: bool = False):
+        with self._lock:
+            stats = self._endpoint(endpoint)
+            stats["calls"] += 1
+            stats["retries"] += retries
+            stats["hedge_wins"] += int(hedge_won)
+            stats["deadline_exceeded"] += int(deadline_exceeded)
+
+    def hedge_delay(self, endpoint: str):
+        """
+        Returns the observed latency percentile after which to hedge, or None.
+
+        Args:
+            endpoint (str): The endpoint making the call.
+
+        Returns:
+            float or None: Seconds to wait before hedging; None until enough samples exist.
+        """
+        with self._lock:
+            latencies = self._endpoint(endpoint)["latencies"]
+            if not LLM_HEDGE or len(latencies) < LLM_HEDGE_MIN_SAMPLES:
+                return None
+            return percentile(latencies, LLM_HEDGE_PERCENTILE)
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            endpoints = {}
+            for endpoint, stats in self._endpoints.items():
+                latencies = stats["latencies"]
+                summary = {key: value for key, value in stats.items() if key != "latencies"}
+                for p in (50, 95, 99):
+                    summary[f"p{p}"] = percentile(latencies, p) if latencies else None
+                endpoints[endpoint] = summary
+            return {"endpoints": endpoints, "recent_attempts": list(self._recent)}
+
+
+def percentile(values, p: float) -> float:
+    """
+    Nearest-rank percentile of a collection of numbers.
+    """
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * p // 100))
+    return ordered[int(rank) - 1]
+
+
+attempt_stats = AttemptStats()
+
+# Runs upstream attempts so a slow one can be hedged while it is still running.
+# Duplicates get their own threads so they never queue behind the attempts
+# they race; _hedge_slots counts the free ones.
+_executor = ThreadPoolExecutor(max_workers=LLM_ATTEMPT_WORKERS, thread_name_prefix="llm-attempt")
+_hedge_executor = ThreadPoolExecutor(max_workers=LLM_HEDGE_WORKERS, thread_name_prefix="llm-hedge")
+_hedge_slots = threading.BoundedSemaphore(LLM_HEDGE_WORKERS)
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Tells whether a failed attempt may succeed if sent again.
+
+    Args:
+        error (BaseException): The exception raised by the attempt.
+
+    Returns:
+        bool: True for timeouts, connection errors, rate limits and 5xx responses.
+    """
+    # Only reached after a model call, once the clients' libraries are loaded
+    import httpx
+    import openai
+
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    return isinstance(error, httpx.TransportError)
+
+
+def _retrying_options(deadline: Deadline) -> dict:
+    from tenacity import retry_if_exception, stop_after_attempt, stop_before_delay, wait_exponential_jitter
+
+    return {
+        "stop": stop_after_attempt(LLM_MAX_ATTEMPTS) | stop_before_delay(deadline.remaining()),
+        "wait": wait_exponential_jitter(initial=0.1, max=2.0),
+        "retry": retry_if_exception(is_retryable),
+        "reraise": True,
+    }
+
+
+def _outcome(error: BaseException) -> str:
+    return "ok" if error is None else type(error).__name__
+
+
+def _fail(deadline: Deadline, retries: int, error: Exception):
+    """
+    Records a failed call and re-raises its error, as DeadlineExceeded if time ran out.
+    """
+    expired = isinstance(error, DeadlineExceeded) or deadline.remaining() <= 0
+    attempt_stats.record_call(deadline.endpoint, retries, deadline_exceeded=expired)
+    if expired and not isinstance(error, DeadlineExceeded):
+        raise DeadlineExceeded(
+            f"The {deadline.endpoint} deadline of {deadline.budget:.1f}s expired: {error}"
+        ) from error
+    raise error
+
+
+def call_with_deadline(fn, deadline: Deadline, hedge: bool = True):
+    """
+    Calls the model within a deadline, with retries and hedging.
+
+    `fn(timeout)` performs one upstream attempt and must give up after
+    `timeout` seconds. Retryable failures are retried with jittered backoff
+    while the deadline allows. Within an attempt, if the first request is
+    still running after the observed p95 latency, a duplicate is sent and
+    the first answer wins.
+
+    The p95 wait starts once the first request is running, not while it
+    queues for an attempt thread. Duplicates run on their own
+    LLM_HEDGE_WORKERS threads; when all of them are busy the process is
+    already saturated, so the duplicate is skipped (counted as
+    "hedges_skipped") instead of queueing and adding load.
+
+    Args:
+        fn (callable): Function performing one upstream request.
+        deadline (Deadline): The caller's deadline.
+        hedge (bool): Whether slow attempts may be hedged.
+
+    Returns:
+        The value returned by `fn`.
+
+    Raises:
+        DeadlineExceeded: If the deadline expires before an attempt succeeds.
+    """
+    endpoint = deadline.endpoint
+    state = {"hedge_won": False}
+
+    def attempt(number: int, hedged: bool):
+        # Queued past the deadline: nobody is waiting for this request any more
+        if deadline.remaining() <= 0:
+            raise DeadlineExceeded(f"The {endpoint} deadline of {deadline.budget:.1f}s expired")
+        start = time.monotonic()
+        error = None
+        try:
+            return fn(deadline.remaining())
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            attempt_stats.record_attempt(endpoint, number, hedged, time.monotonic() - start, _outcome(error))
+
+    def hedged_attempt(number: int):
+        deadline.check()
+        delay = attempt_stats.hedge_delay(endpoint) if hedge else None
+        if delay is None:
+            # Nothing to race against: the request's own timeout enforces the deadline
+            return attempt(number, False)
+
+        started = threading.Event()
+
+        def first_attempt():
+            started.set()
+            return attempt(number, False)
+
+        def duplicate_attempt():
+            try:
+                return attempt(number, True)
+            finally:
+                _hedge_slots.release()
+
+        futures = [_executor.submit(first_attempt)]
+        try:
+            started.wait(deadline.remaining())
+            done, _ = wait(futures, timeout=min(delay, deadline.remaining()))
+            if not done and deadline.remaining() > 0:
+                if _hedge_slots.acquire(blocking=False):
+                    futures.append(_hedge_executor.submit(duplicate_attempt))
+                else:
+                    attempt_stats.record_skipped_hedge(endpoint)
+
+            # First successful answer wins; a failure only counts once both failed
+            pending = set(futures)
+            error = None
+            while pending:
+                done, pending = wait(pending, timeout=deadline.remaining(), return_when=FIRST_COMPLETED)
+                if not done:
+                    break
+                for future in done:
+                    if future.exception() is None:
+                        state["hedge_won"] = future is not futures[0]
+                        return future.result()
+                    error = future.exception()
+            if error is not None and not pending:
+                raise error
+            raise DeadlineExceeded(f"The {endpoint} deadline of {deadline.budget:.1f}s expired")
+        finally:
+            # Attempts still queued are dropped; a dropped duplicate gives its slot back
+            for future in futures[1:]:
+                if future.cancel():
+                    _hedge_slots.release()
+            futures[0].cancel()
+
+    from tenacity import Retrying
+
+    retries = 0
+    try:
+        for manager in Retrying(**_retrying_options(deadline)):
+            with manager:
+                number = manager.retry_state.attempt_number
+                retries = number - 1
+                result = hedged_attempt(number)
+    except Exception as e:
+        _fail(deadline, retries, e)
+    attempt_stats.record_call(endpoint, retries, hedge_won=state["hedge_won"])
+    return result
+
+
+async def call_with_deadline_async(fn, deadline: Deadline, hedge: bool = True):
+    """
+    Asynchronous variant of call_with_deadline.
+
+    `fn(timeout)` returns the awaitable performing one upstream attempt. The
+    losing request of a hedged attempt is cancelled.
+
+    Args:
+        fn (callable): Function returning the awaitable of one upstream request.
+        deadline (Deadline): The caller's deadline.
+        hedge (bool): Whether slow attempts may be hedged.
+
+    Returns:
+        The value the awaitable resolves to.
+
+    Raises:
+        DeadlineExceeded: If the deadline expires before an attempt succeeds.
+    """
+    endpoint = deadline.endpoint
+    state = {"hedge_won": False}
+
+    async def attempt(number: int, hedged: bool):
+        start = time.monotonic()
+        error = None
+        try:
+            return await fn(deadline.remaining())
+        except asyncio.CancelledError:
+            error = asyncio.CancelledError()
+            raise
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            attempt_stats.record_attempt(endpoint, number, hedged, time.monotonic() - start, _outcome(error))
+
+    async def hedged_attempt(number: int):
+        deadline.check()
+        delay = attempt_stats.hedge_delay(endpoint) if hedge else None
+        if delay is None:
+            return await attempt(number, False)
+
+        tasks = [asyncio.ensure_future(attempt(number, False))]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=min(delay, deadline.remaining()))
+            if not done and deadline.remaining() > 0:
+                tasks.append(asyncio.ensure_future(attempt(number, True)))
+
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, timeout=deadline.remaining(), return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    break
+                for task in done:
+                    if task.exception() is None:
+                        state["hedge_won"] = task is not tasks[0]
+                        return task.result()
+                    error = task.exception()
+            if error is not None and not pending:
+                raise error
+            raise DeadlineExceeded(f"The {endpoint} deadline of {deadline.budget:.1f}s expired")
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    from tenacity import AsyncRetrying
+
+    retries = 0
+    try:
+        async for manager in AsyncRetrying(**_retrying_options(deadline)):
+            with manager:
+                number = manager.retry_state.attempt_number
+                retries = number - 1
+                result = await hedged_attempt(number)
+    except Exception as e:
+        _fail(deadline, retries, e)
+    attempt_stats.record_call(endpoint, retries, hedge_won=state["hedge_won"])
+    return result
+
+
+def deadline_stats() -> dict:
+    """
+    Returns the per-endpoint attempt timings and the most recent attempts.
+
+    Returns:
+        dict: Calls, attempts, retries, hedges, failures and latency percentiles per endpoint.
+    """
+    return attempt_stats.as_dict()
@@ -1,27 +1,109 @@
-from openai import OpenAI
-from dotenv import load_dotenv
+import itertools
 import os
+import threading
 
-# Load variables from the .env file
-load_dotenv()
+# DeepSeek API URL, overridable to point at a local stub server
+DEFAULT_BASE_URL = "https://api.deepseek.com"
 
-# Retrieve the API Key from the .env file
-api_key = os.getenv("DEEPSEEK_API_KEY")
+# Connection pool and timeouts of the asynchronous client
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "500"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "500"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "30"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_POOL_SHARDS = int(os.getenv("LLM_POOL_SHARDS", "16"))
 
-# Configure the API client
-client = OpenAI(
-    api_key=api_key,  # Use the API Key from .env
-    base_url="https://api.deepseek.com",  # DeepSeek API URL
-)
+# The clients are created on first use: importing the backend neither loads
+# the OpenAI SDK nor requires an API key until a request needs the model.
+# The async clients are also bound to the event loop of the async server.
+client = None
+async_clients = []
+_next_async_client = None
+_client_lock = threading.Lock()
 
 
-def get_client():
+def get_credentials() -> tuple:
     """
-    Returns a configured client instance to be used in other modules.
+    Returns the API key and URL, loading the .env file if the key isn't set yet.
 
     Raises:
         ValueError: If the API Key is not found in the .env file.
     """
+    if not os.getenv("DEEPSEEK_API_KEY"):
+        from dotenv import load_dotenv
+
+        # Load variables from the .env file
+        load_dotenv()
+
+    api_key = os.getenv("DEEPSEEK_API_KEY")
     if not api_key:
         raise ValueError("API Key not found. Make sure it is set in the .env file.")
+    return api_key, os.getenv("DEEPSEEK_BASE_URL", DEFAULT_BASE_URL)
+
+
+def get_client():
+    """
+    Returns a configured client instance to be used in other modules.
+
+    Raises:
+        ValueError: If the API Key is not found in the .env file.
+    """
+    global client
+    if client is None:
+        with _client_lock:
+            if client is None:
+                from openai import OpenAI
+
+                api_key, base_url = get_credentials()
+                # Configure the API client
+                client = OpenAI(api_key=api_key, base_url=base_url)
     return client
+
+
+def get_async_client():
+    """
+    Returns a shared asynchronous HTTP client used by the async serving path.
+
+    Requests share a few httpx connection pools with explicit limits, so a
+    single process can keep hundreds of model calls in flight over reused
+    keep-alive connections. The connections are split across LLM_POOL_SHARDS
+    pools picked round-robin, because httpcore scans its whole pool on every
+    request and one large pool becomes the bottleneck. The clients talk to the
+    OpenAI-compatible REST endpoint directly: the SDK's request/response
+    models cost more CPU per call than the whole rest of the request.
+
+    Raises:
+        ValueError: If the API Key is not found in the .env file.
+    """
+    global _next_async_client
+    if not async_clients:
+        import httpx
+
+        api_key, base_url = get_credentials()
+        shards = max(1, min(LLM_POOL_SHARDS, LLM_MAX_CONNECTIONS))
+        for _ in range(shards):
+            async_clients.append(
+                httpx.AsyncClient(
+                    base_url=base_url,
+                    headers={"Authorization": f"Bearer {api_key}"},
+                    limits=httpx.Limits(
+                        max_connections=max(1, LLM_MAX_CONNECTIONS // shards),
+                        max_keepalive_connections=max(1, LLM_MAX_KEEPALIVE // shards),
+                        keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+                    ),
+                    timeout=httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+                )
+            )
+        _next_async_client = itertools.cycle(async_clients)
+    return next(_next_async_client)
+
+
+async def close_async_client():
+    """
+    Closes the asynchronous clients and their connection pools, if they were created.
+    """
+    global _next_async_client
+    for async_client in async_clients:
+        await async_client.aclose()
+    async_clients.clear()
+    _next_async_client = None
@@ -1,12 +1,44 @@
-from backend.deepseek_client import get_client
-import sqlite3
-
-# Get the configured client
-client = get_client()
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from backend.catalog import CatalogSnapshot, get_catalog
+from backend.classifier import BrandCategoryIndex, classify_products_indexed
+from backend.connection import get_connection
+from backend.conversations import conversations
+from backend.deadlines import Deadline
+from backend.retrieval import CONTEXT_MODE, fetch_relevant_rows
+from backend.intent_router import answer_locally
+from backend.response_cache import make_cache_key
+from backend.llm import chat_completion, chat_completion_async, stream_chat_completion
+from backend.migrations import ensure_schema
+from backend.prompt_builder import build_messages
 
 
 DB_NAME = "store.db"
 
+# Model calls in flight per batch request, and the largest batch accepted
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "100"))
+
+# Response formats for each type of query
+INSTRUCTIONS = """You are the Makers Tech assistant. Be concise and answer only what was asked, using these formats:
+- Stock: "The [Product] has [X] units in stock."
+- Price: "The [Product] costs $[Price]."
+- Product info: "[Product]: [Category] by [Brand], priced at $[Price] with [X] units in stock."
+- Recommendations: say they are based on the purchase history, then use exactly this markdown (the only markdown allowed), with a short reason per product:
+----
+## Highly Recommended:
+- [Product]: [brand/category match]
+## Recommended:
+- [Product]: [related category or complementary use]
+## Not Recommended:
+- [Product]: [why it doesn't fit the user]
+----
+Highly Recommended: in stock, brand or category from the history, or complementary to a purchase.
+Recommended: in stock, related category or generic complement, any brand.
+Not Recommended: unrelated to the user's brands/categories or without clear use for them."""
+
 
 def fetch_user_history(user_id: int, db_name=DB_NAME) -> str:
     """
@@ -17,16 +49,41 @@ def fetch_user_history(user_id: int, db_name=DB_NAME) -> str:
         db_name (str): The name of the database.
 
     Returns:
-        str: The user's purchase history as a string.
+        str: The names of the products the user bought, comma-separated, oldest first.
+    """
+    return fetch_user_histories([user_id], db_name).get(user_id, "")
+
+
+def fetch_user_histories(user_ids, db_name=DB_NAME) -> dict:
     """
-    conn = sqlite3.connect(db_name)
-    cursor = conn.cursor()
+    Queries the purchase histories of several users at once.
 
-    cursor.execute("SELECT purchase_history FROM users WHERE user_id = ?;", (user_id,))
-    result = cursor.fetchone()
-    conn.close()
+    Args:
+        user_ids (iterable): The users' IDs.
+        db_name (str): The name of the database.
 
-    return result[0] if result else ""
+    Returns:
+        dict: Purchase history by user ID; users without purchases are missing.
+    """
+    user_ids = sorted({user_id for user_id in user_ids if user_id})
+    if not user_ids:
+        return {}
+
+    ensure_schema(db_name)
+    rows = get_connection(db_name).execute(
+        f"""
+        SELECT up.user_id, COALESCE(p.name, up.item_name)
+        FROM user_purchases up LEFT JOIN products p ON p.product_id = up.product_id
+        WHERE up.user_id IN ({', '.join('?' * len(user_ids))})
+        ORDER BY up.user_id, up.ts;
+        """,
+        user_ids,
+    ).fetchall()
+
+    names = {}
+    for user_id, name in rows:
+        names.setdefault(user_id, []).append(name)
+    return {user_id: ", ".join(products) for user_id, products in names.items()}
 
 
 def fetch_inventory(db_name=DB_NAME) -> list:
@@ -39,72 +96,134 @@ def fetch_inventory(db_name=DB_NAME) -> list:
     Returns:
         list: A list of inventory products.
     """
-    conn = sqlite3.connect(db_name)
-    cursor = conn.cursor()
+    cursor = get_connection(db_name).cursor()
 
     cursor.execute("SELECT name, category, brand, price, stock FROM products;")
     products = cursor.fetchall()
-    conn.close()
 
     return products
 
 
-def classify_products(user_history: str, inventory: list) -> dict:
+def classify_products(user_history: str, inventory: list = None, db_name=DB_NAME) -> dict:
     """
     Classifies products into categories based on the user's purchase history.
 
+    Brands and categories are matched as whole words through
+    backend.classifier's inverted index: the one of the current catalog
+    version, or one built over `inventory` when it is given.
+
     Args:
         user_history (str): The user's purchase history.
-        inventory (list): The inventory products list.
+        inventory (list, optional): (name, category, brand, price, stock) rows,
+            as returned by fetch_inventory; the current catalog by default.
+        db_name (str): The name of the database.
 
     Returns:
         dict: Products categorized into specific groups.
     """
-    categories = {"Highly Recommended": [], "Recommended": [], "Not Recommended": []}
-
-    for product in inventory:
-        name, category, brand, _, stock = product
-        if stock <= 0:
-            continue  # Skip out-of-stock items
-
-        if brand in user_history or category in user_history:
-            categories["Highly Recommended"].append(name)
-        elif any(item in user_history for item in [brand, category]):
-            categories["Recommended"].append(name)
-        else:
-            categories["Not Recommended"].append(name)
-
-    return categories
+    if inventory is None:
+        return classify_products_indexed(user_history, db_name)
+    rows = [
+        {"name": name, "category": category, "brand": brand, "stock": stock}
+        for name, category, brand, _, stock in inventory
+    ]
+    return BrandCategoryIndex(rows).classify(user_history)
 
 
 def fetch_database_context(db_name=DB_NAME) -> str:
     """
     Retrieves the full database context to be used for queries.
 
+    The context is served from the process-wide catalog snapshot and is only
+    rebuilt when the products table changes.
+
     Args:
         db_name (str): The name of the database.
 
     Returns:
         str: The database context as a formatted string.
     """
-    conn = sqlite3.connect(db_name)
-    cursor = conn.cursor()
+    return get_catalog(db_name).context
 
-    # Adjust the query to retrieve the necessary context
-    cursor.execute("SELECT name, category, brand, price, stock FROM products;")
-    products = cursor.fetchall()
-    conn.close()
 
-    # Format the database context
-    database_context = "\n".join(
-        f"{name} ({category} - {brand}): Price ${price}, Stock: {stock}"
-        for name, category, brand, price, stock in products
-    )
+def build_request(
+    user_message: str,
+    user_id: int = None,
+    db_name=DB_NAME,
+    snapshot: CatalogSnapshot = None,
+    user_history: str = None,
+    history: list = None,
+) -> dict:
+    """
+    Builds the model request for a message that couldn't be answered locally.
 
-    return database_context
+    Args:
+        user_message (str): The user's natural language query.
+        user_id (int, optional): The user's ID.
+        db_name (str): The name of the database.
+        snapshot (CatalogSnapshot, optional): Catalog snapshot already read by the caller.
+        user_history (str, optional): Purchase history already read by the caller.
+        history (list, optional): Earlier messages of the conversation.
 
+    Returns:
+        dict: The chat messages, the response cache key and the catalog version.
+    """
+    # Retrieve the products relevant to the message and the user's history
+    if snapshot is None:
+        snapshot = get_catalog(db_name)
+    if user_history is None:
+        user_history = fetch_user_history(user_id, db_name) if user_id else ""
+    # In "full" mode the whole catalog goes into the static prompt prefix instead
+    full_catalog = snapshot if CONTEXT_MODE == "full" else None
+    # A follow-up question is searched together with the previous one, so
+    # "and how much is it?" still finds the product talked about
+    previous = [message["content"] for message in history or [] if message["role"] == "user"]
+    query = f"{previous[-1]} {user_message}" if previous else user_message
+    rows = [] if full_catalog else fetch_relevant_rows(query, user_history, db_name)
+    user_context = f"Purchase history: {user_history}" if user_history else "No purchase history."
+
+    return {
+        "messages": build_messages(
+            INSTRUCTIONS, rows, user_message, user_context, snapshot=full_catalog, history=history
+        ),
+        "cache_key": make_cache_key(
+            "integration",
+            user_message,
+            f"{user_id}:{user_history}:{conversations.digest(history)}",
+            snapshot.version,
+        ),
+        "catalog_version": snapshot.version,
+    }
+
+
+def conversation_request(user_message: str, user_id: int = None, db_name=DB_NAME, session_id: str = None) -> tuple:
+    """
+    Builds the model request of a message within its conversation, if any.
+
+    Args:
+        user_message (str): The user's natural language query.
+        user_id (int, optional): The user's ID.
+        db_name (str): The name of the database.
+        session_id (str, optional): The chat session; None for a stateless request.
 
-def generate_response(user_message: str, user_id: int = None, db_name=DB_NAME) -> dict:
+    Returns:
+        tuple: The model request and the session's Conversation (None without a session).
+    """
+    conversation = conversations.get(session_id, user_id) if session_id else None
+    history = conversations.history(conversation) if conversation else None
+    request = build_request(user_message, user_id, db_name, history=history)
+    if conversation:
+        conversations.record_prompt(conversation, request["messages"])
+    return request, conversation
+
+
+def generate_response(
+    user_message: str,
+    user_id: int = None,
+    db_name=DB_NAME,
+    deadline: Deadline = None,
+    session_id: str = None,
+) -> dict:
     """
     Generates a response based on the user's message and the database context.
 
@@ -112,104 +231,182 @@ def generate_response(user_message: str, user_id: int = None, db_name=DB_NAME) -
         user_message (str): The user's natural language query.
         user_id (int, optional): The user's ID.
         db_name (str): The name of the database.
+        deadline (Deadline, optional): The caller's deadline for the model call.
+        session_id (str, optional): The chat session the message belongs to.
+
+    Returns:
+        dict: The AI-generated response.
+    """
+    try:
+        # Plain stock, price and product info queries are answered from the catalog
+        local_answer = answer_locally(user_message, db_name)
+        if local_answer:
+            if session_id:
+                conversations.record(conversations.get(session_id, user_id), user_message, local_answer)
+            return {"status": "success", "response": local_answer}
+
+        # Send the prompt to the AI, reusing the answer to an identical earlier request
+        request, conversation = conversation_request(user_message, user_id, db_name, session_id)
+        response = chat_completion(**request, deadline=deadline)
+        if conversation:
+            conversations.record(conversation, user_message, response)
+
+        return {"status": "success", "response": response}
+
+    except Exception as e:
+        return {"status": "error", "message": f"Error generating the response: {e}"}
+
+
+def generate_response_stream(
+    user_message: str,
+    user_id: int = None,
+    db_name=DB_NAME,
+    deadline: Deadline = None,
+    session_id: str = None,
+):
+    """
+    Streams a response based on the user's message and the database context.
+
+    Args:
+        user_message (str): The user's natural language query.
+        user_id (int, optional): The user's ID.
+        db_name (str): The name of the database.
+        deadline (Deadline, optional): The caller's deadline for the model call.
+        session_id (str, optional): The chat session the message belongs to.
+
+    Yields:
+        str: Pieces of the response as soon as the model produces them.
+    """
+    local_answer = answer_locally(user_message, db_name)
+    if local_answer:
+        if session_id:
+            conversations.record(conversations.get(session_id, user_id), user_message, local_answer)
+        yield local_answer
+        return
+
+    request, conversation = conversation_request(user_message, user_id, db_name, session_id)
+    pieces = []
+    for delta in stream_chat_completion(**request, deadline=deadline):
+        pieces.append(delta)
+        yield delta
+    # Only complete answers become part of the conversation
+    if conversation:
+        conversations.record(conversation, user_message, "".join(pieces))
+
+
+def _route(user_message: str, user_id: int, db_name, session_id: str) -> tuple:
+    """
+    Answers a message locally, or builds the model request for it.
+
+    Returns:
+        tuple: The local answer, or None with the request and the conversation
+        of conversation_request.
+    """
+    local_answer = answer_locally(user_message, db_name)
+    if local_answer:
+        return local_answer, None, None
+    return (None, *conversation_request(user_message, user_id, db_name, session_id))
+
+
+async def generate_response_async(
+    user_message: str,
+    user_id: int = None,
+    db_name=DB_NAME,
+    deadline: Deadline = None,
+    session_id: str = None,
+) -> dict:
+    """
+    Asynchronous variant of generate_response for the async serving path.
+
+    Routing and prompt building read SQLite and, after a catalog change,
+    rebuild the catalog snapshot and its search index, so they run in a
+    worker thread instead of stalling the event loop; the model call is
+    awaited.
+
+    Args:
+        user_message (str): The user's natural language query.
+        user_id (int, optional): The user's ID.
+        db_name (str): The name of the database.
+        deadline (Deadline, optional): The caller's deadline for the model call.
+        session_id (str, optional): The chat session the message belongs to.
 
     Returns:
         dict: The AI-generated response.
     """
     try:
-        # Retrieve the database context
-        database_context = fetch_database_context(db_name)
-        
-        # Preparar el prompt con instrucciones específicas para diferentes tipos de consultas
-        prompt = """
-        You are a Makers Tech assistant. Follow these specific response formats based on the type of query:
-
-        1. For stock queries (when users ask about quantity or availability):
-        Response format: "The [Product Name] has [X] units in stock."
-        Example: "The MacBook Pro has 15 units in stock."
-
-        2. For price queries:
-        Response format: "The [Product Name] costs $[Price]."
-        Example: "The iPhone 13 costs $999."
-
-        3. For product recommendations, strictly follow these classification criteria and format:
-
-        When providing recommendations, ALWAYS use this EXACT markdown format with separators:
-        say that given the purchase history, give the user recommendations for products that are highly recommended, recommended and not recommended.
-        and explain why each product is recommended or not recommended.
-        explain that the recomenendations are based on the purchase history.
-        ----
-
-        ## Highly Recommended:
-        - [Product 1]: [Brief reason with specific details about brand/category match]
-        - [Product 2]: [Brief reason with specific details about brand/category match]
-
-        ## Recommended:
-        - [Product 1]: [Brief reason explaining the related category or complementary use]
-        - [Product 2]: [Brief reason explaining the related category or complementary use]
-
-        ## Not Recommended:
-        - [Product 1]: [Brief reason explaining why it doesn't match user preferences]
-        - [Product 2]: [Brief reason explaining why it doesn't match user preferences]
-        ----
-
-        Classification criteria:
-        - Highly Recommended:
-          * Products from brands the user has already purchased
-          * Products in categories from user's history
-          * Complementary products to existing purchases
-          * Must be in stock
-
-        - Recommended:
-          * Products from related categories
-          * Generic complementary products
-          * Can be from different brands
-          * Must be in stock
-
-        - Not Recommended:
-          * Products unrelated to user's brands/categories
-          * Non-complementary items
-          * Products without clear utility for user's needs
-
-        4. For general product information:
-        Response format: "[Product Name]: [Category] by [Brand], priced at $[Price] with [X] units in stock."
-        Example: "MacBook Pro: Laptop by Apple, priced at $1299 with 15 units in stock."
-
-        Available product information:
-        {database_context}
-
-        User message:
-        {user_message}
-
-        Remember to:
-        1. Be concise and direct
-        2. Use the exact format specified for each type of query
-        3. Use markdown formatting ONLY for recommendations section
-        4. Always include the ---- separators and ## headers in recommendations
-        5. Provide only the information that was asked for
-        """
-
-        # Send the prompt to the AI
-        response = client.chat.completions.create(
-            model="deepseek-chat",
-            messages=[
-                {"role": "system", "content": prompt.format(
-                    database_context=database_context,
-                    user_message=user_message
-                )},
-                {"role": "user", "content": user_message}
-            ],
-            max_tokens=500,
-            temperature=0.7,
+        local_answer, request, conversation = await asyncio.to_thread(
+            _route, user_message, user_id, db_name, session_id
         )
+        if local_answer:
+            if session_id:
+                conversations.record(conversations.get(session_id, user_id), user_message, local_answer)
+            return {"status": "success", "response": local_answer}
 
-        # Extract and return the response
-        return {"status": "success", "response": response.choices[0].message.content.strip()}
+        response = await chat_completion_async(**request, deadline=deadline)
+        if conversation:
+            conversations.record(conversation, user_message, response)
+
+        return {"status": "success", "response": response}
 
     except Exception as e:
         return {"status": "error", "message": f"Error generating the response: {e}"}
 
 
+def generate_batch(items: list, db_name=DB_NAME, deadline: Deadline = None, concurrency: int = BATCH_CONCURRENCY):
+    """
+    Generates the responses of several messages, calling the model concurrently.
+
+    The catalog snapshot and the purchase histories are read once for the
+    whole batch. Messages answered locally are yielded first; the others are
+    sent to the model with at most `concurrency` calls in flight, and yielded
+    as they complete.
+
+    Args:
+        items (list): Dictionaries with a "message" and an optional "user_id".
+        db_name (str): The name of the database.
+        deadline (Deadline, optional): The deadline of the whole batch.
+        concurrency (int): Maximum number of concurrent model calls.
+
+    Yields:
+        tuple: The index of the item and its response, in the format of generate_response.
+    """
+    deadline = deadline or Deadline("batch")
+    snapshot = get_catalog(db_name)
+    histories = fetch_user_histories((item.get("user_id") for item in items), db_name)
+
+    requests = {}
+    for index, item in enumerate(items):
+        try:
+            local_answer = answer_locally(item["message"], db_name)
+            if local_answer:
+                yield index, {"status": "success", "response": local_answer}
+                continue
+            user_id = item.get("user_id")
+            requests[index] = build_request(
+                item["message"], user_id, db_name, snapshot, histories.get(user_id, "")
+            )
+        except Exception as e:
+            yield index, {"status": "error", "message": f"Error generating the response: {e}"}
+
+    if not requests:
+        return
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(requests))))
+    try:
+        futures = {
+            executor.submit(chat_completion, **request, deadline=deadline): index
+            for index, request in requests.items()
+        }
+        for future in as_completed(futures):
+            try:
+                yield futures[future], {"status": "success", "response": future.result()}
+            except Exception as e:
+                yield futures[future], {"status": "error", "message": f"Error generating the response: {e}"}
+    finally:
+        # Calls not started yet are dropped if the client goes away
+        executor.shutdown(cancel_futures=True)
+
+
 # Direct test
 if __name__ == "__main__":
     user_id = int(input("Enter your user ID: "))
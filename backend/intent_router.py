@@ -0,0 +1,220 @@
+import re
+import threading
+
+from backend.catalog import DB_NAME, CatalogSnapshot, get_catalog
+from backend.retrieval import tokenize
+
+
+# Keywords used to detect each query type. Recommendation-style or
+# comparative wording always goes to the model.
+STOCK_PATTERN = re.compile(
+    r"\b(in stock|stock|how many|units|available|availability|do you have|left)\b"
+)
+PRICE_PATTERN = re.compile(r"\b(price|prices|cost|costs|how much|priced)\b")
+INFO_PATTERN = re.compile(
+    r"\b(tell me about|info|information|details|describe|what is|what's)\b"
+)
+MODEL_PATTERN = re.compile(
+    r"\b(recommend\w*|suggest\w*|should i|best|better|compare|comparison|vs|versus|"
+    r"alternative\w*|similar|cheaper|cheapest|why|history)\b"
+)
+
+
+class RouterStats:
+    """
+    Counts how many requests were answered locally.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.local = 0
+        self._lock = threading.Lock()
+
+    def record(self, served_locally: bool):
+        with self._lock:
+            self.total += 1
+            if served_locally:
+                self.local += 1
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "total": self.total,
+                "local": self.local,
+                "local_fraction": self.local / self.total if self.total else 0.0,
+            }
+
+
+stats = RouterStats()
+
+
+def detect_intent(user_message: str):
+    """
+    Detects whether a message is a plain stock, price or product info query.
+
+    Args:
+        user_message (str): The user's natural language query.
+
+    Returns:
+        str or None: "stock", "price", "info", or None if the model should answer.
+    """
+    text = user_message.lower()
+    if MODEL_PATTERN.search(text):
+        return None
+
+    wants_stock = bool(STOCK_PATTERN.search(text))
+    price_words = {match.group(0) for match in PRICE_PATTERN.finditer(text)}
+    wants_price = bool(price_words)
+
+    # "how much" alone is a price query, but "how much stock" is a stock one.
+    # Any other price word keeps both intents, and the model answers.
+    if wants_stock and price_words == {"how much"}:
+        wants_price = False
+
+    if wants_stock and not wants_price:
+        return "stock"
+    if wants_price and not wants_stock:
+        return "price"
+    if not wants_stock and not wants_price and INFO_PATTERN.search(text):
+        return "info"
+    return None
+
+
+def build_name_index(snapshot: CatalogSnapshot) -> dict:
+    """
+    Maps each product name term to the positions of the products using it.
+
+    Args:
+        snapshot (CatalogSnapshot): The catalog to index.
+
+    Returns:
+        dict: term -> set of row positions in snapshot.rows
+    """
+    index = {}
+    for position, row in enumerate(snapshot.rows):
+        for term in set(tokenize(row["name"])):
+            index.setdefault(term, set()).add(position)
+    return index
+
+
+def names_product(terms: set, product: dict) -> bool:
+    """
+    Tells whether a message names a product rather than sharing a word with it.
+
+    The message must contain every model term of the name, i.e. the name
+    without the brand ("pixel 7" for "Google Pixel 7"), or the brand and
+    every model number ("samsung t7"). A common word such as "air", "pro"
+    or "portable" is not enough.
+
+    Args:
+        terms (set): The terms of the message.
+        product (dict): The product row.
+
+    Returns:
+        bool: True if the message names the product.
+    """
+    name_terms = set(tokenize(product["name"]))
+    brand_terms = set(tokenize(product["brand"]))
+    model_terms = (name_terms - brand_terms) or name_terms
+    if model_terms <= terms:
+        return True
+    numbers = {term for term in model_terms if any(char.isdigit() for char in term)}
+    return bool(numbers) and numbers <= terms and brand_terms <= terms
+
+
+def resolve_product(user_message: str, snapshot: CatalogSnapshot):
+    """
+    Finds the single product a message refers to.
+
+    Only products the message names (see names_product) are candidates; of
+    those, the one whose name shares the most terms with the message wins.
+    Ties mean the message is ambiguous, so nothing is returned. A model
+    number in the message that the winner doesn't have (e.g. "iPhone 15"
+    when only the "iPhone 14 Pro" exists) also rejects the match.
+
+    Args:
+        user_message (str): The user's natural language query.
+        snapshot (CatalogSnapshot): The catalog to search.
+
+    Returns:
+        dict or None: The product row, or None if no single product matches.
+    """
+    index = snapshot.derived("name_terms", build_name_index)
+    terms = set(tokenize(user_message))
+    overlap = {}
+    for term in terms:
+        for position in index.get(term, ()):
+            overlap[position] = overlap.get(position, 0) + 1
+    overlap = {
+        position: count for position, count in overlap.items() if names_product(terms, snapshot.rows[position])
+    }
+    if not overlap:
+        return None
+
+    best = max(overlap.values())
+    candidates = [position for position, count in overlap.items() if count == best]
+    if len(candidates) != 1:
+        return None
+
+    product = snapshot.rows[candidates[0]]
+    name_terms = set(tokenize(product["name"]))
+    if any(term not in name_terms for term in terms if any(char.isdigit() for char in term)):
+        return None
+    return product
+
+
+def format_price(price: float) -> str:
+    return f"{price:.0f}" if float(price).is_integer() else f"{price:.2f}"
+
+
+def format_answer(intent: str, product: dict) -> str:
+    """
+    Renders the templated answer for a query type.
+
+    Args:
+        intent (str): "stock", "price" or "info".
+        product (dict): The product row.
+
+    Returns:
+        str: The answer, in the same format the model is instructed to use.
+    """
+    if intent == "stock":
+        return f"The {product['name']} has {product['stock']} units in stock."
+    if intent == "price":
+        return f"The {product['name']} costs ${format_price(product['price'])}."
+    return (
+        f"{product['name']}: {product['category']} by {product['brand']}, "
+        f"priced at ${format_price(product['price'])} with {product['stock']} units in stock."
+    )
+
+
+def answer_locally(user_message: str, db_name=DB_NAME):
+    """
+    Answers stock, price and product info queries straight from the catalog.
+
+    Args:
+        user_message (str): The user's natural language query.
+        db_name (str): The name of the database.
+
+    Returns:
+        str or None: The templated answer, or None if the model should answer.
+    """
+    answer = None
+    intent = detect_intent(user_message)
+    if intent:
+        product = resolve_product(user_message, get_catalog(db_name))
+        if product:
+            answer = format_answer(intent, product)
+
+    stats.record(answer is not None)
+    return answer
+
+
+def router_stats() -> dict:
+    """
+    Returns how many requests were served without calling the model.
+
+    Returns:
+        dict: Total requests, local answers and the local fraction.
+    """
+    return stats.as_dict()
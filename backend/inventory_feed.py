@@ -0,0 +1,138 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.catalog import DB_NAME
+from backend.connection import get_connection
+from backend.migrations import ensure_schema
+
+
+INVENTORY_CHANGES_LIMIT = int(os.getenv("INVENTORY_CHANGES_LIMIT", "500"))
+INVENTORY_CHANGES_MAX_LIMIT = int(os.getenv("INVENTORY_CHANGES_MAX_LIMIT", "5000"))
+# Longest a long-poll request waits for a change, in seconds
+INVENTORY_LONG_POLL_MAX = float(os.getenv("INVENTORY_LONG_POLL_MAX", "30"))
+# How often a waiting request checks whether the database changed
+INVENTORY_POLL_INTERVAL = float(os.getenv("INVENTORY_POLL_INTERVAL", "0.2"))
+
+# Runs the SQLite reads of the asynchronous waiters off the event loop. A
+# single thread means a single connection, whose data_version values can be
+# compared with each other.
+_feed_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inventory-feed")
+
+EVENT_COLUMNS = ("event_id", "product_id", "kind", "old_stock", "new_stock", "old_price", "new_price", "ts")
+
+
+def read_changes(since: int = None, db_name=DB_NAME, limit: int = INVENTORY_CHANGES_LIMIT) -> dict:
+    """
+    Returns the inventory events after a cursor.
+
+    Without a cursor no events are returned, only the current one, so a new
+    consumer starts from now. If events after the cursor were already
+    dropped by the retention window, "reset" tells the consumer to reload
+    the catalog (e.g. from /api/products) and continue from the new cursor.
+
+    Args:
+        since (int, optional): The cursor returned by the previous call.
+        db_name (str): The name of the database.
+        limit (int): Maximum number of events, capped at INVENTORY_CHANGES_MAX_LIMIT.
+
+    Returns:
+        dict: The events in order, the cursor to send next, whether more
+        events are waiting and whether the consumer must reload.
+    """
+    limit = max(1, min(limit, INVENTORY_CHANGES_MAX_LIMIT))
+    ensure_schema(db_name)
+    conn = get_connection(db_name)
+
+    # Separate subqueries: MIN and MAX in one SELECT would scan the whole table
+    oldest, newest = conn.execute(
+        "SELECT (SELECT MIN(event_id) FROM inventory_events), (SELECT MAX(event_id) FROM inventory_events);"
+    ).fetchone()
+    head = newest or conn.execute(
+        "SELECT COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'inventory_events'), 0);"
+    ).fetchone()[0]
+    if since is None or since > head:
+        return {"events": [], "cursor": head, "has_more": False, "reset": since is not None}
+    if oldest is not None and since < oldest - 1:
+        return {"events": [], "cursor": head, "has_more": False, "reset": True}
+
+    rows = conn.execute(
+        f"SELECT {', '.join(EVENT_COLUMNS)} FROM inventory_events WHERE event_id > ? ORDER BY event_id LIMIT ?;",
+        (since, limit + 1),
+    ).fetchall()
+    events = [dict(zip(EVENT_COLUMNS, row)) for row in rows[:limit]]
+    return {
+        "events": events,
+        "cursor": events[-1]["event_id"] if events else since,
+        "has_more": len(rows) > limit,
+        "reset": False,
+    }
+
+
+def _data_version(db_name) -> int:
+    # Changes whenever another connection commits, without reading any table
+    return get_connection(db_name).execute("PRAGMA data_version;").fetchone()[0]
+
+
+def _versioned_changes(since: int, db_name, limit: int) -> tuple:
+    return _data_version(db_name), read_changes(since, db_name, limit)
+
+
+def wait_for_changes(
+    since: int = None, db_name=DB_NAME, limit: int = INVENTORY_CHANGES_LIMIT, timeout: float = 0.0
+) -> dict:
+    """
+    Long-polls the inventory events after a cursor.
+
+    Returns as soon as there are events (or a reset), or after `timeout`
+    seconds with no events. While waiting, only PRAGMA data_version is
+    checked, every INVENTORY_POLL_INTERVAL seconds.
+
+    Args:
+        since (int, optional): The cursor returned by the previous call.
+        db_name (str): The name of the database.
+        limit (int): Maximum number of events.
+        timeout (float): Seconds to wait, capped at INVENTORY_LONG_POLL_MAX.
+
+    Returns:
+        dict: Same as read_changes.
+    """
+    end = time.monotonic() + max(0.0, min(timeout, INVENTORY_LONG_POLL_MAX))
+    while True:
+        version = _data_version(db_name)
+        page = read_changes(since, db_name, limit)
+        if page["events"] or page["reset"] or since is None or time.monotonic() >= end:
+            return page
+        while _data_version(db_name) == version and time.monotonic() < end:
+            time.sleep(INVENTORY_POLL_INTERVAL)
+
+
+async def wait_for_changes_async(
+    since: int = None, db_name=DB_NAME, limit: int = INVENTORY_CHANGES_LIMIT, timeout: float = 0.0
+) -> dict:
+    """
+    Asynchronous wait_for_changes: waiting requests don't hold a thread.
+
+    The checks run on one shared thread, so the event loop never waits on
+    SQLite (or on the migrations of the first call).
+
+    Args:
+        since (int, optional): The cursor returned by the previous call.
+        db_name (str): The name of the database.
+        limit (int): Maximum number of events.
+        timeout (float): Seconds to wait, capped at INVENTORY_LONG_POLL_MAX.
+
+    Returns:
+        dict: Same as read_changes.
+    """
+    loop = asyncio.get_running_loop()
+    end = time.monotonic() + max(0.0, min(timeout, INVENTORY_LONG_POLL_MAX))
+    while True:
+        version, page = await loop.run_in_executor(_feed_executor, _versioned_changes, since, db_name, limit)
+        if page["events"] or page["reset"] or since is None or time.monotonic() >= end:
+            return page
+        while time.monotonic() < end:
+            await asyncio.sleep(INVENTORY_POLL_INTERVAL)
+            if await loop.run_in_executor(_feed_executor, _data_version, db_name) != version:
+                break
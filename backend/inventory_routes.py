@@ -1,5 +1,26 @@
-from flask import Blueprint, jsonify, request
-from backend.deepseek_integration import generate_response
+import json
+
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from backend.deepseek_integration import (
+    BATCH_CONCURRENCY,
+    BATCH_MAX_ITEMS,
+    generate_batch,
+    generate_response,
+    generate_response_stream,
+)
+from backend.catalog import catalog_stats
+from backend.connection import connection_stats
+from backend.conversations import conversation_stats
+from backend.deadlines import Deadline, deadline_stats
+from backend.intent_router import router_stats
+from backend.inventory_feed import INVENTORY_CHANGES_LIMIT, wait_for_changes
+from backend.llm import llm_usage_stats
+from backend.product_listing import PRODUCTS_DEFAULT_LIMIT, catalog_version, list_products, parse_fields
+from backend.product_search import SEARCH_DEFAULT_LIMIT, search_catalog
+from backend.prompt_builder import prompt_stats
+from backend.recommendation_store import get_recommendations, recommendation_stats
+from backend.response_cache import response_cache
+from backend.single_flight import single_flight
 
 inventory_bp = Blueprint("inventory", __name__)
 
@@ -35,17 +56,23 @@ def login():
 def chat():
     """
     Endpoint to interact with the virtual assistant using natural language queries.
+
+    Messages sent with the same `session_id` form a conversation: the model
+    sees the earlier turns, older ones folded into a rolling summary.
     """
     try:
+        # The model call must finish within the endpoint's latency budget
+        deadline = Deadline("chat")
         data = request.json
         user_id = data.get("user_id")
         user_message = data.get("message")
+        session_id = data.get("session_id")  # Optional: enables multi-turn conversations
 
         if not user_message:
             return jsonify({"error": "The user's message is missing"}), 400
 
         # Generate a response with AI
-        response = generate_response(user_message, user_id)
+        response = generate_response(user_message, user_id, deadline=deadline, session_id=session_id)
 
         if response.get("status") == "error":
             return jsonify({"error": response.get("message")}), 500
@@ -56,22 +83,112 @@ def chat():
         return jsonify({"error": str(e)}), 500
 
 
+@inventory_bp.route("/api/chat/stream", methods=["POST"])
+def chat_stream():
+    """
+    Streaming variant of /api/chat using Server-Sent Events.
+
+    Each piece of the answer is sent as a `data: {"delta": ...}` event as soon as
+    the model produces it, followed by an `event: done` event. Failures after
+    the stream started are reported with an `event: error` event.
+    """
+    try:
+        deadline = Deadline("stream")
+        data = request.json
+        user_id = data.get("user_id")
+        user_message = data.get("message")
+        session_id = data.get("session_id")
+
+        if not user_message:
+            return jsonify({"error": "The user's message is missing"}), 400
+
+        def events():
+            try:
+                for delta in generate_response_stream(
+                    user_message, user_id, deadline=deadline, session_id=session_id
+                ):
+                    yield f"data: {json.dumps({'delta': delta})}\n\n"
+                yield "event: done\ndata: {}\n\n"
+            except Exception as e:
+                error = f"Error generating the response: {e}"
+                yield f"event: error\ndata: {json.dumps({'error': error})}\n\n"
+
+        return Response(
+            stream_with_context(events()),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@inventory_bp.route("/api/chat/batch", methods=["POST"])
+def chat_batch():
+    """
+    Answers a list of `{"user_id", "message"}` items in one request.
+
+    The items are sent to the model concurrently (at most `concurrency` calls
+    in flight, BATCH_CONCURRENCY by default). The results are returned in the
+    order of the items, or, with `"stream": true`, written as NDJSON lines
+    `{"index": ..., "status": ..., "response": ...}` as soon as each completes.
+    """
+    try:
+        deadline = Deadline("batch")
+        data = request.json
+        items = data.get("items")
+
+        if not isinstance(items, list) or not items:
+            return jsonify({"error": "The 'items' list is missing"}), 400
+        if len(items) > BATCH_MAX_ITEMS:
+            return jsonify({"error": f"A batch can hold at most {BATCH_MAX_ITEMS} items"}), 400
+        for item in items:
+            if not isinstance(item, dict) or not item.get("message"):
+                return jsonify({"error": "Every item needs a 'message'"}), 400
+            if item.get("user_id") is not None and not isinstance(item.get("user_id"), int):
+                return jsonify({"error": "The 'user_id' of an item must be an integer"}), 400
+
+        concurrency = data.get("concurrency")
+        if concurrency is None:
+            concurrency = BATCH_CONCURRENCY
+        elif not isinstance(concurrency, int) or isinstance(concurrency, bool):
+            return jsonify({"error": "The 'concurrency' value must be an integer"}), 400
+        concurrency = max(1, min(concurrency, BATCH_CONCURRENCY))
+        results = generate_batch(items, deadline=deadline, concurrency=concurrency)
+
+        if data.get("stream"):
+
+            def lines():
+                for index, result in results:
+                    yield json.dumps({"index": index, **result}) + "\n"
+
+            return Response(
+                stream_with_context(lines()),
+                mimetype="application/x-ndjson",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            )
+
+        ordered = [None] * len(items)
+        for index, result in results:
+            ordered[index] = result
+        return jsonify({"status": "success", "results": ordered}), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @inventory_bp.route("/api/recommendations", methods=["GET"])
 def recommendations():
     """
     Generates recommendations based on the user's history or general suggestions if not logged in.
     """
     try:
+        deadline = Deadline("recommendations")
         user_id = request.args.get("user_id", type=int)  # Retrieve user_id (if provided)
 
-        # Generate general recommendations if no user_id is provided
-        if not user_id:
-            user_message = "Generate general recommendations for users."
-        else:
-            user_message = "Generate personalized recommendations based on my history."
-
-        # Generate a response using AI
-        response = generate_response(user_message, user_id)
+        # Serve the precomputed recommendations (general ones if no user_id is
+        # provided), recomputing them only if their inputs changed
+        response = get_recommendations(user_id, deadline=deadline)
 
         if response.get("status") == "error":
             return jsonify({"error": response.get("message")}), 500
@@ -81,3 +198,123 @@ def recommendations():
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+
+@inventory_bp.route("/api/products", methods=["GET"])
+def products():
+    """
+    Lists the products, keyset-paginated in product_id order.
+
+    Query parameters: `after` (the `next_after` of the previous page),
+    `limit`, `fields` (comma-separated columns), and the filters `category`,
+    `brand`, `in_stock=1`, `min_price` and `max_price`. The ETag is the
+    catalog version, so a client sending it back in `If-None-Match` gets a
+    304 until a product changes.
+    """
+    try:
+        try:
+            fields = parse_fields(request.args.get("fields", ""))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        # Revalidation only needs the catalog version, not the page
+        etag = f"catalog-{catalog_version()}"
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+            response.set_etag(etag)
+            return response
+
+        page = list_products(
+            after=request.args.get("after", 0, type=int),
+            limit=request.args.get("limit", PRODUCTS_DEFAULT_LIMIT, type=int),
+            fields=fields,
+            category=request.args.get("category"),
+            brand=request.args.get("brand"),
+            in_stock=request.args.get("in_stock", "0").lower() in ("1", "true", "yes"),
+            min_price=request.args.get("min_price", type=float),
+            max_price=request.args.get("max_price", type=float),
+        )
+        response = jsonify({"status": "success", **page})
+        response.set_etag(f"catalog-{page['catalog_version']}")
+        response.headers["Cache-Control"] = "no-cache"
+        return response, 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@inventory_bp.route("/api/inventory/changes", methods=["GET"])
+def inventory_changes():
+    """
+    Feed of product changes (inserts, deletes, stock, price and detail updates).
+
+    Query parameters: `since` (the `cursor` of the previous response; omit
+    it to get the current cursor), `limit`, and `timeout` in seconds to
+    long-poll: the request waits until a change happens or the timeout
+    expires. When `reset` is true, the changes after `since` are gone and the
+    client must reload the catalog before following the new cursor.
+    """
+    try:
+        page = wait_for_changes(
+            since=request.args.get("since", type=int),
+            limit=request.args.get("limit", INVENTORY_CHANGES_LIMIT, type=int),
+            timeout=request.args.get("timeout", 0.0, type=float),
+        )
+        return jsonify({"status": "success", **page}), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@inventory_bp.route("/api/products/search", methods=["GET"])
+def product_search():
+    """
+    Full-text product search, ranked by relevance and paginated.
+
+    Query parameters: `q` (the search text), `limit`, `offset` and
+    `in_stock=1` to hide sold-out products. The response carries the
+    `next_offset` to request the following page, or null on the last one.
+    """
+    try:
+        query = request.args.get("q", "").strip()
+        if not query:
+            return jsonify({"error": "The 'q' parameter is missing"}), 400
+
+        limit = request.args.get("limit", SEARCH_DEFAULT_LIMIT, type=int)
+        offset = request.args.get("offset", 0, type=int)
+        in_stock = request.args.get("in_stock", "0").lower() in ("1", "true", "yes")
+
+        page = search_catalog(query, limit=limit, offset=offset, in_stock=in_stock)
+        return jsonify({"status": "success", "query": query, **page}), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@inventory_bp.route("/api/metrics", methods=["GET"])
+def metrics():
+    """
+    Exposes internal counters used to monitor the backend under load.
+    """
+    try:
+        return (
+            jsonify(
+                {
+                    "status": "success",
+                    "catalog": catalog_stats(),
+                    "connections": connection_stats(),
+                    "router": router_stats(),
+                    "prompt": prompt_stats(),
+                    "llm_usage": llm_usage_stats(),
+                    "llm_attempts": deadline_stats(),
+                    "response_cache": response_cache.stats(),
+                    "single_flight": single_flight.stats(),
+                    "conversations": conversation_stats(),
+                    "recommendations": recommendation_stats(),
+                }
+            ),
+            200,
+        )
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1,283 @@
+import logging
+import threading
+
+from backend.deadlines import Deadline, call_with_deadline, call_with_deadline_async
+from backend.deepseek_client import get_async_client, get_client
+from backend.response_cache import response_cache
+from backend.single_flight import single_flight
+
+_client = None
+
+
+def sync_client():
+    """
+    Returns the configured client, created on the first model call.
+
+    Retries are handled by the deadline layer, which knows how much time the
+    caller has left, so the SDK's own retries are disabled.
+    """
+    global _client
+    if _client is None:
+        _client = get_client().with_options(max_retries=0)
+    return _client
+
+
+MODEL = "deepseek-chat"
+
+logger = logging.getLogger(__name__)
+
+
+class UsageStats:
+    """
+    Accumulates the token usage reported by the API, including how much of
+    each prompt was served from DeepSeek's prefix cache.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cache_hit_tokens = 0
+        self.cache_miss_tokens = 0
+        self._lock = threading.Lock()
+
+    def record(self, usage: dict):
+        """
+        Records the usage block of one response.
+
+        Args:
+            usage (dict): The response's usage fields; None if it had none.
+        """
+        if not usage:
+            return
+        hit = usage.get("prompt_cache_hit_tokens") or 0
+        miss = usage.get("prompt_cache_miss_tokens") or 0
+        with self._lock:
+            self.requests += 1
+            self.prompt_tokens += usage.get("prompt_tokens") or 0
+            self.completion_tokens += usage.get("completion_tokens") or 0
+            self.cache_hit_tokens += hit
+            self.cache_miss_tokens += miss
+        logger.info(
+            "Prompt cache: %d hit tokens, %d miss tokens (%d prompt, %d completion)",
+            hit,
+            miss,
+            usage.get("prompt_tokens") or 0,
+            usage.get("completion_tokens") or 0,
+        )
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            cached = self.cache_hit_tokens + self.cache_miss_tokens
+            return {
+                "requests": self.requests,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "prompt_cache_hit_tokens": self.cache_hit_tokens,
+                "prompt_cache_miss_tokens": self.cache_miss_tokens,
+                "prompt_cache_hit_rate": self.cache_hit_tokens / cached if cached else 0.0,
+            }
+
+
+usage_stats = UsageStats()
+
+
+def usage_fields(usage) -> dict:
+    """
+    Converts the usage block of an SDK response into a plain dict.
+
+    DeepSeek-specific fields such as prompt_cache_hit_tokens are kept, since
+    the SDK models accept extra fields.
+
+    Args:
+        usage: The SDK usage object, or None.
+
+    Returns:
+        dict or None: The usage fields.
+    """
+    return usage.model_dump() if usage is not None else None
+
+
+def chat_completion(
+    messages: list,
+    cache_key: str = None,
+    catalog_version: int = None,
+    max_tokens: int = 500,
+    temperature: float = 0.7,
+    deadline: Deadline = None,
+) -> str:
+    """
+    Sends a chat completion request, serving repeated prompts from the cache.
+
+    Concurrent requests with the same cache key share a single upstream call.
+    The call is retried, and hedged when slow, until the deadline expires.
+
+    Args:
+        messages (list): Chat messages for the model.
+        cache_key (str, optional): Key built with make_cache_key; None skips the cache.
+        catalog_version (int, optional): Catalog version the prompt was built from.
+        max_tokens (int): Maximum tokens to generate.
+        temperature (float): Sampling temperature.
+        deadline (Deadline, optional): The caller's deadline; the default budget if None.
+
+    Returns:
+        str: The completion text.
+    """
+    if cache_key:
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    deadline = deadline or Deadline("default")
+
+    def request(timeout: float):
+        return sync_client().chat.completions.create(
+            model=MODEL,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            timeout=timeout,
+        )
+
+    def create() -> str:
+        response = call_with_deadline(request, deadline)
+        usage_stats.record(usage_fields(response.usage))
+        content = response.choices[0].message.content.strip()
+        # Stored before the call leaves flight, so later callers hit the cache
+        if cache_key:
+            response_cache.put(cache_key, content, catalog_version)
+        return content
+
+    if not cache_key:
+        return create()
+    return single_flight.do(cache_key, create, timeout=deadline.remaining())
+
+
+def stream_chat_completion(
+    messages: list,
+    cache_key: str = None,
+    catalog_version: int = None,
+    max_tokens: int = 500,
+    temperature: float = 0.7,
+    deadline: Deadline = None,
+):
+    """
+    Streams a chat completion, yielding text as soon as the model produces it.
+
+    Cached completions are yielded in one piece. A completion streamed to the
+    end is stored in the cache like a regular one.
+
+    Args:
+        messages (list): Chat messages for the model.
+        cache_key (str, optional): Key built with make_cache_key; None skips the cache.
+        catalog_version (int, optional): Catalog version the prompt was built from.
+        max_tokens (int): Maximum tokens to generate.
+        temperature (float): Sampling temperature.
+        deadline (Deadline, optional): The caller's deadline; the default budget if None.
+
+    Yields:
+        str: Pieces of the completion text.
+    """
+    if cache_key:
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+
+    deadline = deadline or Deadline("default")
+
+    def request(timeout: float):
+        return sync_client().chat.completions.create(
+            model=MODEL,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=True,
+            stream_options={"include_usage": True},
+            timeout=timeout,
+        )
+
+    # Retried until the stream starts; a started stream is never duplicated
+    stream = call_with_deadline(request, deadline, hedge=False)
+    pieces = []
+    for chunk in stream:
+        # The last chunk carries the usage of the whole request and no choices
+        if chunk.usage is not None:
+            usage_stats.record(usage_fields(chunk.usage))
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            pieces.append(delta)
+            yield delta
+
+    if cache_key:
+        response_cache.put(cache_key, "".join(pieces).strip(), catalog_version)
+
+
+async def chat_completion_async(
+    messages: list,
+    cache_key: str = None,
+    catalog_version: int = None,
+    max_tokens: int = 500,
+    temperature: float = 0.7,
+    deadline: Deadline = None,
+) -> str:
+    """
+    Asynchronous variant of chat_completion, using the pooled async HTTP client.
+
+    Concurrent requests with the same cache key share a single upstream call.
+
+    Args:
+        messages (list): Chat messages for the model.
+        cache_key (str, optional): Key built with make_cache_key; None skips the cache.
+        catalog_version (int, optional): Catalog version the prompt was built from.
+        max_tokens (int): Maximum tokens to generate.
+        temperature (float): Sampling temperature.
+        deadline (Deadline, optional): The caller's deadline; the default budget if None.
+
+    Returns:
+        str: The completion text.
+    """
+    if cache_key:
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    deadline = deadline or Deadline("default")
+
+    async def request(timeout: float) -> dict:
+        response = await get_async_client().post(
+            "/chat/completions",
+            json={
+                "model": MODEL,
+                "messages": messages,
+                "max_tokens": max_tokens,
+                "temperature": temperature,
+            },
+            timeout=timeout,
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def create() -> str:
+        body = await call_with_deadline_async(request, deadline)
+        usage_stats.record(body.get("usage"))
+        content = body["choices"][0]["message"]["content"].strip()
+        if cache_key:
+            response_cache.put(cache_key, content, catalog_version)
+        return content
+
+    if not cache_key:
+        return await create()
+    return await single_flight.do_async(cache_key, create, timeout=deadline.remaining())
+
+
+def llm_usage_stats() -> dict:
+    """
+    Returns the token usage counters, including the prompt cache hit rate.
+
+    Returns:
+        dict: Requests, prompt and completion tokens and prompt cache hits and misses.
+    """
+    return usage_stats.as_dict()
@@ -0,0 +1,490 @@
+"""
+Versioned schema migrations of the store database.
+
+The schema version is kept in PRAGMA user_version. Each migration runs in
+its own transaction together with the version bump, so a failed migration
+leaves the database at the previous version.
+
+Usage:
+    python -m backend.migrations --db store.db
+    python -m backend.migrations --db store.db --status
+"""
+import argparse
+import logging
+import sqlite3
+import threading
+import time
+
+from backend.catalog import CATALOG_VERSION_SQL, DB_NAME
+from backend.summaries import SUMMARY_TABLES_SQL, rebuild_summaries
+
+logger = logging.getLogger(__name__)
+
+
+# One row per purchased item, in purchase order. The primary key clusters
+# the purchases of a user, so loading a history is a single range scan.
+# item_name is the item as purchased; product_id is NULL for items that
+# match no product, which stay in the history under their own name.
+USER_PURCHASES_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS user_purchases (
+        user_id INTEGER NOT NULL REFERENCES users(user_id),
+        ts REAL NOT NULL,
+        item_name TEXT NOT NULL,
+        product_id INTEGER REFERENCES products(product_id),
+        PRIMARY KEY (user_id, ts, item_name)
+    ) WITHOUT ROWID;
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_user_purchases_product ON user_purchases(product_id, user_id);",
+]
+
+# First layout of user_purchases (migration 1), replaced by migration 7
+USER_PURCHASES_V1_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS user_purchases (
+        user_id INTEGER NOT NULL REFERENCES users(user_id),
+        product_id INTEGER NOT NULL REFERENCES products(product_id),
+        ts REAL NOT NULL,
+        PRIMARY KEY (user_id, ts, product_id)
+    ) WITHOUT ROWID;
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_user_purchases_product ON user_purchases(product_id, user_id);",
+]
+
+# In-stock products of a brand or category in product_id order, covering the
+# columns shown to users, and products by name
+PRODUCT_INDEXES_SQL = [
+    "DROP INDEX IF EXISTS idx_products_brand_in_stock;",
+    "DROP INDEX IF EXISTS idx_products_category_in_stock;",
+    """
+    CREATE INDEX idx_products_brand_in_stock
+    ON products(brand, product_id, name, category, price, stock) WHERE stock > 0;
+    """,
+    """
+    CREATE INDEX idx_products_category_in_stock
+    ON products(category, product_id, name, brand, price, stock) WHERE stock > 0;
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_products_name ON products(name);",
+]
+
+
+# Full-text index of the products, kept in sync by triggers. It is an
+# external content table: the text stays in 'products' only. Stock and price
+# updates don't touch it.
+PRODUCTS_FTS_SQL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        name, brand, category, description, features,
+        content = 'products', content_rowid = 'product_id',
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+    );
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products
+    BEGIN
+        INSERT INTO products_fts (rowid, name, brand, category, description, features)
+        VALUES (new.product_id, new.name, new.brand, new.category, new.description, new.features);
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products
+    BEGIN
+        INSERT INTO products_fts (products_fts, rowid, name, brand, category, description, features)
+        VALUES ('delete', old.product_id, old.name, old.brand, old.category, old.description, old.features);
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_update
+    AFTER UPDATE OF product_id, name, brand, category, description, features ON products
+    BEGIN
+        INSERT INTO products_fts (products_fts, rowid, name, brand, category, description, features)
+        VALUES ('delete', old.product_id, old.name, old.brand, old.category, old.description, old.features);
+        INSERT INTO products_fts (rowid, name, brand, category, description, features)
+        VALUES (new.product_id, new.name, new.brand, new.category, new.description, new.features);
+    END;
+    """,
+    "INSERT INTO products_fts (products_fts) VALUES ('rebuild');",
+]
+
+
+# Products of a category or brand in product_id order, stock or not, for
+# the keyset-paginated listing
+PRODUCT_LISTING_INDEXES_SQL = [
+    "CREATE INDEX IF NOT EXISTS idx_products_category ON products(category, product_id);",
+    "CREATE INDEX IF NOT EXISTS idx_products_brand ON products(brand, product_id);",
+]
+
+
+# Events kept in inventory_events; a consumer further behind must reload
+INVENTORY_EVENTS_KEPT = 100_000
+
+# Append-only feed of product changes. AUTOINCREMENT never reuses an
+# event_id, so ids are a cursor that only moves forward.
+INVENTORY_EVENTS_SQL = f"""
+CREATE TABLE IF NOT EXISTS inventory_events (
+    event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    product_id INTEGER NOT NULL,
+    kind TEXT NOT NULL CHECK (kind IN ('insert', 'update', 'delete')),
+    old_stock INTEGER,
+    new_stock INTEGER,
+    old_price REAL,
+    new_price REAL,
+    ts REAL NOT NULL DEFAULT ((julianday('now') - 2440587.5) * 86400.0)
+);
+
+CREATE TRIGGER IF NOT EXISTS inventory_events_insert AFTER INSERT ON products
+BEGIN
+    INSERT INTO inventory_events (product_id, kind, new_stock, new_price)
+    VALUES (new.product_id, 'insert', new.stock, new.price);
+END;
+
+CREATE TRIGGER IF NOT EXISTS inventory_events_update AFTER UPDATE ON products
+WHEN old.stock IS NOT new.stock OR old.price IS NOT new.price OR old.name IS NOT new.name
+    OR old.category IS NOT new.category OR old.brand IS NOT new.brand
+BEGIN
+    INSERT INTO inventory_events (product_id, kind, old_stock, new_stock, old_price, new_price)
+    VALUES (new.product_id, 'update', old.stock, new.stock, old.price, new.price);
+END;
+
+CREATE TRIGGER IF NOT EXISTS inventory_events_delete AFTER DELETE ON products
+BEGIN
+    INSERT INTO inventory_events (product_id, kind, old_stock, old_price)
+    VALUES (old.product_id, 'delete', old.stock, old.price);
+END;
+
+-- Bounded retention: every new event drops the ones that fell out of the window
+CREATE TRIGGER IF NOT EXISTS inventory_events_retention AFTER INSERT ON inventory_events
+BEGIN
+    DELETE FROM inventory_events WHERE event_id <= new.event_id - {INVENTORY_EVENTS_KEPT};
+END;
+"""
+
+
+# Materialized recommendations, one row per user (0 for the general ones).
+# history_hash and slice_hash fingerprint the inputs they were computed
+# from: the user's purchase history and the prompt built from the relevant
+# catalog slice (retrieved products, prices and stock).
+RECOMMENDATIONS_SQL = """
+CREATE TABLE IF NOT EXISTS user_recommendations (
+    user_id INTEGER PRIMARY KEY,
+    recommendations TEXT NOT NULL,
+    catalog_version INTEGER NOT NULL,
+    history_hash TEXT NOT NULL,
+    slice_hash TEXT NOT NULL,
+    computed_at REAL NOT NULL
+);
+"""
+
+
+def split_statements(script: str) -> list:
+    """
+    Splits an SQL script into statements, keeping trigger bodies whole.
+
+    Unlike executescript, running the statements one by one doesn't commit
+    the migration's transaction.
+
+    Args:
+        script (str): Statements separated by semicolons.
+
+    Returns:
+        list: The complete statements.
+    """
+    statements = []
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            statements.append(statement.strip())
+            statement = ""
+    return statements
+
+
+def _product_ids_by_name(conn: sqlite3.Connection) -> dict:
+    product_ids = {}
+    for product_id, name in conn.execute("SELECT product_id, name FROM products ORDER BY product_id DESC;"):
+        product_ids[name.strip().lower()] = (product_id, name)  # The lowest id wins on duplicate names
+    return product_ids
+
+
+def _history_items(purchase_history: str) -> list:
+    return [(position, item.strip()) for position, item in enumerate(purchase_history.split(",")) if item.strip()]
+
+
+def backfill_user_purchases(conn: sqlite3.Connection) -> tuple:
+    """
+    Fills user_purchases from the users.purchase_history strings.
+
+    Only users without any purchase yet are backfilled, so running it again
+    (e.g. after seeding new users) never duplicates purchases. History items
+    are matched to products by name, ignoring case and surrounding spaces;
+    items that match no product are kept with a NULL product_id.
+
+    Args:
+        conn (sqlite3.Connection): Open connection to the database.
+
+    Returns:
+        tuple: Purchases inserted and, among them, items that match no product.
+    """
+    product_ids = _product_ids_by_name(conn)
+    users = conn.execute(
+        """
+        SELECT user_id, purchase_history FROM users
+        WHERE purchase_history IS NOT NULL
+          AND user_id NOT IN (SELECT user_id FROM user_purchases);
+        """
+    ).fetchall()
+
+    # The strings hold no dates: keep their order with millisecond steps
+    now = time.time()
+    purchases = []
+    unmatched = 0
+    for user_id, purchase_history in users:
+        for position, item in _history_items(purchase_history):
+            product_id, name = product_ids.get(item.lower(), (None, item))
+            unmatched += product_id is None
+            purchases.append((user_id, now + position / 1000, name, product_id))
+
+    conn.executemany(
+        "INSERT OR IGNORE INTO user_purchases (user_id, ts, item_name, product_id) VALUES (?, ?, ?, ?);",
+        purchases,
+    )
+    return len(purchases), unmatched
+
+
+def _backfill_user_purchases_v1(conn: sqlite3.Connection) -> tuple:
+    # The backfill of migration 1, into the first layout: items that match no
+    # product are skipped, and put back by migration 7
+    product_ids = {}
+    for product_id, name in conn.execute("SELECT product_id, name FROM products ORDER BY product_id DESC;"):
+        product_ids[name.strip().lower()] = product_id  # The lowest id wins on duplicate names
+
+    users = conn.execute(
+        """
+        SELECT user_id, purchase_history FROM users
+        WHERE purchase_history IS NOT NULL
+          AND user_id NOT IN (SELECT user_id FROM user_purchases);
+        """
+    ).fetchall()
+
+    # The strings hold no dates: keep their order with millisecond steps
+    now = time.time()
+    purchases = []
+    unmatched = 0
+    for user_id, purchase_history in users:
+        for position, item in enumerate(purchase_history.split(",")):
+            if not item.strip():
+                continue
+            product_id = product_ids.get(item.strip().lower())
+            if product_id is None:
+                unmatched += 1
+                continue
+            purchases.append((user_id, product_id, now + position / 1000))
+
+    conn.executemany(
+        "INSERT OR IGNORE INTO user_purchases (user_id, product_id, ts) VALUES (?, ?, ?);", purchases
+    )
+    return len(purchases), unmatched
+
+
+def _restore_unmatched_items(conn: sqlite3.Connection) -> int:
+    # Migration 1 dropped the history items that matched no product. Put them
+    # back at the timestamp the backfill would have given them: it stepped
+    # 1ms per history position from one start time per user.
+    product_ids = _product_ids_by_name(conn)
+    first_purchase = dict(conn.execute("SELECT user_id, MIN(ts) FROM user_purchases GROUP BY user_id;"))
+    users = conn.execute(
+        "SELECT user_id, purchase_history FROM users WHERE purchase_history IS NOT NULL;"
+    ).fetchall()
+
+    items = []
+    for user_id, purchase_history in users:
+        if user_id not in first_purchase:
+            continue  # backfill_user_purchases records the whole history
+        history = _history_items(purchase_history)
+        matched = [position for position, item in history if item.lower() in product_ids]
+        start = first_purchase[user_id] - (matched[0] if matched else 0) / 1000
+        items += [
+            (user_id, start + position / 1000, item)
+            for position, item in history
+            if item.lower() not in product_ids
+        ]
+
+    conn.executemany(
+        "INSERT OR IGNORE INTO user_purchases (user_id, ts, item_name, product_id) VALUES (?, ?, ?, NULL);", items
+    )
+    return len(items)
+
+
+def _create_user_purchases(conn: sqlite3.Connection):
+    for statement in USER_PURCHASES_V1_SQL:
+        conn.execute(statement)
+    inserted, unmatched = _backfill_user_purchases_v1(conn)
+    logger.info("Backfilled %d purchases (%d history items match no product)", inserted, unmatched)
+
+
+def _create_product_indexes(conn: sqlite3.Connection):
+    for statement in PRODUCT_INDEXES_SQL:
+        conn.execute(statement)
+
+
+def _create_products_fts(conn: sqlite3.Connection):
+    for statement in PRODUCTS_FTS_SQL:
+        conn.execute(statement)
+
+
+def _create_listing_indexes(conn: sqlite3.Connection):
+    for statement in PRODUCT_LISTING_INDEXES_SQL + split_statements(CATALOG_VERSION_SQL):
+        conn.execute(statement)
+
+
+def _create_summaries(conn: sqlite3.Connection):
+    for statement in split_statements(SUMMARY_TABLES_SQL):
+        conn.execute(statement)
+    rebuild_summaries(conn)
+
+
+def _create_inventory_events(conn: sqlite3.Connection):
+    for statement in split_statements(INVENTORY_EVENTS_SQL):
+        conn.execute(statement)
+
+
+def _keep_unmatched_purchases(conn: sqlite3.Connection):
+    # Rebuild user_purchases with item_name and a nullable product_id. The
+    # summary triggers on it are dropped with the table and created again
+    # after the copy, which leaves the units sold unchanged.
+    conn.execute("CREATE TEMP TABLE user_purchases_v1 AS SELECT user_id, ts, product_id FROM user_purchases;")
+    conn.execute("DROP TABLE user_purchases;")
+    for statement in USER_PURCHASES_SQL:
+        conn.execute(statement)
+    conn.execute(
+        """
+        INSERT INTO user_purchases (user_id, ts, item_name, product_id)
+        SELECT v1.user_id, v1.ts, COALESCE(p.name, 'Product ' || v1.product_id), v1.product_id
+        FROM temp.user_purchases_v1 v1 LEFT JOIN products p ON p.product_id = v1.product_id;
+        """
+    )
+    conn.execute("DROP TABLE temp.user_purchases_v1;")
+    for statement in split_statements(SUMMARY_TABLES_SQL):
+        conn.execute(statement)
+
+    restored = _restore_unmatched_items(conn)
+    inserted, unmatched = backfill_user_purchases(conn)
+    logger.info(
+        "Restored %d history items that match no product; backfilled %d purchases (%d match no product)",
+        restored, inserted, unmatched,
+    )
+
+
+def _create_recommendations(conn: sqlite3.Connection):
+    # Databases used before this migration already have the table
+    conn.execute(RECOMMENDATIONS_SQL)
+
+
+# (version, description, function) in order; never edit an applied migration,
+# add a new one instead
+MIGRATIONS = [
+    (1, "Normalized user_purchases table, backfilled from users.purchase_history", _create_user_purchases),
+    (2, "Covering indexes for in-stock products by brand and category, and by name", _create_product_indexes),
+    (3, "Full-text search index of the products, synced by triggers", _create_products_fts),
+    (4, "Indexes for listing products by category and brand, and the catalog version counter", _create_listing_indexes),
+    (5, "Stock by category and units sold by brand summaries, kept by triggers", _create_summaries),
+    (6, "Append-only inventory_events feed of product changes, written by triggers", _create_inventory_events),
+    (7, "user_purchases keeps history items that match no product, with item_name", _keep_unmatched_purchases),
+    (8, "user_recommendations table of materialized recommendations", _create_recommendations),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    """
+    Returns the schema version of a database.
+
+    Args:
+        conn (sqlite3.Connection): Open connection to the database.
+
+    Returns:
+        int: The applied migration version, 0 for a database never migrated.
+    """
+    return conn.execute("PRAGMA user_version;").fetchone()[0]
+
+
+def migrate(db_name=DB_NAME, target: int = LATEST_VERSION) -> list:
+    """
+    Applies the pending migrations of a database, up to a version.
+
+    Args:
+        db_name (str): Name of the database file.
+        target (int): Version to migrate to.
+
+    Returns:
+        list: Versions applied by this call.
+    """
+    conn = sqlite3.connect(db_name, isolation_level=None)
+    applied = []
+    try:
+        for version, description, apply in MIGRATIONS:
+            if version > target:
+                break
+            # Locks the database first, so concurrent processes apply each migration once
+            conn.execute("BEGIN IMMEDIATE;")
+            try:
+                if schema_version(conn) >= version:
+                    conn.execute("COMMIT;")
+                    continue
+                logger.info("Applying migration %d: %s", version, description)
+                apply(conn)
+                conn.execute(f"PRAGMA user_version = {int(version)};")
+                conn.execute("COMMIT;")
+            except Exception:
+                conn.execute("ROLLBACK;")
+                raise
+            applied.append(version)
+    finally:
+        conn.close()
+    return applied
+
+
+# Databases already brought up to date by this process
+_migrated = set()
+_migrated_lock = threading.Lock()
+
+
+def ensure_schema(db_name=DB_NAME):
+    """
+    Migrates a database to the latest version, once per process.
+
+    Args:
+        db_name (str): Name of the database file.
+    """
+    if db_name in _migrated:
+        return
+    with _migrated_lock:
+        if db_name not in _migrated:
+            migrate(db_name)
+            _migrated.add(db_name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=DB_NAME, help="Database file")
+    parser.add_argument("--to", type=int, default=LATEST_VERSION, help="Version to migrate to")
+    parser.add_argument("--status", action="store_true", help="Only show the applied and pending migrations")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if args.status:
+        conn = sqlite3.connect(args.db)
+        current = schema_version(conn)
+        conn.close()
+        print(f"Schema version: {current} (latest {LATEST_VERSION})")
+        for version, description, _ in MIGRATIONS:
+            print(f"  [{'x' if version <= current else ' '}] {version}: {description}")
+        return
+
+    applied = migrate(args.db, args.to)
+    print(f"Applied {len(applied)} migration(s)." if applied else "The database is up to date.")
+
+
+if __name__ == "__main__":
+    main()
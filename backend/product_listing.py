@@ -0,0 +1,130 @@
+import os
+
+from backend.catalog import DB_NAME, PRODUCT_COLUMNS
+from backend.connection import get_connection
+from backend.migrations import ensure_schema
+
+
+PRODUCTS_DEFAULT_LIMIT = int(os.getenv("PRODUCTS_DEFAULT_LIMIT", "50"))
+PRODUCTS_MAX_LIMIT = int(os.getenv("PRODUCTS_MAX_LIMIT", "500"))
+
+# Columns returned when the client doesn't pick them
+DEFAULT_FIELDS = ("product_id", "name", "category", "brand", "price", "stock")
+
+
+def parse_fields(fields: str) -> tuple:
+    """
+    Validates a comma-separated column projection.
+
+    product_id is always returned, since it is the pagination cursor.
+
+    Args:
+        fields (str): Requested columns, e.g. "name,price"; empty for DEFAULT_FIELDS.
+
+    Returns:
+        tuple: The columns to select, in table order.
+
+    Raises:
+        ValueError: If a column doesn't exist.
+    """
+    if not fields:
+        return DEFAULT_FIELDS
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested - set(PRODUCT_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return tuple(column for column in PRODUCT_COLUMNS if column in requested or column == "product_id")
+
+
+def catalog_version(db_name=DB_NAME) -> int:
+    """
+    Reads the catalog change counter, which every write to 'products' bumps.
+
+    Args:
+        db_name (str): The name of the database.
+
+    Returns:
+        int: The current catalog version.
+    """
+    ensure_schema(db_name)
+    return get_connection(db_name).execute("SELECT version FROM catalog_meta WHERE id = 1;").fetchone()[0]
+
+
+def list_products(
+    db_name=DB_NAME,
+    after: int = 0,
+    limit: int = PRODUCTS_DEFAULT_LIMIT,
+    fields: tuple = DEFAULT_FIELDS,
+    category: str = None,
+    brand: str = None,
+    in_stock: bool = False,
+    min_price: float = None,
+    max_price: float = None,
+) -> dict:
+    """
+    Returns one page of products in product_id order.
+
+    Pages are keyset-paginated: the next one starts after the last
+    product_id of this one, so every page costs the same however deep it
+    is, and writes between two requests never shift or repeat rows.
+
+    Args:
+        db_name (str): The name of the database.
+        after (int): Only products with a greater product_id are returned.
+        limit (int): Maximum number of products, capped at PRODUCTS_MAX_LIMIT.
+        fields (tuple): Columns to return (see parse_fields).
+        category (str, optional): Only products of this category.
+        brand (str, optional): Only products of this brand.
+        in_stock (bool): Only products with stock left.
+        min_price (float, optional): Lowest price included.
+        max_price (float, optional): Highest price included.
+
+    Returns:
+        dict: The products, the cursor of the next page (None on the last one)
+        and the catalog version they were read at.
+    """
+    limit = max(1, min(limit, PRODUCTS_MAX_LIMIT))
+
+    # Literal conditions, so SQLite can pick the partial in-stock indexes
+    conditions = ["product_id > :after"]
+    if category:
+        conditions.append("category = :category")
+    if brand:
+        conditions.append("brand = :brand")
+    if in_stock:
+        conditions.append("stock > 0")
+    if min_price is not None:
+        conditions.append("price >= :min_price")
+    if max_price is not None:
+        conditions.append("price <= :max_price")
+
+    sql = (
+        f"SELECT {', '.join(fields)} FROM products WHERE {' AND '.join(conditions)} "
+        "ORDER BY product_id LIMIT :limit;"
+    )
+    params = {
+        "after": after or 0,
+        "category": category,
+        "brand": brand,
+        "min_price": min_price,
+        "max_price": max_price,
+        # One extra row tells whether there is a next page
+        "limit": limit + 1,
+    }
+
+    ensure_schema(db_name)
+    conn = get_connection(db_name)
+    # Read the version and the page in the same transaction so they match
+    conn.execute("BEGIN;")
+    try:
+        version = conn.execute("SELECT version FROM catalog_meta WHERE id = 1;").fetchone()[0]
+        rows = conn.execute(sql, params).fetchall()
+    finally:
+        conn.commit()
+
+    products = [dict(zip(fields, row)) for row in rows[:limit]]
+    return {
+        "products": products,
+        "next_after": products[-1]["product_id"] if len(rows) > limit else None,
+        "catalog_version": version,
+    }
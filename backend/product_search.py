@@ -0,0 +1,98 @@
+import os
+
+from backend.catalog import DB_NAME
+from backend.connection import get_connection
+from backend.migrations import ensure_schema
+from backend.retrieval import INDEXED_FIELDS, tokenize
+
+
+SEARCH_DEFAULT_LIMIT = int(os.getenv("SEARCH_DEFAULT_LIMIT", "20"))
+SEARCH_MAX_LIMIT = int(os.getenv("SEARCH_MAX_LIMIT", "100"))
+# Deepest result reachable by paging; ranking cost grows with the offset
+SEARCH_MAX_OFFSET = int(os.getenv("SEARCH_MAX_OFFSET", "1000"))
+# Query terms beyond this are ignored
+SEARCH_MAX_TERMS = 16
+
+SEARCH_COLUMNS = ("product_id", "name", "category", "brand", "price", "stock")
+
+# Column weights of bm25(), in the column order of products_fts, with the
+# same weights as the in-memory retrieval index
+FTS_WEIGHTS = ", ".join(
+    str(float(INDEXED_FIELDS[field])) for field in ("name", "brand", "category", "description", "features")
+)
+
+SEARCH_SQL = f"""
+SELECT {', '.join(f'p.{column}' for column in SEARCH_COLUMNS)},
+       -bm25(products_fts, {FTS_WEIGHTS}) AS score
+FROM products_fts JOIN products p ON p.product_id = products_fts.rowid
+WHERE products_fts MATCH :query AND (:in_stock = 0 OR p.stock > 0)
+ORDER BY bm25(products_fts, {FTS_WEIGHTS}), p.product_id
+LIMIT :limit OFFSET :offset;
+"""
+
+
+def build_match_query(query: str) -> str:
+    """
+    Turns free text into an FTS5 MATCH expression.
+
+    Every term must appear in the product; the last one also matches as a
+    prefix (from two characters on, the shortest prefix the index holds), so
+    results show up while the user is still typing. Terms are quoted, so FTS5
+    operators in the text are searched as plain words.
+
+    Args:
+        query (str): The text typed by the user.
+
+    Returns:
+        str: The MATCH expression, or "" if the text has no terms.
+    """
+    terms = tokenize(query)[:SEARCH_MAX_TERMS]
+    if not terms:
+        return ""
+    match = " ".join(f'"{term}"' for term in terms)
+    return match + "*" if len(terms[-1]) >= 2 else match
+
+
+def search_catalog(
+    query: str,
+    db_name=DB_NAME,
+    limit: int = SEARCH_DEFAULT_LIMIT,
+    offset: int = 0,
+    in_stock: bool = False,
+) -> dict:
+    """
+    Searches the products by name, brand, category, description and features.
+
+    Args:
+        query (str): The text typed by the user.
+        db_name (str): The name of the database.
+        limit (int): Maximum number of results, capped at SEARCH_MAX_LIMIT.
+        offset (int): Number of results to skip, capped at SEARCH_MAX_OFFSET.
+        in_stock (bool): Only return products with stock left.
+
+    Returns:
+        dict: The results, best first, and the offset of the next page (None on the last one).
+    """
+    limit = max(1, min(limit, SEARCH_MAX_LIMIT))
+    offset = max(0, min(offset, SEARCH_MAX_OFFSET))
+    match = build_match_query(query)
+    if not match:
+        return {"results": [], "limit": limit, "offset": offset, "next_offset": None}
+
+    ensure_schema(db_name)
+    # One extra row tells whether there is a next page without counting every match
+    rows = get_connection(db_name).execute(
+        SEARCH_SQL,
+        {"query": match, "in_stock": int(in_stock), "limit": limit + 1, "offset": offset},
+    ).fetchall()
+
+    results = [
+        {**dict(zip(SEARCH_COLUMNS, row)), "score": round(row[-1], 4)} for row in rows[:limit]
+    ]
+    has_next = len(rows) > limit and offset + limit <= SEARCH_MAX_OFFSET
+    return {
+        "results": results,
+        "limit": limit,
+        "offset": offset,
+        "next_offset": offset + limit if has_next else None,
+    }
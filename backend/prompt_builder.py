@@ -0,0 +1,199 @@
+import logging
+import os
+import threading
+
+from backend.catalog import CatalogSnapshot, format_catalog_context
+from backend.tokens import estimate_tokens
+
+
+# Maximum tokens of a whole prompt (system and user messages)
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "3000"))
+
+# Columns of the catalog table sent to the model
+TABLE_COLUMNS = ("name", "category", "brand", "price", "stock")
+
+logger = logging.getLogger(__name__)
+
+
+def format_value(value) -> str:
+    """
+    Formats a cell of the catalog table, dropping the decimals of whole prices.
+
+    Args:
+        value: The cell value.
+
+    Returns:
+        str: The value without the table separator.
+    """
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).replace("|", "/")
+
+
+def encode_catalog_table(rows: list) -> str:
+    """
+    Encodes product rows as a compact pipe-separated table.
+
+    Args:
+        rows (list): Product dictionaries as stored in a snapshot.
+
+    Returns:
+        str: A header line followed by one line per product, or "" without rows.
+    """
+    if not rows:
+        return ""
+    lines = ["|".join(TABLE_COLUMNS)]
+    lines.extend("|".join(format_value(row[column]) for column in TABLE_COLUMNS) for row in rows)
+    return "\n".join(lines)
+
+
+class PromptStats:
+    """
+    Accumulates the prompt tokens saved by compaction.
+    """
+
+    def __init__(self):
+        self.prompts = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+        self.rows_trimmed = 0
+        self._lock = threading.Lock()
+
+    def record(self, tokens_before: int, tokens_after: int, rows_trimmed: int):
+        with self._lock:
+            self.prompts += 1
+            self.tokens_before += tokens_before
+            self.tokens_after += tokens_after
+            self.rows_trimmed += rows_trimmed
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "prompts": self.prompts,
+                "tokens_before": self.tokens_before,
+                "tokens_after": self.tokens_after,
+                "saved_rate": 1 - self.tokens_after / self.tokens_before if self.tokens_before else 0.0,
+                "rows_trimmed": self.rows_trimmed,
+            }
+
+
+stats = PromptStats()
+
+
+def static_prefix(instructions: str, snapshot: CatalogSnapshot = None) -> str:
+    """
+    Returns the system prompt shared by every request of a catalog version.
+
+    It only holds the instructions and, when a snapshot is given, the whole
+    catalog table, so it stays byte-identical across users and queries and
+    the upstream prompt cache can reuse it.
+
+    Args:
+        instructions (str): Task instructions for the model.
+        snapshot (CatalogSnapshot, optional): Catalog sent whole in the prefix.
+
+    Returns:
+        str: The static system prompt.
+    """
+    if snapshot is None:
+        return instructions
+    table = snapshot.derived("catalog_table", lambda snapshot: encode_catalog_table(snapshot.rows))
+    return f"{instructions}\n\nCatalog:\n{table}"
+
+
+def build_messages(
+    instructions: str,
+    rows: list,
+    user_message: str,
+    user_context: str = "",
+    token_budget: int = PROMPT_TOKEN_BUDGET,
+    snapshot: CatalogSnapshot = None,
+    history: list = None,
+) -> list:
+    """
+    Builds the chat messages of a request within a token budget.
+
+    The system message is the static prefix (instructions, plus the whole
+    catalog when a snapshot is given). Everything that changes per request
+    comes last, in the user turn: the user context, the relevant products as
+    a compact table and the message itself, sent only once. The earlier
+    turns of a conversation go in between, as they only grow by appending.
+    When the prompt exceeds the budget, the least relevant products (the last
+    rows) are dropped first; the static prefix and the history are never
+    trimmed.
+
+    Args:
+        instructions (str): Task instructions for the model.
+        rows (list): Product rows, most relevant first.
+        user_message (str): The user's natural language query.
+        user_context (str): What the model should know about the user.
+        token_budget (int): Maximum tokens of the whole prompt.
+        snapshot (CatalogSnapshot, optional): Catalog sent whole in the prefix.
+        history (list, optional): Earlier messages of the conversation.
+
+    Returns:
+        list: Chat messages for the model.
+    """
+    prefix = static_prefix(instructions, snapshot)
+    history = history or []
+    history_tokens = sum(estimate_tokens(message["content"]) for message in history)
+
+    # What the prompt used to cost: prose catalog lines and the message twice.
+    # The whole catalog's count is computed once per snapshot.
+    if snapshot is not None:
+        catalog_tokens = snapshot.derived("context_tokens", lambda snapshot: estimate_tokens(snapshot.context))
+    else:
+        catalog_tokens = estimate_tokens(format_catalog_context(rows))
+    tokens_before = estimate_tokens(
+        "\n\n".join([instructions, user_context, user_message])
+    ) + catalog_tokens + estimate_tokens(user_message) + history_tokens
+
+    # Fixed part of the prompt, and the budget left for catalog lines
+    header = "|".join(TABLE_COLUMNS)
+    fixed_tokens = estimate_tokens(prefix) + estimate_tokens(
+        "\n\n".join(["Relevant products:", user_context, user_message])
+    ) + history_tokens
+    remaining = token_budget - fixed_tokens - estimate_tokens(header) - 1
+
+    kept = []
+    for row in rows:
+        line_tokens = estimate_tokens("|".join(format_value(row[column]) for column in TABLE_COLUMNS)) + 1
+        if line_tokens > remaining:
+            break
+        kept.append(row)
+        remaining -= line_tokens
+
+    # Ordered from most to least stable, so a user's follow-up questions
+    # also share the user context with the cached prefix
+    sections = []
+    if user_context:
+        sections.append(user_context)
+    if kept:
+        sections.append(f"Relevant products:\n{encode_catalog_table(kept)}")
+    sections.append(user_message)
+    messages = [
+        {"role": "system", "content": prefix},
+        *history,
+        {"role": "user", "content": "\n\n".join(sections)},
+    ]
+
+    tokens_after = sum(estimate_tokens(message["content"]) for message in messages)
+    stats.record(tokens_before, tokens_after, len(rows) - len(kept))
+    logger.info(
+        "Prompt tokens: %d before compaction, %d after (%d of %d products trimmed)",
+        tokens_before,
+        tokens_after,
+        len(rows) - len(kept),
+        len(rows),
+    )
+    return messages
+
+
+def prompt_stats() -> dict:
+    """
+    Returns the prompt compaction counters.
+
+    Returns:
+        dict: Prompts built, total tokens before and after compaction and trimmed products.
+    """
+    return stats.as_dict()
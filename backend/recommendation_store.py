@@ -0,0 +1,295 @@
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+
+from backend.catalog import DB_NAME, get_catalog
+from backend.connection import get_connection
+from backend.deadlines import Deadline
+from backend.deepseek_integration import build_request, fetch_user_history
+from backend.llm import chat_completion, chat_completion_async
+from backend.migrations import ensure_schema
+
+
+# Row holding the general recommendations shown to visitors without a user_id
+GENERAL_USER_ID = 0
+
+GENERAL_MESSAGE = "Generate general recommendations for users."
+PERSONAL_MESSAGE = "Generate personalized recommendations based on my history."
+
+RECOMMENDATION_COLUMNS = (
+    "recommendations",
+    "catalog_version",
+    "history_hash",
+    "slice_hash",
+    "computed_at",
+)
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def recommendation_inputs(user_id: int = None, db_name=DB_NAME) -> dict:
+    """
+    Fingerprints the inputs of a user's recommendations without building a prompt.
+
+    Args:
+        user_id (int, optional): The user's ID; None or 0 for general recommendations.
+        db_name (str): The name of the database.
+
+    Returns:
+        dict: The purchase history, its hash, the catalog snapshot and its version.
+    """
+    user_id = user_id or None
+    user_history = fetch_user_history(user_id, db_name) if user_id else ""
+    snapshot = get_catalog(db_name)
+    return {
+        "user_history": user_history,
+        "history_hash": _digest(user_history or ""),
+        "snapshot": snapshot,
+        "catalog_version": snapshot.version,
+    }
+
+
+def recommendation_request(user_id: int = None, db_name=DB_NAME, inputs: dict = None) -> dict:
+    """
+    Builds the model request for a user's recommendations and fingerprints its inputs.
+
+    Args:
+        user_id (int, optional): The user's ID; None or 0 for general recommendations.
+        db_name (str): The name of the database.
+        inputs (dict, optional): Fingerprints already returned by recommendation_inputs.
+
+    Returns:
+        dict: The inputs, plus the model request and the hash of the relevant
+        catalog slice it was built from.
+    """
+    user_id = user_id or None
+    inputs = dict(inputs or recommendation_inputs(user_id, db_name))
+    user_message = PERSONAL_MESSAGE if user_id else GENERAL_MESSAGE
+    request = build_request(
+        user_message, user_id, db_name, snapshot=inputs["snapshot"], user_history=inputs["user_history"]
+    )
+    inputs["request"] = request
+    inputs["slice_hash"] = _digest("\n".join(message["content"] for message in request["messages"]))
+    return inputs
+
+
+def load_recommendations(user_id: int = None, db_name=DB_NAME):
+    """
+    Reads the stored recommendations of a user.
+
+    Args:
+        user_id (int, optional): The user's ID; None or 0 for general recommendations.
+        db_name (str): The name of the database.
+
+    Returns:
+        dict or None: The stored row, or None if nothing was computed yet.
+    """
+    ensure_schema(db_name)
+    row = get_connection(db_name).execute(
+        f"SELECT {', '.join(RECOMMENDATION_COLUMNS)} FROM user_recommendations WHERE user_id = ?;",
+        (user_id or GENERAL_USER_ID,),
+    ).fetchone()
+    if row is None:
+        return None
+    return dict(zip(RECOMMENDATION_COLUMNS, row))
+
+
+def is_fresh(stored: dict, inputs: dict) -> bool:
+    """
+    Checks whether stored recommendations were computed from the current inputs.
+
+    The purchase history must be the same. Then either the catalog version
+    is the same, or, if `inputs` holds a request (see
+    recommendation_request), the relevant catalog slice is.
+
+    Args:
+        stored (dict): Row returned by load_recommendations.
+        inputs (dict): Fingerprints returned by recommendation_inputs or recommendation_request.
+
+    Returns:
+        bool: True if neither the history nor the relevant catalog slice changed.
+    """
+    if stored is None or stored["history_hash"] != inputs["history_hash"]:
+        return False
+    if stored["catalog_version"] == inputs["catalog_version"]:
+        return True
+    return stored["slice_hash"] == inputs.get("slice_hash")
+
+
+def save_recommendations(conn: sqlite3.Connection, user_id: int, recommendations: str, inputs: dict):
+    """
+    Stores the recommendations of a user, replacing the previous ones.
+
+    Args:
+        conn (sqlite3.Connection): Open connection to the database.
+        user_id (int): The user's ID; None or 0 for general recommendations.
+        recommendations (str): The generated recommendations.
+        inputs (dict): Fingerprints returned by recommendation_request.
+    """
+    conn.execute(
+        """
+        INSERT OR REPLACE INTO user_recommendations
+        (user_id, recommendations, catalog_version, history_hash, slice_hash, computed_at)
+        VALUES (?, ?, ?, ?, ?, ?);
+        """,
+        (
+            user_id or GENERAL_USER_ID,
+            recommendations,
+            inputs["catalog_version"],
+            inputs["history_hash"],
+            inputs["slice_hash"],
+            time.time(),
+        ),
+    )
+    conn.commit()
+
+
+def mark_fresh(conn: sqlite3.Connection, user_id: int, inputs: dict):
+    """
+    Records that stored recommendations still hold for a newer catalog version.
+
+    Args:
+        conn (sqlite3.Connection): Open connection to the database.
+        user_id (int): The user's ID; None or 0 for general recommendations.
+        inputs (dict): Fingerprints returned by recommendation_request.
+    """
+    conn.execute(
+        "UPDATE user_recommendations SET catalog_version = ? WHERE user_id = ?;",
+        (inputs["catalog_version"], user_id or GENERAL_USER_ID),
+    )
+    conn.commit()
+
+
+def check_recommendations(user_id: int = None, db_name=DB_NAME) -> tuple:
+    """
+    Loads a user's stored recommendations and checks them against the current inputs.
+
+    The history hash and catalog version are compared first, which needs no
+    prompt. Only when they don't settle it is the request built, to compare
+    the relevant catalog slice; stored recommendations whose slice didn't
+    change are marked fresh for the new catalog version.
+
+    Args:
+        user_id (int, optional): The user's ID; None or 0 for general recommendations.
+        db_name (str): The name of the database.
+
+    Returns:
+        tuple: (stored row or None, whether it is fresh, inputs). The inputs
+        hold the model request whenever the row is not fresh.
+    """
+    inputs = recommendation_inputs(user_id, db_name)
+    stored = load_recommendations(user_id, db_name)
+    if is_fresh(stored, inputs):
+        return stored, True, inputs
+
+    inputs = recommendation_request(user_id, db_name, inputs)
+    if is_fresh(stored, inputs):
+        mark_fresh(get_connection(db_name), user_id, inputs)
+        return stored, True, inputs
+    return stored, False, inputs
+
+
+class RecommendationStats:
+    """
+    Counts how many recommendation requests were served from the table.
+    """
+
+    def __init__(self):
+        self.served = 0
+        self.recomputed = 0
+        self._lock = threading.Lock()
+
+    def record(self, from_table: bool):
+        with self._lock:
+            if from_table:
+                self.served += 1
+            else:
+                self.recomputed += 1
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            total = self.served + self.recomputed
+            return {
+                "served_from_table": self.served,
+                "recomputed": self.recomputed,
+                "table_rate": self.served / total if total else 0.0,
+            }
+
+
+stats = RecommendationStats()
+
+
+def _store(user_id: int, recommendations: str, inputs: dict, db_name: str):
+    save_recommendations(get_connection(db_name), user_id, recommendations, inputs)
+
+
+def get_recommendations(user_id: int = None, db_name=DB_NAME, deadline: Deadline = None) -> dict:
+    """
+    Returns a user's recommendations, from the table when they are still fresh.
+
+    Stale or missing rows are recomputed with the model and written back, so
+    the table also fills up for users the batch job hasn't reached yet.
+
+    Args:
+        user_id (int, optional): The user's ID; None or 0 for general recommendations.
+        db_name (str): The name of the database.
+        deadline (Deadline, optional): The caller's deadline for the model call.
+
+    Returns:
+        dict: The recommendations, in the same format as generate_response.
+    """
+    try:
+        stored, fresh, inputs = check_recommendations(user_id, db_name)
+        if fresh:
+            stats.record(True)
+            return {"status": "success", "response": stored["recommendations"]}
+
+        recommendations = chat_completion(**inputs["request"], deadline=deadline)
+        _store(user_id, recommendations, inputs, db_name)
+        stats.record(False)
+        return {"status": "success", "response": recommendations}
+
+    except Exception as e:
+        return {"status": "error", "message": f"Error generating the response: {e}"}
+
+
+async def get_recommendations_async(user_id: int = None, db_name=DB_NAME, deadline: Deadline = None) -> dict:
+    """
+    Asynchronous variant of get_recommendations for the async serving path.
+
+    Args:
+        user_id (int, optional): The user's ID; None or 0 for general recommendations.
+        db_name (str): The name of the database.
+        deadline (Deadline, optional): The caller's deadline for the model call.
+
+    Returns:
+        dict: The recommendations, in the same format as generate_response.
+    """
+    try:
+        # Both steps may write to SQLite, so they run off the event loop
+        stored, fresh, inputs = await asyncio.to_thread(check_recommendations, user_id, db_name)
+        if fresh:
+            stats.record(True)
+            return {"status": "success", "response": stored["recommendations"]}
+
+        recommendations = await chat_completion_async(**inputs["request"], deadline=deadline)
+        await asyncio.to_thread(_store, user_id, recommendations, inputs, db_name)
+        stats.record(False)
+        return {"status": "success", "response": recommendations}
+
+    except Exception as e:
+        return {"status": "error", "message": f"Error generating the response: {e}"}
+
+
+def recommendation_stats() -> dict:
+    """
+    Returns the counters of the recommendation endpoint.
+
+    Returns:
+        dict: Requests served from the table and recomputed with the model.
+    """
+    return stats.as_dict()
@@ -0,0 +1,193 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from backend.connection import get_connection
+
+
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "600"))
+# Database file holding the persistent side table; empty keeps the cache in memory only
+LLM_CACHE_DB = os.getenv("LLM_CACHE_DB", "")
+
+
+def normalize_message(user_message: str) -> str:
+    """
+    Normalizes a message so trivially different spellings share a cache entry.
+
+    Args:
+        user_message (str): The user's natural language query.
+
+    Returns:
+        str: Lowercase message with collapsed whitespace and no trailing punctuation.
+    """
+    return re.sub(r"\s+", " ", user_message.lower()).strip().rstrip("?!. ")
+
+
+def make_cache_key(namespace: str, user_message: str, user_profile: str, catalog_version: int) -> str:
+    """
+    Builds the cache key of a completion.
+
+    Args:
+        namespace (str): Identifies the prompt template that produced the completion.
+        user_message (str): The user's natural language query.
+        user_profile (str): Everything about the user that goes into the prompt.
+        catalog_version (int): Catalog version the prompt was built from.
+
+    Returns:
+        str: Hex digest identifying the completion.
+    """
+    payload = json.dumps(
+        [namespace, normalize_message(user_message), user_profile, catalog_version]
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Bounded LRU cache of model completions with a TTL.
+
+    Entries remember the catalog version they were built from. As soon as an
+    entry for a newer version is stored, every older entry is dropped, both in
+    memory and in the optional SQLite side table.
+    """
+
+    def __init__(self, max_entries: int = LLM_CACHE_MAX_ENTRIES, ttl: float = LLM_CACHE_TTL, db_name: str = LLM_CACHE_DB):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_name = db_name
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()  # key -> (response, created_at, catalog_version)
+        self._catalog_version = None
+        self._lock = threading.Lock()
+        if db_name:
+            self._create_table()
+
+    def _create_table(self):
+        with get_connection(self.db_name) as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_response_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    catalog_version INTEGER NOT NULL
+                )
+                """
+            )
+
+    def _load(self, key: str):
+        with get_connection(self.db_name) as conn:
+            row = conn.execute(
+                "SELECT response, created_at, catalog_version FROM llm_response_cache WHERE cache_key = ?;",
+                (key,),
+            ).fetchone()
+        return tuple(row) if row else None
+
+    def _store(self, key: str, entry: tuple, drop_older: bool):
+        with get_connection(self.db_name) as conn:
+            if drop_older:
+                conn.execute(
+                    "DELETE FROM llm_response_cache WHERE catalog_version < ?;", (entry[2],)
+                )
+            conn.execute(
+                "DELETE FROM llm_response_cache WHERE created_at < ?;", (time.time() - self.ttl,)
+            )
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO llm_response_cache
+                (cache_key, response, created_at, catalog_version)
+                VALUES (?, ?, ?, ?);
+                """,
+                (key, *entry),
+            )
+
+    def get(self, key: str):
+        """
+        Looks up a completion.
+
+        Args:
+            key (str): Key built with make_cache_key.
+
+        Returns:
+            str or None: The cached completion, or None on a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and self.db_name:
+                entry = self._load(key)
+                if entry is not None and self._catalog_version is not None and entry[2] < self._catalog_version:
+                    entry = None
+
+            if entry is None or time.time() - entry[1] > self.ttl:
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._evict()
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, response: str, catalog_version: int):
+        """
+        Stores a completion.
+
+        Args:
+            key (str): Key built with make_cache_key.
+            response (str): The completion text.
+            catalog_version (int): Catalog version the prompt was built from.
+        """
+        with self._lock:
+            if self._catalog_version is not None and catalog_version < self._catalog_version:
+                return  # Built from a catalog that already changed
+
+            drop_older = catalog_version != self._catalog_version
+            if drop_older:
+                stale = [k for k, entry in self._entries.items() if entry[2] < catalog_version]
+                for stale_key in stale:
+                    del self._entries[stale_key]
+                self.invalidations += len(stale)
+                self._catalog_version = catalog_version
+
+            entry = (response, time.time(), catalog_version)
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._evict()
+            if self.db_name:
+                self._store(key, entry, drop_older)
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        """
+        Returns the cache counters.
+
+        Returns:
+            dict: Hits, misses, evictions, invalidations and current size.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "size": len(self._entries),
+                "persistent": bool(self.db_name),
+            }
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,191 @@
+import heapq
+import math
+import os
+import re
+from collections import Counter
+
+from backend.catalog import DB_NAME, CatalogSnapshot, get_catalog, format_catalog_context
+from backend.tokens import estimate_tokens
+
+
+# "retrieval" sends only the most relevant products, "full" dumps the catalog
+CONTEXT_MODE = os.getenv("CONTEXT_MODE", "retrieval")
+CONTEXT_TOP_K = int(os.getenv("CONTEXT_TOP_K", "20"))
+
+# Fields indexed for every product, with the weight of each one
+INDEXED_FIELDS = {
+    "name": 3,
+    "brand": 2,
+    "category": 2,
+    "description": 1,
+    "features": 1,
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> list:
+    """
+    Splits a text into lowercase alphanumeric terms.
+
+    Args:
+        text (str): The text to tokenize.
+
+    Returns:
+        list: The terms in order of appearance.
+    """
+    return _TOKEN_RE.findall(text.lower()) if text else []
+
+
+class BM25Index:
+    """
+    Okapi BM25 index over a list of tokenized documents.
+    """
+
+    def __init__(self, documents: list, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_lengths = [len(terms) for terms in documents]
+        self.avg_length = sum(self.doc_lengths) / len(documents) if documents else 0.0
+
+        # term -> [(document index, term frequency), ...]
+        self.postings = {}
+        for doc_id, terms in enumerate(documents):
+            for term, frequency in Counter(terms).items():
+                self.postings.setdefault(term, []).append((doc_id, frequency))
+
+        total = len(documents)
+        self.idf = {
+            term: math.log(1 + (total - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    def search(self, terms: list, top_k: int) -> list:
+        """
+        Scores the documents matching any of the query terms.
+
+        Args:
+            terms (list): Tokenized query.
+            top_k (int): Maximum number of results.
+
+        Returns:
+            list: (document index, score) pairs, best first.
+        """
+        scores = {}
+        for term in set(terms):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_id, frequency in self.postings[term]:
+                norm = 1 - self.b + self.b * self.doc_lengths[doc_id] / self.avg_length
+                score = idf * frequency * (self.k1 + 1) / (frequency + self.k1 * norm)
+                scores[doc_id] = scores.get(doc_id, 0.0) + score
+        return heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+
+
+def build_index(snapshot: CatalogSnapshot) -> BM25Index:
+    """
+    Builds the BM25 index of a catalog snapshot.
+
+    Args:
+        snapshot (CatalogSnapshot): The catalog to index.
+
+    Returns:
+        BM25Index: Index whose document ids are positions in snapshot.rows.
+    """
+    documents = []
+    for row in snapshot.rows:
+        terms = []
+        for field, weight in INDEXED_FIELDS.items():
+            terms.extend(tokenize(row.get(field)) * weight)
+        documents.append(terms)
+    return BM25Index(documents)
+
+
+def search_products(query: str, db_name=DB_NAME, top_k: int = CONTEXT_TOP_K) -> list:
+    """
+    Returns the products most relevant to a query.
+
+    Args:
+        query (str): Free text, usually the user's message and purchase history.
+        db_name (str): The name of the database.
+        top_k (int): Maximum number of products.
+
+    Returns:
+        list: (product row, score) pairs, best first.
+    """
+    snapshot = get_catalog(db_name)
+    index = snapshot.derived("bm25", build_index)
+    return [(snapshot.rows[doc_id], score) for doc_id, score in index.search(tokenize(query), top_k)]
+
+
+def fetch_relevant_rows(
+    user_message: str,
+    user_history: str = "",
+    db_name=DB_NAME,
+    top_k: int = CONTEXT_TOP_K,
+) -> list:
+    """
+    Retrieves the products relevant to the user's message, most relevant first.
+
+    In "full" mode the whole catalog is returned, as before. Otherwise the top-k
+    products for the message and purchase history are kept. Queries that match
+    nothing (e.g. generic recommendation requests) fall back to the first
+    in-stock products.
+
+    Args:
+        user_message (str): The user's natural language query.
+        user_history (str): The user's purchase history.
+        db_name (str): The name of the database.
+        top_k (int): Maximum number of products to include.
+
+    Returns:
+        list: Product rows as stored in the catalog snapshot.
+    """
+    if CONTEXT_MODE == "full":
+        return get_catalog(db_name).rows
+
+    rows = [row for row, _ in search_products(f"{user_message} {user_history or ''}", db_name, top_k)]
+    if not rows:
+        rows = [row for row in get_catalog(db_name).rows if row["stock"] > 0][:top_k]
+    return rows
+
+
+def fetch_relevant_context(
+    user_message: str,
+    user_history: str = "",
+    db_name=DB_NAME,
+    top_k: int = CONTEXT_TOP_K,
+    token_budget: int = None,
+) -> str:
+    """
+    Retrieves the part of the catalog relevant to the user's message.
+
+    The products returned by fetch_relevant_rows are kept in order, stopping
+    once the token budget, if any, is reached. In "full" mode the whole
+    catalog is returned. Requests are built by backend.prompt_builder, which
+    trims the products to PROMPT_TOKEN_BUDGET instead.
+
+    Args:
+        user_message (str): The user's natural language query.
+        user_history (str): The user's purchase history.
+        db_name (str): The name of the database.
+        top_k (int): Maximum number of products to include.
+        token_budget (int, optional): Maximum number of tokens for the context.
+
+    Returns:
+        str: The database context as a formatted string.
+    """
+    if CONTEXT_MODE == "full":
+        return get_catalog(db_name).context
+
+    selected = []
+    used_tokens = 0
+    for row in fetch_relevant_rows(user_message, user_history, db_name, top_k):
+        line_tokens = estimate_tokens(format_catalog_context([row])) + 1
+        if token_budget is not None and used_tokens + line_tokens > token_budget:
+            break
+        selected.append(row)
+        used_tokens += line_tokens
+
+    return format_catalog_context(selected)
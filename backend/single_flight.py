@@ -0,0 +1,146 @@
+import asyncio
+import threading
+
+
+class _Call:
+    """
+    An upstream call in flight, shared by every caller with the same key.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Collapses concurrent identical calls into a single execution.
+
+    The first caller for a key (the leader) runs the function; callers that
+    arrive with the same key while it is in flight wait for it and receive the
+    same result or exception. Unlike the response cache, nothing is kept once
+    the call returns, so this also protects a cold cache against a stampede.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.executions = 0
+        self.collapsed = 0
+        self.errors = 0
+        self._in_flight = {}  # key -> _Call
+        self._async_in_flight = {}  # key -> asyncio.Future
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn, timeout: float = None):
+        """
+        Runs `fn()` once for all threads calling with the same key concurrently.
+
+        Args:
+            key (str): Identifies the call, e.g. the response cache key.
+            fn (callable): Function performing the upstream call.
+            timeout (float, optional): Seconds a follower waits for the leader.
+
+        Returns:
+            The value returned by `fn`.
+
+        Raises:
+            TimeoutError: If a follower's timeout expires first.
+        """
+        with self._lock:
+            self.calls += 1
+            call = self._in_flight.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.collapsed += 1
+                leader = False
+            else:
+                call = self._in_flight[key] = _Call()
+                self.executions += 1
+                leader = True
+
+        if not leader:
+            if not call.done.wait(timeout):
+                raise TimeoutError("Timed out waiting for an identical in-flight call")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            call.done.set()
+        return call.result
+
+    async def do_async(self, key: str, fn, timeout: float = None):
+        """
+        Asynchronous variant of do: awaits `fn()` once for all tasks with the same key.
+
+        Args:
+            key (str): Identifies the call, e.g. the response cache key.
+            fn (callable): Function returning the awaitable performing the upstream call.
+            timeout (float, optional): Seconds a follower waits for the leader.
+
+        Returns:
+            The value the awaitable resolves to.
+
+        Raises:
+            TimeoutError: If a follower's timeout expires first.
+        """
+        future = self._async_in_flight.get(key)
+        if future is not None:
+            with self._lock:
+                self.calls += 1
+                self.collapsed += 1
+            # Shielded, so a cancelled follower does not cancel the leader
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+
+        future = self._async_in_flight[key] = asyncio.get_running_loop().create_future()
+        with self._lock:
+            self.calls += 1
+            self.executions += 1
+        try:
+            result = await fn()
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+            future.set_exception(e)
+            # Marked as retrieved, so asyncio does not warn when no follower awaited it
+            future.exception()
+            raise
+        except BaseException:
+            future.cancel()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._async_in_flight[key]
+
+    def stats(self) -> dict:
+        """
+        Returns the coalescing counters.
+
+        Returns:
+            dict: Calls, upstream executions, collapsed calls and calls currently in flight.
+        """
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "executions": self.executions,
+                "collapsed": self.collapsed,
+                "collapse_rate": self.collapsed / self.calls if self.calls else 0.0,
+                "errors": self.errors,
+                "in_flight": len(self._in_flight) + len(self._async_in_flight),
+            }
+
+
+single_flight = SingleFlight()
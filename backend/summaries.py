@@ -0,0 +1,198 @@
+"""
+Pre-aggregated summaries of the store database, kept by triggers.
+
+category_stock_summary holds the products and units in stock per category;
+brand_sales_summary holds the units sold per brand (one unit per row of
+user_purchases). Triggers on 'products' and 'user_purchases' update them
+in the same transaction as every write, so readers get a handful of rows
+instead of a GROUP BY over the whole tables.
+
+The command re-derives both summaries from a full scan and checks them:
+    python -m backend.summaries --db store.db
+    python -m backend.summaries --db store.db --verify
+"""
+import argparse
+import sqlite3
+import sys
+
+from backend.catalog import DB_NAME
+
+
+SUMMARY_TABLES_SQL = """
+CREATE TABLE IF NOT EXISTS category_stock_summary (
+    category TEXT PRIMARY KEY,
+    products INTEGER NOT NULL,
+    units INTEGER NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS brand_sales_summary (
+    brand TEXT PRIMARY KEY,
+    units_sold INTEGER NOT NULL
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS category_stock_insert AFTER INSERT ON products
+BEGIN
+    INSERT INTO category_stock_summary (category, products, units) VALUES (new.category, 1, new.stock)
+    ON CONFLICT (category) DO UPDATE SET products = products + 1, units = units + excluded.units;
+END;
+
+CREATE TRIGGER IF NOT EXISTS category_stock_delete AFTER DELETE ON products
+BEGIN
+    UPDATE category_stock_summary SET products = products - 1, units = units - old.stock
+    WHERE category = old.category;
+    DELETE FROM category_stock_summary WHERE category = old.category AND products = 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS category_stock_update AFTER UPDATE OF category, stock ON products
+BEGIN
+    UPDATE category_stock_summary SET products = products - 1, units = units - old.stock
+    WHERE category = old.category;
+    INSERT INTO category_stock_summary (category, products, units) VALUES (new.category, 1, new.stock)
+    ON CONFLICT (category) DO UPDATE SET products = products + 1, units = units + excluded.units;
+    DELETE FROM category_stock_summary WHERE category = old.category AND products = 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS brand_sales_purchase_insert AFTER INSERT ON user_purchases
+BEGIN
+    INSERT INTO brand_sales_summary (brand, units_sold)
+    SELECT brand, 1 FROM products WHERE product_id = new.product_id
+    ON CONFLICT (brand) DO UPDATE SET units_sold = units_sold + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS brand_sales_purchase_delete AFTER DELETE ON user_purchases
+BEGIN
+    UPDATE brand_sales_summary SET units_sold = units_sold - 1
+    WHERE brand = (SELECT brand FROM products WHERE product_id = old.product_id);
+    DELETE FROM brand_sales_summary WHERE units_sold = 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS brand_sales_purchase_update AFTER UPDATE OF product_id ON user_purchases
+BEGIN
+    UPDATE brand_sales_summary SET units_sold = units_sold - 1
+    WHERE brand = (SELECT brand FROM products WHERE product_id = old.product_id);
+    INSERT INTO brand_sales_summary (brand, units_sold)
+    SELECT brand, 1 FROM products WHERE product_id = new.product_id
+    ON CONFLICT (brand) DO UPDATE SET units_sold = units_sold + 1;
+    DELETE FROM brand_sales_summary WHERE units_sold = 0;
+END;
+
+-- A product's purchases follow it when its brand changes, and stop counting
+-- when it is deleted
+CREATE TRIGGER IF NOT EXISTS brand_sales_product_update AFTER UPDATE OF brand ON products
+WHEN old.brand IS NOT new.brand
+BEGIN
+    UPDATE brand_sales_summary
+    SET units_sold = units_sold - (SELECT COUNT(*) FROM user_purchases WHERE product_id = old.product_id)
+    WHERE brand = old.brand;
+    INSERT INTO brand_sales_summary (brand, units_sold)
+    SELECT new.brand, COUNT(*) FROM user_purchases WHERE product_id = new.product_id HAVING COUNT(*) > 0
+    ON CONFLICT (brand) DO UPDATE SET units_sold = units_sold + excluded.units_sold;
+    DELETE FROM brand_sales_summary WHERE units_sold = 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS brand_sales_product_delete AFTER DELETE ON products
+BEGIN
+    UPDATE brand_sales_summary
+    SET units_sold = units_sold - (SELECT COUNT(*) FROM user_purchases WHERE product_id = old.product_id)
+    WHERE brand = old.brand;
+    DELETE FROM brand_sales_summary WHERE units_sold = 0;
+END;
+
+-- Purchases recorded before their product existed start counting with it
+CREATE TRIGGER IF NOT EXISTS brand_sales_product_insert AFTER INSERT ON products
+BEGIN
+    INSERT INTO brand_sales_summary (brand, units_sold)
+    SELECT new.brand, COUNT(*) FROM user_purchases WHERE product_id = new.product_id HAVING COUNT(*) > 0
+    ON CONFLICT (brand) DO UPDATE SET units_sold = units_sold + excluded.units_sold;
+END;
+"""
+
+# Summary table -> (key column, full-scan query returning the same rows)
+SUMMARIES = {
+    "category_stock_summary": (
+        "category",
+        "SELECT category, COUNT(*) AS products, SUM(stock) AS units FROM products GROUP BY category",
+    ),
+    "brand_sales_summary": (
+        "brand",
+        """
+        SELECT p.brand, COUNT(*) AS units_sold
+        FROM user_purchases up JOIN products p ON p.product_id = up.product_id
+        GROUP BY p.brand
+        """,
+    ),
+}
+
+
+def rebuild_summaries(conn: sqlite3.Connection):
+    """
+    Replaces the content of every summary table with a full scan.
+
+    Args:
+        conn (sqlite3.Connection): Open connection, inside the caller's transaction.
+    """
+    for table, (_, query) in SUMMARIES.items():
+        conn.execute(f"DELETE FROM {table};")
+        conn.execute(f"INSERT INTO {table} {query};")
+
+
+def verify_summaries(conn: sqlite3.Connection) -> dict:
+    """
+    Compares every summary table with a full scan.
+
+    Args:
+        conn (sqlite3.Connection): Open connection to the database.
+
+    Returns:
+        dict: Summary table -> list of (key, stored row, scanned row) that
+        differ; empty lists when the summaries are exact.
+    """
+    differences = {}
+    for table, (key, query) in SUMMARIES.items():
+        stored = {row[0]: row for row in conn.execute(f"SELECT * FROM {table} ORDER BY {key};")}
+        scanned = {row[0]: row for row in conn.execute(query)}
+        differences[table] = [
+            (name, stored.get(name), scanned.get(name))
+            for name in sorted(set(stored) | set(scanned), key=str)
+            if stored.get(name) != scanned.get(name)
+        ]
+    return differences
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=DB_NAME, help="Database file")
+    parser.add_argument("--verify", action="store_true", help="Only compare the summaries with a full scan")
+    args = parser.parse_args()
+
+    # backend.migrations imports the summary SQL from here
+    from backend.migrations import migrate
+
+    migrate(args.db)
+    conn = sqlite3.connect(args.db, isolation_level=None)
+    try:
+        if not args.verify:
+            conn.execute("BEGIN IMMEDIATE;")
+            try:
+                rebuild_summaries(conn)
+                conn.execute("COMMIT;")
+            except Exception:
+                conn.execute("ROLLBACK;")
+                raise
+            print("Summaries rebuilt.")
+
+        differences = verify_summaries(conn)
+    finally:
+        conn.close()
+
+    drift = False
+    for table, rows in differences.items():
+        print(f"{table}: {'OK' if not rows else f'{len(rows)} rows differ'}")
+        for name, stored, scanned in rows:
+            print(f"  {name}: stored {stored}, full scan {scanned}")
+        drift = drift or bool(rows)
+    sys.exit(1 if drift else 0)
+
+
+if __name__ == "__main__":
+    main()
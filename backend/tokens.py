@@ -0,0 +1,21 @@
+import math
+
+
+# DeepSeek documents roughly 0.3 tokens per English character; good enough
+# for budgeting prompts without shipping a tokenizer.
+TOKENS_PER_CHAR = 0.3
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimates the number of tokens a text will use in a prompt.
+
+    Args:
+        text (str): The text to measure.
+
+    Returns:
+        int: Approximate token count.
+    """
+    if not text:
+        return 0
+    return math.ceil(len(text) * TOKENS_PER_CHAR)
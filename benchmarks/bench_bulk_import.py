@@ -0,0 +1,105 @@
+"""
+Bulk catalog import: the streaming loader versus row-by-row commits.
+
+Writes a synthetic CSV feed of each size in --sizes, loads it into an
+empty database with the loader (deferring the index builds or keeping the
+indexes up to date row by row), then loads the same feed again, which
+updates nothing. Each load runs in a child process, so its peak memory is
+reported on its own; it should stay flat as the feed grows. The first
+--sample rows are also inserted one statement and one commit at a time,
+the way small scripts usually write, for comparison.
+
+Usage:
+    python -m benchmarks.bench_bulk_import --sizes 100000 1000000
+"""
+import argparse
+import csv
+import multiprocessing
+import os
+import resource
+import shutil
+import tempfile
+import time
+
+from backend.connection import connect
+from benchmarks.synthetic import generate_products
+from data.bulk_import import PRODUCT_COLUMNS, UPSERT_SQL, bulk_import
+from data.create_db import create_database
+
+
+def write_feed(path: str, n_products: int):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(PRODUCT_COLUMNS)
+        writer.writerows(generate_products(n_products))
+
+
+def load(queue, path: str, db_name: str, defer_indexes: bool):
+    stats = bulk_import(path, db_name, defer_indexes=defer_indexes)
+    stats["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    queue.put(stats)
+
+
+def load_in_child(path: str, db_name: str, defer_indexes: bool) -> dict:
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=load, args=(queue, path, db_name, defer_indexes))
+    process.start()
+    stats = queue.get()
+    process.join()
+    return stats
+
+
+def row_by_row(path: str, db_name: str, sample: int) -> float:
+    create_database(db_name)
+    conn = connect(db_name)
+    start = time.perf_counter()
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        next(reader)
+        for i, row in enumerate(reader):
+            if i == sample:
+                break
+            conn.execute(UPSERT_SQL, row)
+            conn.commit()
+    conn.close()
+    return sample / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--sample", type=int, default=5_000, help="Rows inserted one commit at a time")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    try:
+        results = []
+        for size in args.sizes:
+            feed = os.path.join(workdir, f"feed_{size}.csv")
+            write_feed(feed, size)
+            for label, defer_indexes in (("deferred indexes", True), ("indexes kept", False)):
+                db_name = os.path.join(workdir, f"bulk_{size}_{defer_indexes}.db")
+                create_database(db_name)
+                results.append((size, label, load_in_child(feed, db_name, defer_indexes)))
+            results.append((size, "same feed again", load_in_child(feed, db_name, True)))
+            for name in os.listdir(workdir):
+                os.remove(os.path.join(workdir, name))
+
+        sample_db = os.path.join(workdir, "row_by_row.db")
+        feed = os.path.join(workdir, "sample.csv")
+        write_feed(feed, args.sample)
+        row_rate = row_by_row(feed, sample_db, args.sample)
+
+        print(f"\n{'rows':>10} {'load':>18} {'rows/s':>10} {'written':>10} {'peak RSS MB':>12}")
+        for size, label, stats in results:
+            print(
+                f"{size:>10,} {label:>18} {stats['rows_per_second']:>10,.0f} "
+                f"{stats['written']:>10,} {stats['peak_rss_mb']:>12.0f}"
+            )
+        print(f"\nOne statement and commit per row: {row_rate:,.0f} rows/s ({args.sample:,} rows)")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Benchmark of the rule-based product classification on a synthetic catalog.
+
+Compares the former classify_products rule (substring tests on every
+product) with the brand/category inverted index of backend.classifier,
+which classify_products now uses, on a generated catalog
+of --products products, and reports how many products the two disagree on
+(substring false positives of the original rule).
+
+Usage:
+    python -m benchmarks.bench_classify_products --products 1000000 --repeat 5
+"""
+import argparse
+import random
+import time
+
+from backend.classifier import BrandCategoryIndex
+
+
+BRANDS = [
+    "Apple", "Dell", "HP", "Samsung", "Google", "Logitech", "Razer", "Lenovo", "Asus", "Acer",
+    "LG", "Sony", "Microsoft", "Corsair", "SteelSeries", "Western Digital", "Seagate", "Kingston",
+    "Anker", "Belkin", "Bose", "JBL", "Xiaomi", "OnePlus", "Motorola", "Nokia", "Huawei", "MSI",
+    "Gigabyte", "BenQ",
+]
+CATEGORIES = [
+    "Computers", "Smartphones", "Peripherals", "Monitors", "Storage", "Audio", "Tablets",
+    "Wearables", "Networking", "Gaming", "Cameras", "Accessories",
+]
+MODELS = ["Pro", "Air", "Max", "Ultra", "Mini", "Plus", "Lite", "X", "S", "Neo"]
+
+HISTORIES = {
+    "short": "iPhone 14 Pro, Logitech MX Master 3",
+    "typical": "MacBook Air, Samsung T7 SSD, Razer BlackWidow V3, HP Pavilion 15",
+    # Brand names inside other words: the substring rule matches Apple and Dell
+    "trap": "Appleton Backpack, Dellwood Desk Lamp",
+    "long": ", ".join(f"{brand} {random.Random(i).choice(MODELS)} {i}" for i, brand in enumerate(BRANDS[:12])),
+}
+
+
+def synthetic_rows(products: int, seed: int) -> list:
+    rng = random.Random(seed)
+    rows = []
+    for product_id in range(1, products + 1):
+        brand = rng.choice(BRANDS)
+        rows.append(
+            {
+                "product_id": product_id,
+                "name": f"{brand} {rng.choice(MODELS)} {product_id}",
+                "category": rng.choice(CATEGORIES),
+                "brand": brand,
+                "price": round(rng.uniform(10, 3000), 2),
+                "stock": rng.choice([0, 1, 3, 5, 10, 25]),
+            }
+        )
+    return rows
+
+
+def classify_products_substring(user_history: str, inventory: list) -> dict:
+    # The rule classify_products used before the index
+    categories = {"Highly Recommended": [], "Recommended": [], "Not Recommended": []}
+    for name, category, brand, _, stock in inventory:
+        if stock <= 0:
+            continue
+        if brand in user_history or category in user_history:
+            categories["Highly Recommended"].append(name)
+        else:
+            categories["Not Recommended"].append(name)
+    return categories
+
+
+def best_of(repeat: int, fn):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rows = synthetic_rows(args.products, args.seed)
+    inventory = [(row["name"], row["category"], row["brand"], row["price"], row["stock"]) for row in rows]
+
+    start = time.perf_counter()
+    index = BrandCategoryIndex(rows)
+    print(f"Index of {len(index.names):,} in-stock products built in {time.perf_counter() - start:.2f}s")
+
+    print(f"{'history':>8} {'substring ms':>13} {'index ms':>9} {'speedup':>8} {'highly (old/new)':>17} {'disagree':>9}")
+    for label, history in HISTORIES.items():
+        old_time, old = best_of(args.repeat, lambda: classify_products_substring(history, inventory))
+        new_time, new = best_of(args.repeat, lambda: index.classify(history))
+        disagree = len(set(old["Highly Recommended"]) ^ set(new["Highly Recommended"]))
+        highly = f"{len(old['Highly Recommended']):,}/{len(new['Highly Recommended']):,}"
+        print(
+            f"{label:>8} {old_time * 1000:>13.1f} {new_time * 1000:>9.1f} {old_time / new_time:>7.1f}x "
+            f"{highly:>17} {disagree:>9,}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Queries per second of the backend's hot reads, with a connection per call
+and with the pooled WAL connections of backend.connection.
+
+Runs the same mix of queries (a user's purchase history, the recommendation
+buckets and a product lookup by name) on a copy of store.db for --duration
+seconds per mode and thread count. "per-call" opens and closes a default
+sqlite3 connection for every query, in the rollback journal mode, like the
+data access code did before; "pooled" reuses each thread's connection. With
+--writer, a background thread keeps updating stock meanwhile, which blocks
+the readers of the rollback journal but not the WAL readers.
+
+Usage:
+    python -m benchmarks.bench_connections --threads 1 4 --duration 3 --writer
+"""
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+from backend.connection import ConnectionManager
+from backend.database import BUCKET_SIZE, PRODUCT_BUCKETS_SQL
+from backend.migrations import migrate
+from benchmarks.load_async_vs_sync import REPO_ROOT
+
+
+HISTORY_SQL = """
+SELECT COALESCE(p.name, up.item_name)
+FROM user_purchases up LEFT JOIN products p ON p.product_id = up.product_id
+WHERE up.user_id = ? ORDER BY up.ts;
+"""
+PRODUCT_SQL = "SELECT name, category, brand, price, stock FROM products WHERE name = ?;"
+
+
+def run_queries(conn: sqlite3.Connection, user_id: int):
+    history = [name for (name,) in conn.execute(HISTORY_SQL, (user_id,))]
+    conn.execute(
+        PRODUCT_BUCKETS_SQL, {"history": json.dumps(history), "per_bucket": BUCKET_SIZE}
+    ).fetchall()
+    conn.execute(PRODUCT_SQL, (history[0] if history else "MacBook Air",)).fetchall()
+
+
+def per_call(db_name: str):
+    def query(user_id: int):
+        conn = sqlite3.connect(db_name)
+        try:
+            run_queries(conn, user_id)
+        finally:
+            conn.close()
+
+    def write(product_id: int):
+        conn = sqlite3.connect(db_name)
+        try:
+            with conn:
+                conn.execute("UPDATE products SET stock = stock WHERE product_id = ?;", (product_id,))
+        finally:
+            conn.close()
+
+    return query, write, lambda: None
+
+
+def pooled(db_name: str):
+    manager = ConnectionManager()
+
+    def query(user_id: int):
+        run_queries(manager.get(db_name), user_id)
+
+    def write(product_id: int):
+        with manager.get(db_name) as conn:
+            conn.execute("UPDATE products SET stock = stock WHERE product_id = ?;", (product_id,))
+
+    return query, write, manager.close
+
+
+MODES = {"per-call": per_call, "pooled": pooled}
+
+
+def measure(mode: str, db_name: str, threads: int, duration: float, writer: bool) -> dict:
+    query, write, close = MODES[mode](db_name)
+    stop = threading.Event()
+    counts = [0] * threads
+    errors = [0] * threads
+    writes = [0]
+
+    def reader(slot: int):
+        user_id = slot
+        while not stop.is_set():
+            try:
+                query(user_id % 5 + 1)
+                counts[slot] += 1
+            except sqlite3.OperationalError:
+                errors[slot] += 1  # "database is locked" after the busy timeout
+            user_id += 1
+        close()
+
+    def write_loop():
+        product_id = 0
+        while not stop.is_set():
+            try:
+                write(product_id % 10 + 1)
+                writes[0] += 1
+            except sqlite3.OperationalError:
+                pass
+            product_id += 1
+            time.sleep(0.001)
+        close()
+
+    workers = [threading.Thread(target=reader, args=(slot,)) for slot in range(threads)]
+    if writer:
+        workers.append(threading.Thread(target=write_loop))
+    for worker in workers:
+        worker.start()
+    time.sleep(duration)
+    stop.set()
+    for worker in workers:
+        worker.join()
+
+    return {"qps": sum(counts) / duration, "errors": sum(errors), "writes": writes[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--duration", type=float, default=3.0, help="Seconds per measurement")
+    parser.add_argument("--writer", action="store_true", help="Update stock in the background")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    try:
+        print(f"{'threads':>7} {'mode':>9} {'queries/s':>10} {'errors':>7} {'writes':>7}")
+        for threads in args.threads:
+            baseline = None
+            for mode in MODES:
+                # A fresh copy per mode: WAL mode is stored in the database file
+                db_name = os.path.join(workdir, f"{mode}_{threads}.db")
+                shutil.copy(os.path.join(REPO_ROOT, "store.db"), db_name)
+                migrate(db_name)
+                result = measure(mode, db_name, threads, args.duration, args.writer)
+                baseline = baseline or result["qps"]
+                print(
+                    f"{threads:>7} {mode:>9} {result['qps']:>10,.0f} {result['errors']:>7} {result['writes']:>7}"
+                    + (f"  {result['qps'] / baseline:.1f}x" if mode != "per-call" else "")
+                )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Cost of the dashboard data as the catalog grows.
+
+Builds synthetic catalogs of each --sizes size and times, per dashboard
+render, the previous loader (every row of every table into Python dicts,
+loaded twice, then KPI loops over lists) against the SQL aggregates of
+frontend/database_reader.py (plus the low stock alerts and the first and
+last pages of the inventory table), and against a render whose data is
+cached by catalog version, which only reads the version.
+
+Usage:
+    python -m benchmarks.bench_dashboard --sizes 10000 100000 500000
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+from benchmarks.load_async_vs_sync import REPO_ROOT
+from benchmarks.synthetic import make_catalog
+
+# The Streamlit app imports its modules from its own directory
+sys.path.insert(0, os.path.join(REPO_ROOT, "frontend"))
+from database_reader import (  # noqa: E402
+    get_catalog_version,
+    get_dashboard_kpis,
+    get_inventory_page,
+    get_low_stock_products,
+)
+
+
+def previous_loader(db_name: str) -> dict:
+    """
+    The previous get_database_content_as_dict, for comparison.
+    """
+    conn = sqlite3.connect(db_name)
+    cursor = conn.cursor()
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
+    content = {}
+    for (table_name,) in cursor.fetchall():
+        cursor.execute(f"SELECT * FROM {table_name}")
+        columns = [column[0] for column in cursor.description]
+        content[table_name] = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    conn.close()
+
+    parsed = {"Product": [], "Category": [], "Brand": [], "Stock": [], "Price": []}
+    for product in content.get("products", []):
+        parsed["Product"].append(product["name"])
+        parsed["Category"].append(product["category"])
+        parsed["Brand"].append(product["brand"])
+        parsed["Stock"].append(product["stock"])
+        parsed["Price"].append(f"${product['price']:.2f}")
+    return parsed
+
+
+def previous_render(db_name: str):
+    data = previous_loader(db_name)
+    kpis = (
+        sum(data["Stock"]),
+        sum(1 for stock in data["Stock"] if stock < 10),
+        sum(1 for stock in data["Stock"] if stock == 0),
+        len(set(data["Category"])),
+    )
+    previous_loader(db_name)  # The inventory table loaded everything again
+    return kpis
+
+
+def new_render(db_name: str, last_page: int):
+    kpis = get_dashboard_kpis(db_name, 10)
+    get_low_stock_products(db_name, 10, 20)
+    get_inventory_page(db_name, 0, 50)
+    get_inventory_page(db_name, last_page, 50)
+    return kpis
+
+
+def best_of(repeat: int, fn) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 500_000])
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    try:
+        print(f"{'products':>10} {'previous ms':>12} {'kpis ms':>8} {'render ms':>14} {'cached ms':>10}")
+        for size in args.sizes:
+            db_name = os.path.join(workdir, f"dashboard_{size}.db")
+            make_catalog(db_name, size, args.users)
+
+            previous = previous_render(db_name)
+            current = get_dashboard_kpis(db_name, 10)
+            assert previous == (
+                current["total_units"],
+                current["low_stock_items"],
+                current["out_of_stock_items"],
+                current["total_categories"],
+            ), (previous, current)
+
+            print(
+                f"{size:>10,} {best_of(args.repeat, lambda: previous_render(db_name)):>12.1f} "
+                f"{best_of(args.repeat, lambda: get_dashboard_kpis(db_name, 10)):>8.1f} "
+                f"{best_of(args.repeat, lambda: new_render(db_name, size - 50)):>14.1f} "
+                f"{best_of(args.repeat, lambda: get_catalog_version(db_name)):>10.3f}"
+            )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Following inventory changes through the feed versus re-reading the catalog.
+
+Builds a synthetic catalog of --products products. A writer thread updates
+stock at --rate updates per second for --duration seconds while a consumer
+follows them, either by long-polling wait_for_changes or, like consumers had
+to before, by re-reading every product each --poll-interval seconds and
+diffing the stock. Reports the rows read, the CPU time of the consumer and
+the delay between a commit and the consumer seeing it.
+
+Usage:
+    python -m benchmarks.bench_inventory_feed --products 200000 --rate 20 --duration 10
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+from backend.connection import get_connection
+from backend.inventory_feed import read_changes, wait_for_changes
+from benchmarks.synthetic import make_catalog
+
+
+def run_writer(db_name: str, products: int, rate: float, stop: threading.Event, committed: dict):
+    rng = random.Random(0)
+    conn = sqlite3.connect(db_name, isolation_level=None)
+    while not stop.is_set():
+        product_id = rng.randint(1, products)
+        conn.execute("UPDATE products SET stock = stock + 1 WHERE product_id = ?;", (product_id,))
+        event_id = conn.execute("SELECT MAX(event_id) FROM inventory_events;").fetchone()[0]
+        committed[event_id] = time.perf_counter()
+        time.sleep(1 / rate)
+    conn.close()
+
+
+def follow_feed(db_name: str, stop: threading.Event, committed: dict) -> dict:
+    delays, rows = [], 0
+    cpu = time.thread_time()
+    cursor = read_changes(None, db_name)["cursor"]
+    while not stop.is_set():
+        page = wait_for_changes(cursor, db_name, timeout=1.0)
+        seen = time.perf_counter()
+        for event in page["events"]:
+            if event["event_id"] in committed:
+                delays.append(seen - committed[event["event_id"]])
+        rows += len(page["events"])
+        cursor = page["cursor"]
+    return {"delays": delays, "rows": rows, "cpu": time.thread_time() - cpu}
+
+
+def poll_snapshots(db_name: str, stop: threading.Event, committed: dict, interval: float) -> dict:
+    delays, rows = [], 0
+    cpu = time.thread_time()
+    conn = get_connection(db_name)
+    cursor = conn.execute("SELECT COALESCE(MAX(event_id), 0) FROM inventory_events;").fetchone()[0]
+    previous = dict(conn.execute("SELECT product_id, stock FROM products;").fetchall())
+    while not stop.is_set():
+        time.sleep(interval)
+        current = dict(conn.execute("SELECT product_id, stock FROM products;").fetchall())
+        changed = [product_id for product_id, stock in current.items() if previous.get(product_id) != stock]
+        seen = time.perf_counter()
+        rows += len(current)
+        previous = current
+        if changed:
+            # Credit the snapshot with every commit since the last one
+            newest = max(committed) if committed else cursor
+            for event_id in range(cursor + 1, newest + 1):
+                if event_id in committed:
+                    delays.append(seen - committed[event_id])
+            cursor = newest
+    return {"delays": delays, "rows": rows, "cpu": time.thread_time() - cpu}
+
+
+def run(mode: str, db_name: str, args) -> dict:
+    stop = threading.Event()
+    committed = {}
+    result = {}
+
+    def consume():
+        if mode == "feed":
+            result.update(follow_feed(db_name, stop, committed))
+        else:
+            result.update(poll_snapshots(db_name, stop, committed, args.poll_interval))
+
+    consumer = threading.Thread(target=consume)
+    consumer.start()
+    time.sleep(0.5)  # Let the consumer take its starting point
+    writer = threading.Thread(target=run_writer, args=(db_name, args.products, args.rate, stop, committed))
+    writer.start()
+    time.sleep(args.duration)
+    stop.set()
+    writer.join()
+    consumer.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=200_000)
+    parser.add_argument("--rate", type=float, default=20, help="Stock updates per second")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds between snapshot polls")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    try:
+        db_name = os.path.join(workdir, "feed.db")
+        make_catalog(db_name, args.products)
+        print(f"\n{'consumer':>10} {'rows read':>11} {'cpu s':>6} {'delay p50 ms':>13} {'delay max ms':>13}")
+        for mode in ("snapshots", "feed"):
+            result = run(mode, db_name, args)
+            delays = [delay * 1000 for delay in result["delays"]] or [float("nan")]
+            print(
+                f"{mode:>10} {result['rows']:>11,} {result['cpu']:>6.2f} "
+                f"{statistics.median(delays):>13.1f} {max(delays):>13.1f}"
+            )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Benchmark of the recommendation buckets as the products table grows.
+
+Builds synthetic product tables of each --sizes size and times
+Database.get_product_categories (ranked and limited in SQL) against the
+previous implementation, which loaded every in-stock product into Python and
+walked them until each bucket was full.
+
+Usage:
+    python -m benchmarks.bench_product_buckets --sizes 10000 100000 1000000
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from backend.database import Database
+
+
+BRANDS = ["Apple", "Dell", "HP", "Samsung", "Google", "Logitech", "Razer"] + [f"Brand {i}" for i in range(100)]
+CATEGORIES = ["Computers", "Smartphones", "Peripherals"] + [f"Category {i}" for i in range(30)]
+
+HISTORIES = {
+    "products": "MacBook Air, Logitech MX Master 3",
+    "brands": "Logitech,Peripherals",
+    "none": "",
+}
+
+
+def create_products(db_name: str, size: int, seed: int):
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_name)
+    conn.execute("CREATE TABLE users (user_id INTEGER PRIMARY KEY, purchase_history TEXT);")
+    conn.execute(
+        """
+        CREATE TABLE products (
+            product_id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            category TEXT NOT NULL,
+            brand TEXT NOT NULL,
+            price REAL NOT NULL,
+            stock INTEGER NOT NULL,
+            description TEXT,
+            features TEXT
+        );
+        """
+    )
+    conn.executemany(
+        "INSERT INTO products (product_id, name, category, brand, price, stock) VALUES (?, ?, ?, ?, ?, ?);",
+        (
+            (i, f"Product {i}", rng.choice(CATEGORIES), rng.choice(BRANDS), 10.0, rng.choice([0, 1, 5, 20]))
+            for i in range(1, size + 1)
+        ),
+    )
+    conn.executemany(
+        "INSERT INTO products (name, category, brand, price, stock) VALUES (?, ?, ?, ?, ?);",
+        [
+            ("MacBook Air", "Computers", "Apple", 999.0, 5),
+            ("Logitech MX Master 3", "Peripherals", "Logitech", 99.0, 5),
+        ],
+    )
+    conn.commit()
+    conn.close()
+
+
+def python_buckets(db: Database, user_history: str) -> dict:
+    """
+    The previous get_product_categories, for comparison.
+    """
+    products = db.get_products()
+    categories = {"Highly Recommended": [], "Recommended": [], "Not Recommended": []}
+    history_items = user_history.split(",") if user_history else []
+
+    for product in products:
+        if (
+            len(categories["Highly Recommended"]) >= 2
+            and len(categories["Recommended"]) >= 2
+            and len(categories["Not Recommended"]) >= 2
+        ):
+            break
+
+        if product["brand"] in history_items or product["category"] in history_items:
+            if len(categories["Highly Recommended"]) < 2:
+                categories["Highly Recommended"].append(product["name"])
+        elif any(item in history_items for item in [product["brand"], product["category"]]):
+            if len(categories["Recommended"]) < 2:
+                categories["Recommended"].append(product["name"])
+        else:
+            if len(categories["Not Recommended"]) < 2:
+                categories["Not Recommended"].append(product["name"])
+
+    return categories
+
+
+def best_of(repeat: int, fn) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    try:
+        print(f"{'products':>10} {'history':>9} {'python ms':>10} {'sql ms':>8} {'speedup':>8}")
+        for size in args.sizes:
+            db_name = os.path.join(workdir, f"products_{size}.db")
+            create_products(db_name, size, args.seed)
+            db = Database(db_name)
+            db.get_product_categories("")  # Applies the migrations, which create the indexes
+
+            for label, history in HISTORIES.items():
+                python_time = best_of(args.repeat, lambda: python_buckets(db, history))
+                sql_time = best_of(args.repeat, lambda: db.get_product_categories(history))
+                print(
+                    f"{size:>10,} {label:>9} {python_time * 1000:>10.1f} {sql_time * 1000:>8.2f} "
+                    f"{python_time / sql_time:>7.0f}x"
+                )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
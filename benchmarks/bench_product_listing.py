@@ -0,0 +1,88 @@
+"""
+Cost of a /api/products page by depth, and of revalidating it with an ETag.
+
+Builds a synthetic catalog of --products products and reads pages of
+--limit products at several depths with the keyset cursor (`after`) and,
+for comparison, with LIMIT/OFFSET on the same query. Then requests the first
+page through the Flask test client and again with If-None-Match set to its
+ETag.
+
+Usage:
+    python -m benchmarks.bench_product_listing --products 500000 --limit 100
+"""
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from backend.connection import get_connection
+from backend.product_listing import list_products
+from benchmarks.synthetic import make_catalog
+
+
+def timed(fn, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=500_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    try:
+        # The routes use the default database name, relative to the working directory
+        os.chdir(workdir)
+        make_catalog("store.db", args.products)
+
+        from backend import create_app
+
+        client = create_app().test_client()
+        conn = get_connection("store.db")
+
+        print(f"\n{'depth':>9} {'keyset ms':>10} {'offset ms':>10}")
+        for depth in (0, args.products // 10, args.products // 2, args.products - args.limit):
+            keyset, _ = timed(lambda: list_products("store.db", after=depth, limit=args.limit), args.repeat)
+            offset, _ = timed(
+                lambda: conn.execute(
+                    "SELECT product_id, name, category, brand, price, stock FROM products "
+                    "ORDER BY product_id LIMIT ? OFFSET ?;",
+                    (args.limit, depth),
+                ).fetchall(),
+                args.repeat,
+            )
+            print(f"{depth:>9,} {keyset:>10.2f} {offset:>10.2f}")
+
+        full, response = timed(lambda: client.get(f"/api/products?limit={args.limit}"), args.repeat)
+        etag = response.headers["ETag"]
+        revalidated, not_modified = timed(
+            lambda: client.get(f"/api/products?limit={args.limit}", headers={"If-None-Match": etag}),
+            args.repeat,
+        )
+        print(
+            f"\nFirst page: {full:.2f}ms, {len(response.data):,} bytes; "
+            f"revalidated ({not_modified.status_code}): {revalidated:.2f}ms, {len(not_modified.data)} bytes"
+        )
+
+        filtered, response = timed(
+            lambda: client.get(f"/api/products?limit={args.limit}&category=Monitors&in_stock=1&fields=name,price"),
+            args.repeat,
+        )
+        print(f"Filtered, projected page: {filtered:.2f}ms, {len(response.data):,} bytes")
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Latency of the full-text product search as the catalog grows.
+
+Builds synthetic catalogs of each --sizes size (with the FTS5 index kept by
+the migration triggers) and times search_catalog on a set of queries, for
+the first page and a deep page, against the in-memory BM25 retrieval index,
+which has to be rebuilt from the whole catalog after every product change.
+
+Usage:
+    python -m benchmarks.bench_product_search --sizes 100000 500000
+"""
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from backend.catalog import get_catalog
+from backend.product_search import search_catalog
+from backend.retrieval import build_index, search_products
+from benchmarks.synthetic import make_catalog
+
+
+QUERIES = [
+    "apple",
+    "logitech mouse",
+    "samsung monitor ultra",
+    "bluetooth noise cancelling",
+    "razer gam",  # Prefix of the last term, as typed
+    "4k uhd",
+    "nothing matches this",
+]
+
+
+def timed(fn, repeat: int) -> list:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 500_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--deep-offset", type=int, default=500, help="Offset of the deep page")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    try:
+        for size in args.sizes:
+            db_name = os.path.join(workdir, f"search_{size}.db")
+            start = time.perf_counter()
+            make_catalog(db_name, size)
+            print(f"\n{size:,} products, created and indexed in {time.perf_counter() - start:.1f}s")
+
+            start = time.perf_counter()
+            snapshot = get_catalog(db_name)
+            snapshot.derived("bm25", build_index)
+            print(f"In-memory BM25 index rebuilt in {time.perf_counter() - start:.1f}s")
+
+            print(f"{'query':>28} {'matches':>8} {'fts p50':>8} {'fts max':>8} {'deep p50':>9} {'bm25 p50':>9}")
+            for query in QUERIES:
+                first = timed(lambda: search_catalog(query, db_name), args.repeat)
+                deep = timed(lambda: search_catalog(query, db_name, offset=args.deep_offset), args.repeat)
+                bm25 = timed(lambda: search_products(query, db_name, 20), args.repeat)
+                matches = len(search_catalog(query, db_name, limit=100)["results"])
+                print(
+                    f"{query:>28} {matches if matches < 100 else '100+':>8} {statistics.median(first):>6.1f}ms "
+                    f"{max(first):>6.1f}ms {statistics.median(deep):>7.1f}ms {statistics.median(bm25):>7.1f}ms"
+                )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Compares prompt size and latency of the full catalog dump against
+retrieval-based context at several catalog sizes.
+
+Usage:
+    python -m benchmarks.bench_prompt_context --sizes 10 10000 100000
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+# The backend package builds the API client on import
+os.environ.setdefault("DEEPSEEK_API_KEY", "benchmark")
+
+from backend.catalog import get_catalog
+from backend.retrieval import fetch_relevant_context
+from backend.tokens import estimate_tokens
+from benchmarks.synthetic import make_catalog
+
+
+QUERIES = [
+    ("How many Dell monitors do you have in stock?", ""),
+    ("Is there a Samsung tablet with OLED display?", ""),
+    ("Generate personalized recommendations based on my history.", "Apple Computer Pro 12, Logitech Peripheral Mini 40"),
+    ("What is the price of the Razer keyboard with mechanical switches?", ""),
+]
+
+# deepseek-chat context window, in tokens
+CONTEXT_WINDOW = 64000
+
+
+def measure(build, repeat: int):
+    timings = []
+    prompt_tokens = []
+    for _ in range(repeat):
+        for message, history in QUERIES:
+            start = time.perf_counter()
+            context = build(message, history)
+            timings.append(time.perf_counter() - start)
+            prompt_tokens.append(estimate_tokens(context) + estimate_tokens(message))
+    return statistics.median(timings), statistics.mean(prompt_tokens)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--prefill-tokens-per-sec",
+        type=float,
+        default=4000.0,
+        help="Assumed upstream prompt processing rate used to estimate end-to-end latency",
+    )
+    args = parser.parse_args()
+
+    print(
+        f"{'products':>9} {'mode':>10} {'cold ms':>9} {'warm ms':>9} "
+        f"{'tokens':>9} {'est. e2e ms':>12} {'fits':>5}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            db_name = os.path.join(tmp, f"catalog_{size}.db")
+            make_catalog(db_name, size)
+
+            modes = {
+                "full": lambda message, history: get_catalog(db_name).context,
+                "retrieval": lambda message, history: fetch_relevant_context(message, history, db_name),
+            }
+            for mode, build in modes.items():
+                start = time.perf_counter()
+                build(*QUERIES[0])
+                cold = time.perf_counter() - start
+
+                warm, tokens = measure(build, args.repeat)
+                e2e = warm + tokens / args.prefill_tokens_per_sec
+                print(
+                    f"{size:>9} {mode:>10} {cold * 1000:>9.2f} {warm * 1000:>9.3f} "
+                    f"{tokens:>9.0f} {e2e * 1000:>12.1f} {'yes' if tokens < CONTEXT_WINDOW else 'NO':>5}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Chart queries from the trigger-maintained summaries versus a GROUP BY scan,
+and what the triggers add to each write.
+
+Builds a synthetic catalog of --products products and --users users, then
+times the dashboard chart rows read from the summary tables against the
+full-scan queries they replace, and the cost of --writes stock updates and
+purchase inserts with and without the summary triggers.
+
+Usage:
+    python -m benchmarks.bench_summaries --products 500000 --users 50000
+"""
+import argparse
+import os
+import random
+import re
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from backend.summaries import SUMMARIES, SUMMARY_TABLES_SQL, verify_summaries
+from benchmarks.synthetic import make_catalog
+
+
+CHART_SQL = """
+SELECT 'stock_by_category', category, units FROM category_stock_summary
+UNION ALL
+SELECT 'sales_by_brand', brand, units_sold FROM brand_sales_summary;
+"""
+
+
+def best_of(repeat: int, fn) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def run_writes(conn: sqlite3.Connection, writes: int, products: int, seed: int) -> float:
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    with conn:
+        for i in range(writes):
+            product_id = rng.randint(1, products)
+            conn.execute("UPDATE products SET stock = ? WHERE product_id = ?;", (rng.randint(0, 50), product_id))
+            conn.execute(
+                "INSERT INTO user_purchases (user_id, ts, item_name, product_id) VALUES (?, ?, ?, ?);",
+                (rng.randint(1, 1000), time.time() + i, f"Product {product_id}", product_id),
+            )
+    return (time.perf_counter() - start) * 1e6 / writes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=500_000)
+    parser.add_argument("--users", type=int, default=50_000)
+    parser.add_argument("--writes", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    try:
+        db_name = os.path.join(workdir, "summaries.db")
+        make_catalog(db_name, args.products, args.users)
+        conn = sqlite3.connect(db_name)
+        purchases = conn.execute("SELECT COUNT(*) FROM user_purchases;").fetchone()[0]
+        print(f"\n{args.products:,} products, {purchases:,} purchases")
+
+        summary_ms = best_of(args.repeat, lambda: conn.execute(CHART_SQL).fetchall())
+        scan_ms = best_of(
+            args.repeat, lambda: [conn.execute(query).fetchall() for _, query in SUMMARIES.values()]
+        )
+        print(f"Chart rows: {summary_ms:.3f}ms from the summaries, {scan_ms:.1f}ms with GROUP BY scans")
+
+        with_triggers = run_writes(conn, args.writes, args.products, seed=1)
+        assert not any(verify_summaries(conn).values()), "The summaries drifted"
+
+        for trigger in re.findall(r"CREATE TRIGGER IF NOT EXISTS (\w+)", SUMMARY_TABLES_SQL):
+            conn.execute(f"DROP TRIGGER {trigger};")
+        without_triggers = run_writes(conn, args.writes, args.products, seed=2)
+        print(
+            f"Stock update + purchase insert: {with_triggers:.1f}us with the summary triggers, "
+            f"{without_triggers:.1f}us without"
+        )
+        conn.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
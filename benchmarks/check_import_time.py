@@ -0,0 +1,97 @@
+"""
+Import-time budget check for the backend.
+
+Runs `from backend import create_app; create_app()` in a fresh interpreter
+with `-X importtime`, without DEEPSEEK_API_KEY, and fails (exit status 1)
+if the imports take longer than the budget or load a module that should
+only be imported on the first model call (the OpenAI SDK, httpx, pydantic,
+tenacity). The best of --runs runs is kept, to filter out a cold disk cache.
+
+Usage:
+    python -m benchmarks.check_import_time
+    python -m benchmarks.check_import_time --budget-ms 300 --top 20
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+from benchmarks.load_async_vs_sync import REPO_ROOT
+
+
+STARTUP = "from backend import create_app; create_app()"
+
+# Heavy modules that routes answering from the catalog never need
+DEFERRED_MODULES = ("openai", "httpx", "pydantic", "tenacity")
+
+
+def parse_importtime(output: str) -> list:
+    """
+    Parses the `-X importtime` report of an interpreter.
+
+    Args:
+        output (str): The interpreter's stderr.
+
+    Returns:
+        list: (module, self microseconds, cumulative microseconds, depth) tuples, in import order.
+    """
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        if not self_us.strip().isdigit():
+            continue  # Header line
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        modules.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return modules
+
+
+def measure() -> list:
+    """
+    Imports the app once in a fresh interpreter and returns its import report.
+    """
+    env = {key: value for key, value in os.environ.items() if key != "DEEPSEEK_API_KEY"}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", STARTUP],
+        cwd=REPO_ROOT,
+        env=dict(env, PYTHONPATH=REPO_ROOT),
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Creating the app failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=400.0, help="Maximum total import time")
+    parser.add_argument("--runs", type=int, default=3, help="Runs to take the best of")
+    parser.add_argument("--top", type=int, default=10, help="Slowest top-level imports to print")
+    args = parser.parse_args()
+
+    modules = min((measure() for _ in range(max(1, args.runs))), key=lambda report: sum(m[1] for m in report))
+    total_ms = sum(self_us for _, self_us, _, _ in modules) / 1000
+    loaded = {name for name, _, _, _ in modules}
+
+    print(f"Slowest top-level imports of `{STARTUP}`:")
+    top_level = sorted((m for m in modules if m[3] == 0), key=lambda m: m[2], reverse=True)
+    for name, _, cumulative_us, _ in top_level[: args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+    print(f"Total import time: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+
+    failures = []
+    if total_ms > args.budget_ms:
+        failures.append(f"import time {total_ms:.1f} ms is over the {args.budget_ms:.0f} ms budget")
+    for module in DEFERRED_MODULES:
+        if module in loaded:
+            failures.append(f"'{module}' is imported at startup instead of on the first model call")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
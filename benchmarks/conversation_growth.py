@@ -0,0 +1,104 @@
+"""
+Prompt size per turn of a long conversation, with and without summarization.
+
+Runs one chat session of --turns messages through generate_response against
+the local DeepSeek stub and a copy of store.db, twice: with the history
+bounded by CONVERSATION_TOKEN_BUDGET (older turns folded into a rolling
+summary) and with an unbounded history, which grows with every turn.
+
+Usage:
+    python -m benchmarks.conversation_growth --turns 30 --reply-tokens 120
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from benchmarks.load_async_vs_sync import REPO_ROOT, free_port, start, wait_for_port
+
+
+QUESTIONS = [
+    "Which laptop should I buy for programming?",
+    "And which one has more memory?",
+    "Would it work for gaming too?",
+    "Recommend accessories for it",
+    "Which of those is the cheapest?",
+    "Is there a good monitor to go with it?",
+]
+
+
+def run_session(turns: int, token_budget: int, db_name: str) -> list:
+    """
+    Sends `turns` messages in one session and returns the prompt tokens of each.
+    """
+    from backend.conversations import ConversationStats, conversations
+    from backend.deepseek_integration import generate_response
+
+    conversations.clear()
+    conversations.token_budget = token_budget
+    conversations.stats = ConversationStats()
+    session_id = f"growth-{token_budget}"
+
+    for turn in range(turns):
+        message = f"{QUESTIONS[turn % len(QUESTIONS)]} (turn {turn + 1})"
+        response = generate_response(message, 1, db_name, session_id=session_id)
+        if response["status"] != "success":
+            raise RuntimeError(response["message"])
+        # Like a user reading the answer, give the background summary time to land
+        while conversations.get(session_id, 1).folding:
+            time.sleep(0.01)
+
+    growth = conversations.stats.as_dict()["avg_prompt_tokens_by_turn"]
+    return [growth[key] for key in growth], conversations.stats.as_dict()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=30)
+    parser.add_argument("--reply-tokens", type=int, default=120, help="Length of the stub's answers")
+    parser.add_argument("--budget", type=int, default=None, help="History token budget (default: CONVERSATION_TOKEN_BUDGET)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    shutil.copy(os.path.join(REPO_ROOT, "store.db"), workdir)
+    stub_port = free_port()
+    os.environ.update(
+        DEEPSEEK_API_KEY="benchmark",
+        DEEPSEEK_BASE_URL=f"http://127.0.0.1:{stub_port}",
+        CONVERSATION_MAX_SESSIONS="10",
+        # Every turn must reach the model, so it sees the whole history
+        LLM_CACHE_MAX_ENTRIES="0",
+    )
+    stub = start(
+        [
+            sys.executable, "-m", "benchmarks.mock_deepseek", "--port", str(stub_port),
+            "--latency", "0", "--reply-tokens", str(args.reply_tokens),
+        ],
+        REPO_ROOT,
+        dict(os.environ, PYTHONPATH=REPO_ROOT),
+    )
+    try:
+        wait_for_port(stub_port)
+        from backend.conversations import CONVERSATION_TOKEN_BUDGET
+
+        budget = args.budget or CONVERSATION_TOKEN_BUDGET
+        db_name = os.path.join(workdir, "store.db")
+        bounded, bounded_stats = run_session(args.turns, budget, db_name)
+        unbounded, _ = run_session(args.turns, 10**9, db_name)
+    finally:
+        stub.terminate()
+        stub.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"Prompt tokens per turn (history budget {budget} tokens):")
+    print(f"{'turn':>6} {'summarized':>11} {'full history':>13}")
+    for turn, (summarized, full) in enumerate(zip(bounded, unbounded), start=1):
+        label = f"{turn}+" if turn == len(bounded) and args.turns > len(bounded) else str(turn)
+        print(f"{label:>6} {summarized:>11.0f} {full:>13.0f}")
+    print(f"Folds: {bounded_stats['folds']} ({bounded_stats['fold_failures']} failed)")
+
+
+if __name__ == "__main__":
+    main()
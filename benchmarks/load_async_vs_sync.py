@@ -0,0 +1,223 @@
+"""
+Load test of the sync Flask path against the async ASGI path.
+
+Both servers run as subprocesses against a copy of store.db and the local
+DeepSeek stub, so no API calls are billed. Reports requests/sec, latency and
+the peak memory and thread count of each server process.
+
+Usage:
+    python -m benchmarks.load_async_vs_sync --concurrency 50 200 --requests 1000 --latency 0.5
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        with socket.socket() as sock:
+            if sock.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.1)
+    raise RuntimeError(f"Nothing is listening on port {port}")
+
+
+def process_status(pid: int) -> dict:
+    """
+    Reads the resident memory (KiB) and thread count of a process.
+    """
+    status = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("VmRSS", "Threads"):
+                status[key] = int(value.split()[0])
+    return status
+
+
+class PeakSampler(threading.Thread):
+    """
+    Samples a process in the background and keeps the peak values.
+    """
+
+    def __init__(self, pid: int, interval: float = 0.05):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.peak_rss = 0
+        self.peak_threads = 0
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.is_set():
+            try:
+                status = process_status(self.pid)
+            except OSError:
+                return
+            self.peak_rss = max(self.peak_rss, status.get("VmRSS", 0))
+            self.peak_threads = max(self.peak_threads, status.get("Threads", 0))
+            time.sleep(self.interval)
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+
+async def post_json(conn: list, port: int, path: str, payload: dict) -> int:
+    """
+    Sends one POST over a kept-alive connection and returns the status code.
+
+    `conn` holds the (reader, writer) pair of the worker and is reopened when
+    the server closes it. Plain asyncio streams keep the driver cheap enough
+    that it is not the bottleneck of the measurement.
+    """
+    if not conn:
+        conn.extend(await asyncio.open_connection("127.0.0.1", port))
+    reader, writer = conn
+    body = json.dumps(payload).encode("utf-8")
+    writer.write(
+        f"POST {path} HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode()
+        + body
+    )
+    head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1").lower()
+    status = int(head.split(" ", 2)[1])
+    length = 0
+    for line in head.split("\r\n")[1:]:
+        name, _, value = line.partition(":")
+        if name == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    if "connection: close" in head or head.startswith("http/1.0"):
+        writer.close()
+        conn.clear()
+    return status
+
+
+async def drive(port: int, total: int, concurrency: int) -> dict:
+    """
+    Sends `total` chat requests from `concurrency` keep-alive workers.
+    """
+    latencies = []
+    errors = 0
+    pending = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        conn = []
+        for i in pending:
+            # Unique messages, so the response cache never answers
+            payload = {"message": f"Recommend accessories for order {i}", "user_id": 1 + i % 5}
+            start = time.perf_counter()
+            try:
+                if await post_json(conn, port, "/api/chat", payload) != 200:
+                    errors += 1
+            except (OSError, ValueError, asyncio.IncompleteReadError):
+                errors += 1
+                conn.clear()
+            latencies.append(time.perf_counter() - start)
+        if conn:
+            conn[1].close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "rps": total / elapsed,
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(len(latencies) * 0.95) - 1],
+        "errors": errors,
+    }
+
+
+def start(command: list, cwd: str, env: dict) -> subprocess.Popen:
+    return subprocess.Popen(command, cwd=cwd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[50, 200])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.5, help="Stub seconds per completion")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    shutil.copy(os.path.join(REPO_ROOT, "store.db"), workdir)
+
+    mock_port = free_port()
+    env = dict(
+        os.environ,
+        PYTHONPATH=REPO_ROOT,
+        DEEPSEEK_API_KEY="benchmark",
+        DEEPSEEK_BASE_URL=f"http://127.0.0.1:{mock_port}",
+    )
+    servers = {
+        "sync (Flask)": lambda port: [
+            sys.executable, "-m", "flask", "--app", os.path.join(REPO_ROOT, "run.py"),
+            "run", "--port", str(port),
+        ],
+        "async (ASGI)": lambda port: [
+            sys.executable, "-m", "uvicorn", "backend.async_app:app",
+            "--port", str(port), "--log-level", "warning", "--backlog", "4096",
+            "--timeout-keep-alive", "30",
+        ],
+    }
+
+    mock = start(
+        [sys.executable, "-m", "benchmarks.mock_deepseek", "--port", str(mock_port), "--latency", str(args.latency)],
+        REPO_ROOT,
+        env,
+    )
+    try:
+        wait_for_port(mock_port)
+        print(
+            f"{'server':>14} {'conc.':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+            f"{'errors':>7} {'peak RSS MiB':>13} {'peak threads':>13}"
+        )
+        for name, command in servers.items():
+            for concurrency in args.concurrency:
+                port = free_port()
+                server = start(command(port), workdir, env)
+                try:
+                    wait_for_port(port)
+                    sampler = PeakSampler(server.pid)
+                    sampler.start()
+                    result = asyncio.run(drive(port, args.requests, concurrency))
+                    sampler.stop()
+                finally:
+                    server.terminate()
+                    server.wait()
+                print(
+                    f"{name:>14} {concurrency:>6} {result['rps']:>8.1f} {result['p50'] * 1000:>8.0f} "
+                    f"{result['p95'] * 1000:>8.0f} {result['errors']:>7} "
+                    f"{sampler.peak_rss / 1024:>13.1f} {sampler.peak_threads:>13}"
+                )
+    finally:
+        mock.terminate()
+        mock.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+"""
+End-to-end load driver for the Flask app.
+
+Runs concurrent chat sessions against /api/chat, /api/chat/stream and
+/api/recommendations and reports p50/p95/p99 latency, throughput and error
+rates per endpoint (plus time to first event for streams). Each session is a
+user (or an anonymous visitor) sending a mix of requests over one keep-alive
+connection.
+
+With --start, the local DeepSeek stub and the Flask app are started on free
+ports against a copy of store.db, so runs cost nothing and are repeatable:
+
+    python -m benchmarks.load_driver --start --sessions 50 --duration 30 \\
+        --stub-args "--latency 0.8 --latency-dist lognormal --spread 0.4 --error-rate 0.01"
+
+Against an app that is already running:
+
+    python -m benchmarks.load_driver --url http://127.0.0.1:5000 --sessions 20 --duration 60
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shlex
+import shutil
+import sys
+import tempfile
+import time
+from urllib.parse import urlparse
+
+from benchmarks.load_async_vs_sync import REPO_ROOT, free_port, start, wait_for_port
+
+
+# Chat messages sent by the sessions: plain stock/price/info questions and
+# open questions that need the model
+CHAT_MESSAGES = [
+    "How many MacBook Air do you have in stock?",
+    "What is the price of the iPhone 14 Pro?",
+    "Tell me about the Dell UltraSharp U2723QE",
+    "Which laptop should I buy for programming?",
+    "Recommend accessories for my setup",
+    "Compare the Samsung Galaxy S22 and the Google Pixel 7",
+    "Is there a good keyboard for gaming?",
+    "What should I get to store my photos?",
+]
+
+USER_IDS = [None, 1, 2, 3, 4, 5]
+
+
+class Connection:
+    """
+    Minimal keep-alive HTTP/1.1 client on asyncio streams.
+
+    Much cheaper per request than a full client library, so the driver is
+    not the bottleneck of the measurement.
+    """
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self._reader = None
+        self._writer = None
+        self._version = None
+
+    async def request(self, method: str, path: str, payload: dict = None, on_first_chunk=None):
+        """
+        Sends a request and reads the whole response.
+
+        Args:
+            method (str): HTTP method.
+            path (str): Path and query string.
+            payload (dict, optional): JSON body.
+            on_first_chunk (callable, optional): Called when the first body bytes arrive.
+
+        Returns:
+            tuple: Status code and body bytes.
+        """
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+        head = f"{method} {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+        if payload is not None:
+            head += f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+        self._writer.write((head + "\r\n").encode() + body)
+
+        try:
+            status, headers = await self._read_head()
+            data = await self._read_body(headers, on_first_chunk)
+        except Exception:
+            self.close()
+            raise
+
+        if headers.get("connection") == "close" or self._version == "http/1.0":
+            self.close()
+        return status, data
+
+    async def _read_head(self):
+        head = (await self._reader.readuntil(b"\r\n\r\n")).decode("latin-1")
+        lines = head.split("\r\n")
+        self._version, status = lines[0].lower().split(" ", 2)[:2]
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            if name:
+                headers[name.strip().lower()] = value.strip().lower()
+        return int(status), headers
+
+    async def _read_body(self, headers: dict, on_first_chunk) -> bytes:
+        if "content-length" in headers:
+            data = await self._reader.readexactly(int(headers["content-length"]))
+            if on_first_chunk:
+                on_first_chunk()
+            return data
+
+        if headers.get("transfer-encoding") == "chunked":
+            pieces = []
+            while True:
+                size = int((await self._reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                if size == 0:
+                    await self._reader.readuntil(b"\r\n")
+                    return b"".join(pieces)
+                pieces.append((await self._reader.readexactly(size + 2))[:-2])
+                if on_first_chunk and len(pieces) == 1:
+                    on_first_chunk()
+
+        # No length: the body ends when the server closes the connection
+        data = await self._reader.read()
+        if on_first_chunk:
+            on_first_chunk()
+        headers["connection"] = "close"
+        return data
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+
+class Results:
+    """
+    Latencies and errors per endpoint.
+    """
+
+    def __init__(self):
+        self.latencies = {}
+        self.first_event = {}
+        self.errors = {}
+
+    def record(self, endpoint: str, latency: float, ok: bool, first_event: float = None):
+        self.latencies.setdefault(endpoint, []).append(latency)
+        self.errors[endpoint] = self.errors.get(endpoint, 0) + (0 if ok else 1)
+        if first_event is not None:
+            self.first_event.setdefault(endpoint, []).append(first_event)
+
+
+def percentile(values: list, p: float) -> float:
+    """
+    Nearest-rank percentile of a list of numbers.
+    """
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * p // 100))
+    return ordered[int(rank) - 1]
+
+
+async def session(
+    conn: Connection,
+    results: Results,
+    deadline: float,
+    mix: dict,
+    think_time: float,
+    unique: bool,
+    rng: random.Random,
+):
+    """
+    Sends requests from one user until the deadline.
+    """
+    user_id = rng.choice(USER_IDS)
+    endpoints = list(mix)
+    weights = [mix[endpoint] for endpoint in endpoints]
+
+    while time.perf_counter() < deadline:
+        endpoint = rng.choices(endpoints, weights)[0]
+        message = rng.choice(CHAT_MESSAGES)
+        if unique:
+            # Defeats the response cache, so every chat request reaches the model
+            message += f" (ref {rng.getrandbits(48):x})"
+        first_event = []
+        start = time.perf_counter()
+        try:
+            if endpoint == "recommendations":
+                path = "/api/recommendations" + (f"?user_id={user_id}" if user_id else "")
+                status, body = await conn.request("GET", path)
+                ok = status == 200
+            elif endpoint == "stream":
+                status, body = await conn.request(
+                    "POST",
+                    "/api/chat/stream",
+                    {"message": message, "user_id": user_id},
+                    on_first_chunk=lambda: first_event.append(time.perf_counter() - start),
+                )
+                ok = status == 200 and b"event: error" not in body and b"event: done" in body
+            else:
+                status, body = await conn.request("POST", "/api/chat", {"message": message, "user_id": user_id})
+                ok = status == 200
+        except (OSError, ValueError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            ok = False
+        results.record(endpoint, time.perf_counter() - start, ok, first_event[0] if first_event else None)
+        if think_time:
+            await asyncio.sleep(rng.expovariate(1 / think_time))
+    conn.close()
+
+
+async def run(
+    host: str,
+    port: int,
+    sessions: int,
+    duration: float,
+    mix: dict,
+    think_time: float,
+    unique: bool,
+    seed: int,
+) -> tuple:
+    results = Results()
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(
+        *(
+            session(Connection(host, port), results, deadline, mix, think_time, unique, random.Random(rng.random()))
+            for _ in range(sessions)
+        )
+    )
+    return results, time.perf_counter() - start
+
+
+def report(results: Results, elapsed: float, sessions: int) -> dict:
+    """
+    Prints the summary table and returns it as a dict.
+    """
+    summary = {"sessions": sessions, "elapsed": elapsed, "endpoints": {}}
+    print(
+        f"{'endpoint':>16} {'requests':>9} {'req/s':>8} {'errors':>7} {'err %':>6} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'first p50':>10} {'first p95':>10}"
+    )
+    total = errors = 0
+    for endpoint, latencies in sorted(results.latencies.items()):
+        count = len(latencies)
+        failed = results.errors[endpoint]
+        first = results.first_event.get(endpoint)
+        row = {
+            "requests": count,
+            "rps": count / elapsed,
+            "errors": failed,
+            "error_rate": failed / count,
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "first_event_p50": percentile(first, 50) if first else None,
+            "first_event_p95": percentile(first, 95) if first else None,
+        }
+        summary["endpoints"][endpoint] = row
+        total += count
+        errors += failed
+        first_cells = (
+            f"{row['first_event_p50'] * 1000:>10.0f} {row['first_event_p95'] * 1000:>10.0f}"
+            if first
+            else f"{'-':>10} {'-':>10}"
+        )
+        print(
+            f"{endpoint:>16} {count:>9} {row['rps']:>8.1f} {failed:>7} {row['error_rate'] * 100:>6.1f} "
+            f"{row['p50'] * 1000:>8.0f} {row['p95'] * 1000:>8.0f} {row['p99'] * 1000:>8.0f} {first_cells}"
+        )
+
+    summary["requests"] = total
+    summary["rps"] = total / elapsed
+    summary["error_rate"] = errors / total if total else 0.0
+    print(f"{'total':>16} {total:>9} {summary['rps']:>8.1f} {errors:>7} {summary['error_rate'] * 100:>6.1f}")
+    return summary
+
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for part in text.split(","):
+        endpoint, _, weight = part.partition("=")
+        if endpoint not in ("chat", "stream", "recommendations"):
+            raise argparse.ArgumentTypeError(f"Unknown endpoint in --mix: {endpoint}")
+        mix[endpoint] = float(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:5000", help="Running Flask app (ignored with --start)")
+    parser.add_argument("--start", action="store_true", help="Start the stub and the Flask app")
+    parser.add_argument("--stub-args", default="--latency 0.5", help="Arguments of benchmarks.mock_deepseek")
+    parser.add_argument("--sessions", type=int, default=20, help="Concurrent sessions")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("chat=0.7,recommendations=0.2,stream=0.1"))
+    parser.add_argument("--think-time", type=float, default=0.0, help="Mean seconds between requests of a session")
+    parser.add_argument("--unique", action="store_true", help="Make every chat message unique (no cache hits)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Also write the summary as JSON to this file")
+    args = parser.parse_args()
+
+    processes = []
+    workdir = None
+    try:
+        if args.start:
+            workdir = tempfile.mkdtemp()
+            shutil.copy(os.path.join(REPO_ROOT, "store.db"), workdir)
+            stub_port = free_port()
+            env = dict(
+                os.environ,
+                PYTHONPATH=REPO_ROOT,
+                DEEPSEEK_API_KEY="benchmark",
+                DEEPSEEK_BASE_URL=f"http://127.0.0.1:{stub_port}",
+                LOG_LEVEL="WARNING",
+            )
+            processes.append(
+                start(
+                    [sys.executable, "-m", "benchmarks.mock_deepseek", "--port", str(stub_port)]
+                    + shlex.split(args.stub_args),
+                    REPO_ROOT,
+                    env,
+                )
+            )
+            app_port = free_port()
+            processes.append(
+                start(
+                    [
+                        sys.executable, "-m", "flask", "--app", os.path.join(REPO_ROOT, "run.py"),
+                        "run", "--port", str(app_port),
+                    ],
+                    workdir,
+                    env,
+                )
+            )
+            wait_for_port(stub_port)
+            wait_for_port(app_port)
+            host, port = "127.0.0.1", app_port
+        else:
+            url = urlparse(args.url)
+            host, port = url.hostname, url.port or 80
+
+        results, elapsed = asyncio.run(
+            run(host, port, args.sessions, args.duration, args.mix, args.think_time, args.unique, args.seed)
+        )
+        summary = report(results, elapsed, args.sessions)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(summary, f, indent=2)
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
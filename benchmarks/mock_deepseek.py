@@ -0,0 +1,289 @@
+"""
+Local OpenAI-compatible stub of the DeepSeek chat completions API.
+
+Point the backend at it with DEEPSEEK_BASE_URL=http://127.0.0.1:<port>.
+
+- Time to first token follows a configurable distribution (fixed, uniform,
+  normal, lognormal or exponential) around --latency.
+- Completion tokens are produced at --tokens-per-sec, both for regular and
+  for streamed (stream=True, Server-Sent Events) completions.
+- --error-rate fails that share of requests with one of --error-statuses.
+- Like DeepSeek's context cache, it reports prompt_cache_hit_tokens for the
+  longest prefix of the prompt (in 64-token units) it has already seen, and
+  prompt_cache_miss_tokens for the rest.
+
+Usage:
+    python -m benchmarks.mock_deepseek --port 9100 --latency 0.5
+    python -m benchmarks.mock_deepseek --latency 0.8 --latency-dist lognormal --spread 0.5 \\
+        --tokens-per-sec 60 --reply-tokens 200 --error-rate 0.02 --error-statuses 429 503
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import time
+import uuid
+
+import uvicorn
+
+
+# Set from the command line
+LATENCY = 0.5  # Seconds to the first token (mean or median, depending on the distribution)
+LATENCY_DIST = "fixed"
+SPREAD = 0.0  # Relative spread of the distribution
+TOKENS_PER_SEC = 0.0  # Completion token rate; 0 returns the completion at once
+ERROR_RATE = 0.0
+ERROR_STATUSES = [500]
+REPLY = "Here are some products you may like: MacBook Air, Logitech MX Master 3."
+
+# Prefix cache granularity, like DeepSeek's 64-token storage units
+CACHE_UNIT_TOKENS = 64
+CACHE_UNIT_CHARS = math.ceil(CACHE_UNIT_TOKENS / 0.3)
+
+# Digests of every prompt prefix seen so far, at unit boundaries
+_seen_prefixes = set()
+
+ERROR_TYPES = {
+    400: "invalid_request_error",
+    401: "authentication_error",
+    429: "rate_limit_error",
+    500: "server_error",
+    503: "service_unavailable",
+}
+
+
+def estimate_tokens(text: str) -> int:
+    # Same estimate as backend.tokens, without importing the backend package
+    return math.ceil(len(text) * 0.3)
+
+
+def sample_latency() -> float:
+    """
+    Draws a time to first token from the configured distribution.
+    """
+    if LATENCY_DIST == "uniform":
+        return random.uniform(LATENCY * (1 - SPREAD), LATENCY * (1 + SPREAD))
+    if LATENCY_DIST == "normal":
+        return max(0.0, random.gauss(LATENCY, LATENCY * SPREAD))
+    if LATENCY_DIST == "lognormal":
+        return LATENCY * math.exp(random.gauss(0.0, SPREAD))
+    if LATENCY_DIST == "exponential":
+        return random.expovariate(1 / LATENCY) if LATENCY > 0 else 0.0
+    return LATENCY
+
+
+def make_reply(tokens: int) -> str:
+    """
+    Builds a reply of roughly `tokens` tokens by repeating the canned reply.
+    """
+    reply = REPLY
+    while estimate_tokens(reply) < tokens:
+        reply += " " + REPLY
+    return reply[: math.ceil(tokens / 0.3)].rstrip()
+
+
+def prefix_cache_hit_tokens(prompt: str) -> int:
+    """
+    Returns the tokens of the longest already-seen prefix and remembers the prompt.
+    """
+    digest = hashlib.sha256()
+    hit_chars = 0
+    missed = False
+    for end in range(CACHE_UNIT_CHARS, len(prompt) + 1, CACHE_UNIT_CHARS):
+        digest.update(prompt[end - CACHE_UNIT_CHARS:end].encode("utf-8"))
+        key = digest.hexdigest()
+        if not missed and key in _seen_prefixes:
+            hit_chars = end
+        else:
+            missed = True
+            _seen_prefixes.add(key)
+    return min(estimate_tokens(prompt[:hit_chars]), estimate_tokens(prompt))
+
+
+async def read_body(receive) -> bytes:
+    body = b""
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get("body", b"")
+        more_body = message.get("more_body", False)
+    return body
+
+
+async def send_json(send, payload: dict, status: int = 200):
+    body = json.dumps(payload).encode("utf-8")
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+async def send_error(send, status: int):
+    await send_json(
+        send,
+        {
+            "error": {
+                "message": f"Injected error {status}",
+                "type": ERROR_TYPES.get(status, "server_error"),
+                "code": status,
+            }
+        },
+        status,
+    )
+
+
+def sse_chunk(completion_id: str, model: str, choices: list, usage: dict = None) -> bytes:
+    chunk = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": choices,
+    }
+    if usage is not None:
+        chunk["usage"] = usage
+    return f"data: {json.dumps(chunk)}\n\n".encode("utf-8")
+
+
+def delta_chunk(completion_id: str, model: str, delta: dict, finish_reason: str = None) -> bytes:
+    return sse_chunk(completion_id, model, [{"index": 0, "delta": delta, "finish_reason": finish_reason}])
+
+
+async def stream_completion(send, completion_id: str, model: str, reply: str, usage: dict, include_usage: bool):
+    """
+    Streams a completion as Server-Sent Events, one word at a time.
+    """
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"text/event-stream"), (b"cache-control", b"no-cache")],
+        }
+    )
+
+    async def emit(data: bytes):
+        await send({"type": "http.response.body", "body": data, "more_body": True})
+
+    await emit(delta_chunk(completion_id, model, {"role": "assistant", "content": ""}))
+    for i, word in enumerate(reply.split(" ")):
+        piece = word if i == 0 else " " + word
+        if TOKENS_PER_SEC > 0:
+            await asyncio.sleep(estimate_tokens(piece) / TOKENS_PER_SEC)
+        await emit(delta_chunk(completion_id, model, {"content": piece}))
+    await emit(delta_chunk(completion_id, model, {}, "stop"))
+
+    # Like the OpenAI API, usage comes in a last chunk without choices
+    if include_usage:
+        await emit(sse_chunk(completion_id, model, [], usage))
+    await send({"type": "http.response.body", "body": b"data: [DONE]\n\n"})
+
+
+async def chat_completions(receive, send):
+    request = json.loads(await read_body(receive))
+    prompt = "".join(
+        f"{message.get('role')}: {message.get('content', '')}\n" for message in request.get("messages", [])
+    )
+    hit_tokens = prefix_cache_hit_tokens(prompt)
+
+    await asyncio.sleep(sample_latency())
+
+    if ERROR_RATE and random.random() < ERROR_RATE:
+        return await send_error(send, random.choice(ERROR_STATUSES))
+
+    reply = REPLY
+    max_tokens = request.get("max_tokens")
+    if max_tokens and estimate_tokens(reply) > max_tokens:
+        reply = make_reply(max_tokens)
+
+    prompt_tokens = estimate_tokens(prompt)
+    completion_tokens = estimate_tokens(reply)
+    usage = {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "prompt_cache_hit_tokens": hit_tokens,
+        "prompt_cache_miss_tokens": prompt_tokens - hit_tokens,
+    }
+    completion_id = f"mock-{uuid.uuid4().hex}"
+    model = request.get("model", "deepseek-chat")
+
+    if request.get("stream"):
+        include_usage = bool((request.get("stream_options") or {}).get("include_usage"))
+        return await stream_completion(send, completion_id, model, reply, usage, include_usage)
+
+    if TOKENS_PER_SEC > 0:
+        await asyncio.sleep(completion_tokens / TOKENS_PER_SEC)
+    await send_json(
+        send,
+        {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": reply},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": usage,
+        },
+    )
+
+
+async def app(scope, receive, send):
+    if scope["type"] != "http":
+        return
+    if scope["method"] == "POST" and scope["path"].endswith("/chat/completions"):
+        return await chat_completions(receive, send)
+    await send_json(send, {"error": {"message": "Not found"}}, 404)
+
+
+def main():
+    global LATENCY, LATENCY_DIST, SPREAD, TOKENS_PER_SEC, ERROR_RATE, ERROR_STATUSES, REPLY
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", type=float, default=LATENCY, help="Seconds to the first token")
+    parser.add_argument(
+        "--latency-dist",
+        choices=["fixed", "uniform", "normal", "lognormal", "exponential"],
+        default=LATENCY_DIST,
+    )
+    parser.add_argument(
+        "--spread",
+        type=float,
+        default=SPREAD,
+        help="Relative spread (uniform half-width, normal stddev, lognormal sigma)",
+    )
+    parser.add_argument("--tokens-per-sec", type=float, default=TOKENS_PER_SEC, help="0 = instant")
+    parser.add_argument("--reply-tokens", type=int, default=0, help="Length of the reply (0 = short canned reply)")
+    parser.add_argument("--error-rate", type=float, default=ERROR_RATE, help="Share of failed requests")
+    parser.add_argument("--error-statuses", type=int, nargs="+", default=ERROR_STATUSES)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    LATENCY = args.latency
+    LATENCY_DIST = args.latency_dist
+    SPREAD = args.spread
+    TOKENS_PER_SEC = args.tokens_per_sec
+    ERROR_RATE = args.error_rate
+    ERROR_STATUSES = args.error_statuses
+    if args.reply_tokens:
+        REPLY = make_reply(args.reply_tokens)
+    random.seed(args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning", backlog=4096)
+
+
+if __name__ == "__main__":
+    main()
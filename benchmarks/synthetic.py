@@ -0,0 +1,107 @@
+import random
+import sqlite3
+
+from backend.migrations import backfill_user_purchases
+from data.create_db import create_database
+
+
+BRANDS = [
+    "Apple", "Dell", "HP", "Lenovo", "Samsung", "Google", "Logitech", "Razer",
+    "Asus", "Acer", "Sony", "Microsoft", "Corsair", "LG", "Xiaomi", "Anker",
+]
+CATEGORIES = [
+    "Computers", "Smartphones", "Peripherals", "Tablets", "Monitors",
+    "Audio", "Storage", "Networking", "Wearables", "Gaming Accessories",
+]
+ADJECTIVES = ["Pro", "Air", "Max", "Ultra", "Lite", "Plus", "Mini", "Elite", "Neo", "X"]
+FEATURES = [
+    "USB-C", "Bluetooth", "Wi-Fi 6", "OLED display", "RGB lighting", "256GB SSD",
+    "16GB RAM", "noise cancelling", "fast charging", "4K UHD", "ergonomic design",
+    "water resistant", "mechanical switches", "1TB capacity", "long battery life",
+]
+
+
+def generate_products(n_products: int, seed: int = 0):
+    """
+    Yields synthetic product rows matching the 'products' table layout.
+
+    Args:
+        n_products (int): Number of products to generate.
+        seed (int): Random seed, so runs are reproducible.
+
+    Yields:
+        tuple: (product_id, name, category, brand, price, stock, description, features)
+    """
+    rng = random.Random(seed)
+    for product_id in range(1, n_products + 1):
+        brand = rng.choice(BRANDS)
+        category = rng.choice(CATEGORIES)
+        name = f"{brand} {category.rstrip('s')} {rng.choice(ADJECTIVES)} {product_id}"
+        features = ", ".join(rng.sample(FEATURES, 3))
+        yield (
+            product_id,
+            name,
+            category,
+            brand,
+            round(rng.uniform(10, 2500), 2),
+            rng.choice([0, 2, 5, 10, 25, 50, 100]),
+            f"{rng.choice(ADJECTIVES)} {category.lower()} from {brand}",
+            features,
+        )
+
+
+def generate_users(n_users: int, n_products: int, seed: int = 0):
+    """
+    Yields synthetic user rows with a comma-separated purchase history.
+
+    Args:
+        n_users (int): Number of users to generate.
+        n_products (int): Size of the catalog the histories refer to.
+        seed (int): Random seed.
+
+    Yields:
+        tuple: (user_id, name, email, preferences, purchase_history)
+    """
+    rng = random.Random(seed + 1)
+    products = {row[0]: row for row in generate_products(min(n_products, 1000), seed)}
+    for user_id in range(1, n_users + 1):
+        bought = [products[rng.randint(1, len(products))] for _ in range(rng.randint(1, 4))]
+        yield (
+            user_id,
+            f"User {user_id}",
+            f"user{user_id}@example.com",
+            ", ".join(sorted({row[2] for row in bought})),
+            ", ".join(row[1] for row in bought),
+        )
+
+
+def make_catalog(db_name: str, n_products: int, n_users: int = 0, seed: int = 0):
+    """
+    Creates a database with a synthetic catalog of the requested size.
+
+    Args:
+        db_name (str): Path of the database file to create.
+        n_products (int): Number of products.
+        n_users (int): Number of users.
+        seed (int): Random seed.
+    """
+    create_database(db_name)
+    conn = sqlite3.connect(db_name)
+    with conn:
+        conn.executemany(
+            """
+            INSERT OR REPLACE INTO products
+            (product_id, name, category, brand, price, stock, description, features)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?);
+            """,
+            generate_products(n_products, seed),
+        )
+        conn.executemany(
+            """
+            INSERT OR REPLACE INTO users (user_id, name, email, preferences, purchase_history)
+            VALUES (?, ?, ?, ?, ?);
+            """,
+            generate_users(n_users, n_products, seed),
+        )
+        backfill_user_purchases(conn)
+    conn.close()
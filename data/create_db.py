@@ -1,5 +1,7 @@
 import sqlite3
 
+from backend.migrations import migrate
+
 
 def create_database(db_name="store.db"):
     """
@@ -48,6 +50,10 @@ def create_database(db_name="store.db"):
     conn.commit()
     conn.close()
 
+    # Bring the schema to the latest version
+    applied = migrate(db_name)
+    print(f"Applied {len(applied)} schema migration(s).")
+
 
 if __name__ == "__main__":
     create_database()
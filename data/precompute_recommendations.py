@@ -0,0 +1,79 @@
+import argparse
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from backend.llm import chat_completion
+from backend.migrations import migrate
+from backend.recommendation_store import (
+    GENERAL_USER_ID,
+    check_recommendations,
+    recommendation_request,
+    save_recommendations,
+)
+
+
+def precompute_recommendations(db_name="store.db", workers=4, force=False):
+    """
+    Computes the recommendations of every user into the 'user_recommendations' table.
+
+    Only users whose purchase history or relevant catalog slice changed since
+    the last run are sent to the model, with at most `workers` calls in
+    flight. The general recommendations are stored under user_id 0.
+
+    Args:
+        db_name (str): Name of the database file.
+        workers (int): Maximum number of concurrent model calls.
+        force (bool): Recompute every user, even if the inputs didn't change.
+    """
+    start = time.time()
+
+    # Bring the schema up to date and connect to the database
+    migrate(db_name)
+    conn = sqlite3.connect(db_name)
+    user_ids = [GENERAL_USER_ID] + [
+        row[0] for row in conn.execute("SELECT user_id FROM users ORDER BY user_id;")
+    ]
+
+    # Fingerprint the inputs of every user and keep the stale ones
+    stale = []
+    for user_id in user_ids:
+        if force:
+            stale.append((user_id, recommendation_request(user_id, db_name)))
+            continue
+        _, fresh, inputs = check_recommendations(user_id, db_name)
+        if not fresh:
+            stale.append((user_id, inputs))
+
+    print(f"{len(user_ids) - len(stale)} of {len(user_ids)} recommendation sets are up to date.")
+
+    # Call the model concurrently and write the results from this thread
+    failed = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(chat_completion, **inputs["request"]): (user_id, inputs)
+            for user_id, inputs in stale
+        }
+        for future in as_completed(futures):
+            user_id, inputs = futures[future]
+            try:
+                save_recommendations(conn, user_id, future.result(), inputs)
+            except Exception as e:
+                failed += 1
+                print(f"Error computing the recommendations of user {user_id}: {e}")
+
+    conn.close()
+    print(
+        f"Recomputed {len(stale) - failed} recommendation sets "
+        f"({failed} failed) in {time.time() - start:.1f}s."
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute the recommendations of every user.")
+    parser.add_argument("--db", default="store.db", help="Database file")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent model calls")
+    parser.add_argument("--force", action="store_true", help="Recompute every user")
+    args = parser.parse_args()
+
+    precompute_recommendations(args.db, args.workers, args.force)
@@ -1,5 +1,8 @@
 import sqlite3
 
+from backend.migrations import backfill_user_purchases, migrate
+from data.bulk_import import upsert_products
+
 
 def update_products(db_name="store.db"):
     """
@@ -111,20 +114,14 @@ def update_products(db_name="store.db"):
         ),
     ]
 
-    # Connect to the database
+    # Bring the schema up to date and connect to the database
+    migrate(db_name)
     conn = sqlite3.connect(db_name)
-    cursor = conn.cursor()
 
-    # Insert or ignore products
-    cursor.executemany(
-        """
-    INSERT OR IGNORE INTO products (product_id, name, category, brand, price, stock, description, features)
-    VALUES (?, ?, ?, ?, ?, ?, ?, ?);
-    """,
-        products,
-    )
+    # Insert new products and update the ones that changed
+    written = upsert_products(conn, products)
 
-    print("Data successfully inserted or updated in 'products'.")
+    print(f"Data successfully inserted or updated in 'products' ({written} rows changed).")
 
     # Commit changes and close the connection
     conn.commit()
@@ -189,6 +186,14 @@ def update_users(db_name="store.db"):
     conn.commit()
     conn.close()
 
+    # Record the purchases of the new users in user_purchases
+    migrate(db_name)
+    conn = sqlite3.connect(db_name)
+    inserted, unmatched = backfill_user_purchases(conn)
+    conn.commit()
+    conn.close()
+    print(f"Recorded {inserted} purchases ({unmatched} of them match no product).")
+
 
 if __name__ == "__main__":
     update_products()
@@ -1,14 +1,20 @@
 import streamlit as st
 import sqlite3
+import json
 import requests
+import uuid
 import pandas as pd
 import matplotlib.pyplot as plt
+from connection import get_connection
 from database_reader import (
-    get_database_content_as_dict,
-    calculate_total_products,
-    calculate_low_stock_items,
-    calculate_total_categories,
-    calculate_out_of_stock_items,
+    BUCKET_SIZE,
+    PRODUCT_BUCKETS_SQL,
+    get_catalog_version,
+    get_chart_summaries,
+    get_dashboard_kpis,
+    get_inventory_page,
+    get_low_stock_products,
+    get_recent_inventory_changes,
 )
 
 # Page configuration
@@ -37,8 +43,14 @@ if "user_id" not in st.session_state:
     st.session_state.user_id = None
 if "chat_history" not in st.session_state:
     st.session_state.chat_history = []
+if "session_id" not in st.session_state:
+    # Identifies the conversation, so the backend remembers the earlier turns
+    st.session_state.session_id = uuid.uuid4().hex
 if "current_page" not in st.session_state:
     st.session_state.current_page = "main"
+if "inventory_cursors" not in st.session_state:
+    # Cursors of the inventory pages visited; the last one is shown
+    st.session_state.inventory_cursors = [0]
 
 
 # Database class implementation
@@ -57,7 +69,7 @@ class Database:
             bool: True if the user exists, False otherwise.
         """
         try:
-            with sqlite3.connect(self.db_name) as conn:
+            with get_connection(self.db_name) as conn:
                 cursor = conn.cursor()
                 cursor.execute("SELECT user_id FROM users WHERE user_id = ?", (user_id,))
                 return cursor.fetchone() is not None
@@ -76,24 +88,29 @@ class Database:
             dict: A dictionary containing the user's data, or None if not found.
         """
         try:
-            with sqlite3.connect(self.db_name) as conn:
+            with get_connection(self.db_name) as conn:
                 cursor = conn.cursor()
+                cursor.execute("SELECT user_id, preferences FROM users WHERE user_id = ?", (user_id,))
+                result = cursor.fetchone()
+                if not result:
+                    return None
                 cursor.execute(
                     """
-                    SELECT user_id, purchase_history, preferences 
-                    FROM users 
-                    WHERE user_id = ?
+                    SELECT COALESCE(p.name, up.item_name), p.brand, p.category
+                    FROM user_purchases up LEFT JOIN products p ON p.product_id = up.product_id
+                    WHERE up.user_id = ?
+                    ORDER BY up.ts
                 """,
                     (user_id,),
                 )
-                result = cursor.fetchone()
-                if result:
-                    return {
-                        "user_id": result[0],
-                        "purchase_history": result[1],
-                        "preferences": result[2],
-                    }
-                return None
+                purchases = cursor.fetchall()
+                return {
+                    "user_id": result[0],
+                    "purchase_history": ", ".join(name for name, _, _ in purchases),
+                    "preferences": result[1],
+                    "bought_brands": sorted({brand for _, brand, _ in purchases if brand}),
+                    "bought_categories": sorted({category for _, _, category in purchases if category}),
+                }
         except sqlite3.Error as e:
             print(f"Database error: {e}")
             return None
@@ -108,18 +125,23 @@ class Database:
         Returns:
             str: The user's purchase history as a string, or None if not found.
         """
-        with sqlite3.connect(self.db_name) as conn:
+        with get_connection(self.db_name) as conn:
             cursor = conn.cursor()
             cursor.execute(
                 """
-                SELECT purchase_history 
-                FROM users 
-                WHERE user_id = ?
+                SELECT COALESCE(p.name, up.item_name)
+                FROM users u
+                LEFT JOIN user_purchases up ON up.user_id = u.user_id
+                LEFT JOIN products p ON p.product_id = up.product_id
+                WHERE u.user_id = ?
+                ORDER BY up.ts
             """,
                 (user_id,),
             )
-            result = cursor.fetchone()
-            return result[0] if result else None
+            rows = cursor.fetchall()
+            if not rows:
+                return None
+            return ", ".join(name for (name,) in rows if name is not None)
 
     def get_products(self):
         """
@@ -128,7 +150,7 @@ class Database:
         Returns:
             list: A list of dictionaries containing product information.
         """
-        with sqlite3.connect(self.db_name) as conn:
+        with get_connection(self.db_name) as conn:
             cursor = conn.cursor()
             cursor.execute(
                 """
@@ -151,28 +173,19 @@ class Database:
             dict: A dictionary categorizing products into "Highly Recommended",
                   "Recommended", and "Not Recommended".
         """
-        products = self.get_products()
         categories = {"Highly Recommended": [], "Recommended": [], "Not Recommended": []}
 
         history_items = user_history.split(",") if user_history else []
 
-        for product in products:
-            if (
-                len(categories["Highly Recommended"]) >= 2
-                and len(categories["Recommended"]) >= 2
-                and len(categories["Not Recommended"]) >= 2
-            ):
-                break
-
-            if product["brand"] in history_items or product["category"] in history_items:
-                if len(categories["Highly Recommended"]) < 2:
-                    categories["Highly Recommended"].append(product["name"])
-            elif any(item in history_items for item in [product["brand"], product["category"]]):
-                if len(categories["Recommended"]) < 2:
-                    categories["Recommended"].append(product["name"])
-            else:
-                if len(categories["Not Recommended"]) < 2:
-                    categories["Not Recommended"].append(product["name"])
+        # The buckets are ranked and limited in SQL, so the catalog never
+        # crosses into Python
+        with get_connection(self.db_name) as conn:
+            cursor = conn.execute(
+                PRODUCT_BUCKETS_SQL,
+                {"history": json.dumps(history_items), "per_bucket": BUCKET_SIZE},
+            )
+            for bucket, name in cursor.fetchall():
+                categories[bucket].append(name)
 
         return categories
 
@@ -183,19 +196,20 @@ db = Database()
 
 def generate_ai_response(user_message: str, user_data: dict):
     """
-    Generates a response using the AI client.
+    Streams a response from the AI client as it is generated.
 
     Args:
         user_message (str): The user's query.
         user_data (dict): User data containing history and preferences.
 
-    Returns:
-        str: The AI-generated response or an error message if something goes wrong.
+    Yields:
+        str: Pieces of the AI-generated response, or an error message if something goes wrong.
     """
     try:
         # Check if user_data is None or empty
         if not user_data:
-            return "Sorry, I cannot access the user's data at the moment."
+            yield "Sorry, I cannot access the user's data at the moment."
+            return
 
         # Debug print
         print(f"Generating response for user data: {user_data}")
@@ -235,20 +249,116 @@ def generate_ai_response(user_message: str, user_data: dict):
         If the user has no history, recommend popular or basic products.
         """
 
-        response = requests.post(
-            "http://127.0.0.1:5000/api/chat",
-            json={"message": user_message, "user_data": user_data, "context": context},
-        )
-
-        if response.status_code == 200:
-            return response.json().get("response", "I couldn't process that request.")
-        else:
-            return (
-                f"I'm having trouble processing your request. Status code: {response.status_code}"
-            )
+        with requests.post(
+            "http://127.0.0.1:5000/api/chat/stream",
+            json={
+                "message": user_message,
+                "user_id": user_data.get("user_id"),
+                "session_id": st.session_state.session_id,
+                "user_data": user_data,
+                "context": context,
+            },
+            stream=True,
+        ) as response:
+            if response.status_code != 200:
+                yield (
+                    f"I'm having trouble processing your request. Status code: {response.status_code}"
+                )
+                return
+
+            # Server-Sent Events: "event:" names the event, "data:" carries its JSON payload
+            event = "message"
+            for line in response.iter_lines(decode_unicode=True):
+                if not line:
+                    event = "message"
+                elif line.startswith("event:"):
+                    event = line[len("event:"):].strip()
+                elif line.startswith("data:"):
+                    payload = json.loads(line[len("data:"):])
+                    if event == "done":
+                        return
+                    if event == "error":
+                        yield payload.get("error", "I couldn't process that request.")
+                        return
+                    yield payload.get("delta", "")
     except Exception as e:
         print(f"Error in generate_ai_response: {str(e)}")  # Debug print
-        return f"An unexpected error occurred: {str(e)}"
+        yield f"An unexpected error occurred: {str(e)}"
+
+
+# Products with less stock are flagged on the dashboard
+LOW_STOCK_THRESHOLD = 10
+# Low stock alerts shown, lowest stock first
+LOW_STOCK_ALERTS = 20
+# Products per page of the inventory table
+INVENTORY_PAGE_SIZE = 50
+# Brands shown in the sales chart; the others are grouped together
+TOP_BRANDS = 4
+# Inventory changes listed on the dashboard
+RECENT_CHANGES = 10
+
+
+@st.cache_data(max_entries=2, show_spinner=False)
+def load_dashboard(catalog_version: int) -> dict:
+    """
+    Loads the dashboard data, once per catalog version.
+
+    The version is only the cache key: a new one means a product changed,
+    so the KPIs and the low stock products are read again.
+
+    Args:
+        catalog_version (int): The current catalog version.
+
+    Returns:
+        dict: The KPIs and the products with the lowest stock.
+    """
+    return {
+        "kpis": get_dashboard_kpis(low_stock_threshold=LOW_STOCK_THRESHOLD),
+        "low_stock": get_low_stock_products(low_stock_threshold=LOW_STOCK_THRESHOLD, limit=LOW_STOCK_ALERTS),
+    }
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def load_inventory_page(catalog_version: int, after: int) -> tuple:
+    """
+    Loads one page of the inventory table, once per catalog version.
+
+    Args:
+        catalog_version (int): The current catalog version, only the cache key.
+        after (int): The page starts after this product_id.
+
+    Returns:
+        tuple: The products of the page as a DataFrame, and the cursor of
+        the next page (None on the last one).
+    """
+    columns, next_after = get_inventory_page(after=after, page_size=INVENTORY_PAGE_SIZE)
+    return pd.DataFrame(columns), next_after
+
+
+def search_products(query: str, limit: int = 5) -> list:
+    """
+    Looks up products with the backend's full-text search.
+
+    Args:
+        query (str): The text typed by the user.
+        limit (int): Maximum number of products.
+
+    Returns:
+        list: Matching products, best first, or an empty list on errors
+        (a failed request is shown as a warning).
+    """
+    try:
+        response = requests.get(
+            "http://127.0.0.1:5000/api/products/search",
+            params={"q": query, "limit": limit},
+            timeout=5,
+        )
+        if response.status_code != 200:
+            return []
+        return response.json().get("results", [])
+    except requests.RequestException as e:
+        st.warning(f"Product search is unavailable: {e}")
+        return []
 
 
 # Sidebar for navigation
@@ -262,9 +372,20 @@ with st.sidebar:
             st.session_state.logged_in = False
             st.session_state.user_id = None
             st.session_state.chat_history = []
+            st.session_state.messages = []
+            st.session_state.session_id = uuid.uuid4().hex
             st.session_state.current_page = "main"
             st.rerun()
 
+        # Product lookup without going through the chat
+        search_query = st.text_input("Search products", key="product_search")
+        if search_query:
+            results = search_products(search_query)
+            for product in results:
+                st.caption(f"{product['name']} - ${product['price']:.2f}, {product['stock']} in stock")
+            if not results:
+                st.caption("No products found.")
+
 # Main layout
 st.title("Makers Tech ChatBot")
 
@@ -311,45 +432,44 @@ elif st.session_state.current_page == "main":
             label_visibility="collapsed",
         )
     with col2:
-        if st.button("Send", key="send_button"):
-            if user_message:
-                print(f"Current session state: {st.session_state}")  # Debug print
-                print(f"User data in session: {st.session_state.user_data}")  # Debug print
+        send_clicked = st.button("Send", key="send_button")
+    st.markdown("</div>", unsafe_allow_html=True)
 
-                st.session_state.messages = []
-                st.session_state.messages.append({"text": user_message, "is_bot": False})
+    if send_clicked and user_message:
+        print(f"Current session state: {st.session_state}")  # Debug print
+        print(f"User data in session: {st.session_state.user_data}")  # Debug print
 
-                with st.spinner("Getting response..."):
-                    bot_response = generate_ai_response(
-                        user_message=user_message, user_data=st.session_state.user_data
-                    )
+        if "messages" not in st.session_state:
+            st.session_state.messages = []
+        st.session_state.messages.append({"text": user_message, "is_bot": False})
 
-                st.session_state.messages.append({"text": bot_response, "is_bot": True})
-                st.rerun()
-    st.markdown("</div>", unsafe_allow_html=True)
+        # Render the answer token by token while it is being generated
+        st.markdown(
+            f"<div class='user-message'>👤 You: {user_message}</div>",
+            unsafe_allow_html=True,
+        )
+        bot_response = st.write_stream(
+            generate_ai_response(user_message=user_message, user_data=st.session_state.user_data)
+        )
+
+        st.session_state.messages.append({"text": bot_response, "is_bot": True})
+        st.rerun()
 
     # Display chat messages below
     st.markdown('<div class="chat-messages">', unsafe_allow_html=True)
     if "messages" not in st.session_state:
         st.session_state.messages = []
 
-    # Show only last exchange
-    if len(st.session_state.messages) > 0:
-        last_user_msg = (
-            st.session_state.messages[-2] if len(st.session_state.messages) >= 2 else None
-        )
-        last_bot_msg = (
-            st.session_state.messages[-1] if len(st.session_state.messages) >= 1 else None
-        )
-
-        if last_user_msg:
+    # Show the whole conversation, newest exchange last
+    for msg in st.session_state.messages:
+        if msg["is_bot"]:
             st.markdown(
-                f"<div class='user-message'>👤 You: {last_user_msg['text']}</div>",
+                f"<div class='bot-message'>🤖 Bot: {msg['text']}</div>",
                 unsafe_allow_html=True,
             )
-        if last_bot_msg:
+        else:
             st.markdown(
-                f"<div class='bot-message'>🤖 Bot: {last_bot_msg['text']}</div>",
+                f"<div class='user-message'>👤 You: {msg['text']}</div>",
                 unsafe_allow_html=True,
             )
     st.markdown("</div>", unsafe_allow_html=True)
@@ -361,11 +481,15 @@ elif st.session_state.current_page == "dashboard":
 
     # Main metrics at the top
     col1, col2, col3, col4 = st.columns(4)
-    data = get_database_content_as_dict()
-    total_products = calculate_total_products(data)
-    low_stock_items = calculate_low_stock_items(data, 10)
-    out_of_stock_items = calculate_out_of_stock_items(data)
-    total_categories = calculate_total_categories(data)
+    # While the catalog is unchanged, a render reads the version and the few
+    # pre-aggregated chart rows, which also change with every purchase
+    catalog_version = get_catalog_version()
+    dashboard = load_dashboard(catalog_version)
+    charts = get_chart_summaries()
+    total_products = dashboard["kpis"]["total_units"]
+    low_stock_items = dashboard["kpis"]["low_stock_items"]
+    out_of_stock_items = dashboard["kpis"]["out_of_stock_items"]
+    total_categories = dashboard["kpis"]["total_categories"]
     with col1:
         st.metric("Total Products", total_products, "4")
     with col2:
@@ -380,12 +504,10 @@ elif st.session_state.current_page == "dashboard":
 
     with col1:
         st.subheader("Stock Levels by Category")
-        # Sample data for bar chart
-        stock_data = {
-            "Category": ["Laptops", "Smartphones", "Tablets", "Accessories"],
-            "Stock": [45, 30, 25, 60],
-        }
-        df_stock = pd.DataFrame(stock_data)
+        stock_by_category = charts["stock_by_category"]
+        df_stock = pd.DataFrame(
+            {"Category": list(stock_by_category), "Stock": list(stock_by_category.values())}
+        )
 
         fig1, ax1 = plt.subplots(figsize=(10, 6))
         df_stock.plot(kind="bar", x="Category", y="Stock", ax=ax1, color="#4c9aff")
@@ -400,26 +522,47 @@ elif st.session_state.current_page == "dashboard":
 
     with col2:
         st.subheader("Sales Distribution by Brand")
-        # Sample data for pie chart
+        # The top brands, the rest grouped as "Others"
+        sales_by_brand = list(charts["sales_by_brand"].items())
+        top_brands = sales_by_brand[:TOP_BRANDS]
+        others = sum(units for _, units in sales_by_brand[TOP_BRANDS:])
+        if others:
+            top_brands.append(("Others", others))
         sales_data = {
-            "Brand": ["Apple", "Dell", "HP", "Lenovo", "Others"],
-            "Sales": [35, 25, 20, 15, 5],
+            "Brand": [brand for brand, _ in top_brands],
+            "Sales": [units for _, units in top_brands],
         }
-        fig2, ax2 = plt.subplots(figsize=(10, 6))
-        ax2.pie(
-            sales_data["Sales"],
-            labels=sales_data["Brand"],
-            autopct="%1.1f%%",
-            colors=["#4c9aff", "#ff6b6b", "#ffd93d", "#6c5ce7", "#a8e6cf"],
-        )
-        ax2.set_facecolor("#1f1f2e")
-        fig2.patch.set_facecolor("#1f1f2e")
-        st.pyplot(fig2)
+        if not sales_data["Sales"]:
+            st.info("No sales recorded yet.")
+        else:
+            fig2, ax2 = plt.subplots(figsize=(10, 6))
+            ax2.pie(
+                sales_data["Sales"],
+                labels=sales_data["Brand"],
+                autopct="%1.1f%%",
+                colors=["#4c9aff", "#ff6b6b", "#ffd93d", "#6c5ce7", "#a8e6cf"],
+            )
+            ax2.set_facecolor("#1f1f2e")
+            fig2.patch.set_facecolor("#1f1f2e")
+            st.pyplot(fig2)
 
     # Second row
     st.subheader("Inventory Details")
-    inventory_data = get_database_content_as_dict()
-    df_inventory = pd.DataFrame(inventory_data)
+    # One page of products at a time, so the dashboard never loads the whole table
+    cursors = st.session_state.inventory_cursors
+    df_inventory, next_after = load_inventory_page(catalog_version, cursors[-1])
+    pages = max(1, -(-dashboard["kpis"]["product_count"] // INVENTORY_PAGE_SIZE))
+    col_previous, col_page, col_next = st.columns(3)
+    with col_previous:
+        if st.button("Previous", key="inventory_previous", disabled=len(cursors) == 1):
+            cursors.pop()
+            st.rerun()
+    with col_page:
+        st.caption(f"Page {len(cursors)} of {pages}")
+    with col_next:
+        if st.button("Next", key="inventory_next", disabled=next_after is None):
+            cursors.append(next_after)
+            st.rerun()
 
     # Style for the table
     st.dataframe(
@@ -431,20 +574,37 @@ elif st.session_state.current_page == "dashboard":
             "Stock": st.column_config.NumberColumn(
                 "Current Stock", help="Current stock level", format="%d units"
             ),
-            "Price": "Price",
+            "Price": st.column_config.NumberColumn("Price", format="$%.2f"),
         },
         hide_index=True,
         use_container_width=True,
     )
 
+    # Latest entries of the change feed, read on every render
+    st.subheader("Recent Stock Changes")
+    changes = get_recent_inventory_changes(limit=RECENT_CHANGES)
+    for change in changes:
+        name = change["name"] or f"Product {change['product_id']}"
+        if change["kind"] == "insert":
+            st.caption(f"Added {name} with {change['new_stock']} units")
+        elif change["kind"] == "delete":
+            st.caption(f"Removed {name}")
+        elif change["old_stock"] != change["new_stock"]:
+            st.caption(f"{name}: stock {change['old_stock']} → {change['new_stock']}")
+        elif change["old_price"] != change["new_price"]:
+            st.caption(f"{name}: price ${change['old_price']:.2f} → ${change['new_price']:.2f}")
+        else:
+            st.caption(f"{name}: details updated")
+    if not changes:
+        st.caption("No changes recorded yet.")
+
     # Low stock alerts
     st.subheader("Low Stock Alerts")
-    low_stock_items = df_inventory[df_inventory["Stock"] < 10]
-    if not low_stock_items.empty:
-        for _, item in low_stock_items.iterrows():
-            st.warning(
-                f"⚠️ Low stock alert: {item['Product']} - Only {item['Stock']} units remaining"
-            )
+    for name, stock in dashboard["low_stock"]:
+        st.warning(f"⚠️ Low stock alert: {name} - Only {stock} units remaining")
+    hidden_alerts = dashboard["kpis"]["low_stock_items"] - len(dashboard["low_stock"])
+    if hidden_alerts > 0:
+        st.caption(f"{hidden_alerts} more products are low on stock.")
 
 # Footer
 st.divider()
@@ -0,0 +1,61 @@
+import os
+import sqlite3
+import threading
+
+
+# Same settings as backend/connection.py
+# Page cache per connection, in KiB
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "16384"))
+# Bytes of the database file read through mmap instead of read() calls
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+# NORMAL only syncs the WAL at checkpoints: a power loss may drop the last
+# commits but never corrupts the database
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+# Seconds a connection waits for a lock before failing with "database is locked"
+SQLITE_BUSY_TIMEOUT = float(os.getenv("SQLITE_BUSY_TIMEOUT", "5"))
+# Prepared statements kept per connection
+SQLITE_STATEMENT_CACHE = int(os.getenv("SQLITE_STATEMENT_CACHE", "256"))
+
+# Streamlit runs every session in its own threads: one connection per thread
+# and database, closed when the thread ends
+_local = threading.local()
+
+
+def connect(db_name: str = "store.db") -> sqlite3.Connection:
+    """
+    Opens a connection in WAL mode with the tuning PRAGMAs applied.
+
+    Args:
+        db_name (str): Name of the database.
+
+    Returns:
+        sqlite3.Connection: The new connection.
+    """
+    conn = sqlite3.connect(db_name, timeout=SQLITE_BUSY_TIMEOUT, cached_statements=SQLITE_STATEMENT_CACHE)
+    conn.execute("PRAGMA journal_mode = WAL;")
+    conn.execute(f"PRAGMA synchronous = {SQLITE_SYNCHRONOUS};")
+    conn.execute(f"PRAGMA cache_size = {-SQLITE_CACHE_SIZE_KB};")
+    conn.execute(f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE};")
+    conn.execute("PRAGMA temp_store = MEMORY;")
+    return conn
+
+
+def get_connection(db_name: str = "store.db") -> sqlite3.Connection:
+    """
+    Returns the calling thread's persistent connection to a database.
+
+    Use it as a context manager to commit a write; it stays open afterwards.
+
+    Args:
+        db_name (str): Name of the database.
+
+    Returns:
+        sqlite3.Connection: The thread's connection.
+    """
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    key = os.path.abspath(db_name)
+    if key not in conns:
+        conns[key] = connect(db_name)
+    return conns[key]
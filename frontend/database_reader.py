@@ -1,112 +1,195 @@
-import sqlite3
-
-
-def calculate_total_products(data):
+from connection import get_connection
+
+
+# Products shown per recommendation bucket
+BUCKET_SIZE = 2
+
+# Ranks and limits every bucket inside SQLite. The history terms are its
+# items plus the brands and categories of the products it names. Each term
+# contributes at most :per_bucket products through the partial indexes
+# created by backend.migrations, and "Not Recommended" stops scanning after
+# :per_bucket products, so the work doesn't grow with the products table.
+# Kept in step with backend/database.py, which the frontend can't import.
+PRODUCT_BUCKETS_SQL = """
+WITH history(item) AS (
+    SELECT DISTINCT trim(value) FROM json_each(:history) WHERE trim(value) <> ''
+),
+terms(term) AS (
+    SELECT item FROM history
+    UNION
+    SELECT p.brand FROM history h JOIN products p ON p.name = h.item
+    UNION
+    SELECT p.category FROM history h JOIN products p ON p.name = h.item
+),
+candidates(bucket, product_id) AS (
+    SELECT 'Highly Recommended', p.product_id
+    FROM terms t JOIN products p
+    WHERE p.product_id IN (
+        SELECT product_id FROM products
+        WHERE brand = t.term AND stock > 0 ORDER BY product_id LIMIT :per_bucket
+    )
+    UNION
+    SELECT 'Highly Recommended', p.product_id
+    FROM terms t JOIN products p
+    WHERE p.product_id IN (
+        SELECT product_id FROM products
+        WHERE category = t.term AND stock > 0 ORDER BY product_id LIMIT :per_bucket
+    )
+    UNION ALL
+    SELECT * FROM (
+        SELECT 'Not Recommended', product_id FROM products
+        WHERE stock > 0
+          AND brand NOT IN (SELECT term FROM terms)
+          AND category NOT IN (SELECT term FROM terms)
+        ORDER BY product_id LIMIT :per_bucket
+    )
+),
+ranked(bucket, product_id, position) AS (
+    SELECT bucket, product_id, ROW_NUMBER() OVER (PARTITION BY bucket ORDER BY product_id)
+    FROM candidates
+)
+SELECT r.bucket, p.name
+FROM ranked r JOIN products p ON p.product_id = r.product_id
+WHERE r.position <= :per_bucket
+ORDER BY r.bucket, r.position;
+"""
+
+
+# Every dashboard KPI in one pass over the products table
+DASHBOARD_KPIS_SQL = """
+SELECT
+    COUNT(*) AS product_count,
+    COALESCE(SUM(stock), 0) AS total_units,
+    COUNT(*) FILTER (WHERE stock < :low_stock) AS low_stock_items,
+    COUNT(*) FILTER (WHERE stock = 0) AS out_of_stock_items,
+    COUNT(DISTINCT category) AS total_categories
+FROM products;
+"""
+
+
+# The chart rows of the summary tables kept by triggers (backend/summaries.py)
+CHART_SUMMARIES_SQL = """
+SELECT 'stock_by_category', category, units FROM category_stock_summary
+UNION ALL
+SELECT 'sales_by_brand', brand, units_sold FROM brand_sales_summary;
+"""
+
+
+def get_catalog_version(db_name="store.db") -> int:
     """
-    Calculates the total number of products in the database.
+    Reads the catalog change counter, which every write to 'products' bumps.
+
+    It is the cache key of the dashboard data: while it doesn't change,
+    nothing the dashboard shows has changed either.
 
     Args:
-        data (dict): The database output containing product information.
+        db_name (str): Name of the database.
 
     Returns:
-        int: Total number of products.
+        int: The current catalog version.
     """
-    return sum(data["Stock"])
+    return get_connection(db_name).execute("SELECT version FROM catalog_meta WHERE id = 1;").fetchone()[0]
 
 
-def calculate_low_stock_items(data, threshold=5):
+def get_dashboard_kpis(db_name="store.db", low_stock_threshold=10) -> dict:
     """
-    Counts the number of items with stock below a certain threshold.
+    Computes the dashboard KPIs with SQL aggregates.
 
     Args:
-        data (dict): The database output containing product information.
-        threshold (int): The stock threshold to classify as low stock.
+        db_name (str): Name of the database.
+        low_stock_threshold (int): Products with less stock count as low stock.
 
     Returns:
-        int: Count of low stock items.
+        dict: Units in stock, low stock and out-of-stock product counts, and
+        the number of categories.
     """
-    return sum(1 for stock in data["Stock"] if stock < threshold)
+    cursor = get_connection(db_name).execute(DASHBOARD_KPIS_SQL, {"low_stock": low_stock_threshold})
+    columns = [column[0] for column in cursor.description]
+    return dict(zip(columns, cursor.fetchone()))
 
 
-def calculate_out_of_stock_items(data):
+def get_inventory_page(db_name="store.db", after=0, page_size=50) -> tuple:
     """
-    Counts the number of items that are out of stock.
+    Reads one page of the inventory table shown on the dashboard.
+
+    Pages follow the product_id order from a cursor, like /api/products, so
+    every page is one range scan of the primary key, however far it is.
 
     Args:
-        data (dict): The database output containing product information.
+        db_name (str): Name of the database.
+        after (int): The page starts after this product_id; 0 for the first page.
+        page_size (int): Products per page.
 
     Returns:
-        int: Count of out-of-stock items.
+        tuple: Column name -> list of values, ready for a DataFrame (prices
+        stay numeric), and the cursor of the next page, None on the last one.
+    """
+    rows = get_connection(db_name).execute(
+        "SELECT product_id, name, category, brand, stock, price FROM products "
+        "WHERE product_id > ? ORDER BY product_id LIMIT ?;",
+        (after, page_size + 1),
+    ).fetchall()
+    next_after = rows[page_size - 1][0] if len(rows) > page_size else None
+    rows = rows[:page_size]
+    columns = ["Product", "Category", "Brand", "Stock", "Price"]
+    return {column: [row[position + 1] for row in rows] for position, column in enumerate(columns)}, next_after
+
+
+def get_low_stock_products(db_name="store.db", low_stock_threshold=10, limit=50) -> list:
     """
-    return sum(1 for stock in data["Stock"] if stock == 0)
+    Reads the products running out of stock, lowest stock first.
 
+    Args:
+        db_name (str): Name of the database.
+        low_stock_threshold (int): Products with less stock count as low stock.
+        limit (int): Maximum number of products.
 
-def calculate_total_categories(data):
+    Returns:
+        list: (name, stock) tuples.
     """
-    Calculates the total number of unique categories in the database.
+    return get_connection(db_name).execute(
+        "SELECT name, stock FROM products WHERE stock < ? ORDER BY stock, product_id LIMIT ?;",
+        (low_stock_threshold, limit),
+    ).fetchall()
+
+
+def get_chart_summaries(db_name="store.db") -> dict:
+    """
+    Reads the pre-aggregated rows behind the dashboard charts.
 
     Args:
-        data (dict): The database output containing product information.
+        db_name (str): Name of the database.
 
     Returns:
-        int: Total number of unique categories.
+        dict: "stock_by_category" (category -> units in stock) and
+        "sales_by_brand" (brand -> units sold), largest first.
     """
-    return len(set(data["Category"]))
+    summaries = {"stock_by_category": {}, "sales_by_brand": {}}
+    rows = get_connection(db_name).execute(CHART_SUMMARIES_SQL).fetchall()
+    for summary, name, units in sorted(rows, key=lambda row: -row[2]):
+        summaries[summary][name] = units
+    return summaries
 
 
-def get_database_content_as_dict(db_name="store.db") -> dict:
+def get_recent_inventory_changes(db_name="store.db", limit=10) -> list:
     """
-    Retrieves the entire database content as a dictionary.
+    Reads the latest entries of the inventory change feed.
 
     Args:
         db_name (str): Name of the database.
+        limit (int): Maximum number of changes.
 
     Returns:
-        dict: Dictionary containing the database content.
+        list: Changes, newest first, with the product name when it still exists.
     """
-    try:
-        # Connect to the database
-        conn = sqlite3.connect(db_name)
-        cursor = conn.cursor()
-
-        # Execute a query to fetch all tables in the database
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-        tables = cursor.fetchall()
-
-        # Initialize a dictionary to store the database content
-        database_content = {}
-
-        # Iterate over each table to fetch their contents
-        for (table_name,) in tables:
-            cursor.execute(f"SELECT * FROM {table_name}")
-            columns = [column[0] for column in cursor.description]
-            rows = cursor.fetchall()
-
-            # Store the table data in the dictionary
-            database_content[table_name] = [dict(zip(columns, row)) for row in rows]
-
-        # Close the database connection
-        conn.close()
-
-        parsed_data = {
-            "Product": [],
-            "Category": [],
-            "Brand": [],
-            "Stock": [],
-            "Price": [],
-        }
-
-        # Extract product information and map to table format
-        for product in database_content.get("products", []):
-            parsed_data["Product"].append(product["name"])
-            parsed_data["Category"].append(product["category"])
-            parsed_data["Brand"].append(product["brand"])
-            parsed_data["Stock"].append(product["stock"])
-            parsed_data["Price"].append(
-                f"${product['price']:.2f}"
-            )  # Format price as string with 2 decimals
-
-        return parsed_data
-
-    except Exception as e:
-        return {"status": "error", "message": f"Error retrieving the database content: {e}"}
+    cursor = get_connection(db_name).execute(
+        """
+        SELECT e.event_id, e.kind, e.product_id, p.name, e.old_stock, e.new_stock, e.old_price, e.new_price, e.ts
+        FROM inventory_events e LEFT JOIN products p ON p.product_id = e.product_id
+        ORDER BY e.event_id DESC
+        LIMIT ?;
+        """,
+        (limit,),
+    )
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
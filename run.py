@@ -1,6 +1,12 @@
+import logging
+import os
+
 from flask import Flask
 from backend.inventory_routes import inventory_bp
 
+# Shows the per-request prompt token logs of the backend
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+
 app = Flask(__name__)
 app.register_blueprint(inventory_bp)
 
@@ -0,0 +1,17 @@
+import logging
+import os
+
+import uvicorn
+from dotenv import load_dotenv
+
+if __name__ == "__main__":
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+    # Before uvicorn imports the app, which reads its settings at import
+    load_dotenv()
+
+    # One process, one event loop: concurrency is bounded by the client pool, not threads
+    uvicorn.run(
+        "backend.async_app:app",
+        port=int(os.getenv("ASYNC_PORT", "5001")),
+        timeout_keep_alive=30,
+    )